@@ -1,7 +1,5 @@
-from flask import Flask, render_template
-from flask_socketio import SocketIO, emit
-from threading import Thread
-import time
+from flask import Flask, Response, render_template, request
+from flask_socketio import SocketIO, join_room, leave_room
 import json
 import os
 
@@ -13,6 +11,13 @@ import os
 
 import os
 import sys
+from backend.services.subscription_service import SubscriptionService
+from backend.utils.delta_protocol import ENCODINGS, ChartChannel, TickerChannel
+from backend.utils.http_cache import ResponseCache
+from backend.utils.intervals import INTERVAL_MS
+from backend.utils.metrics import SIZE_BUCKETS, json_size, registry
+from backend.utils.outbox import Outbox
+from backend.utils.scheduler import Scheduler
 
 # Get the absolute path to the project root directory
 project_root = os.path.dirname(os.path.abspath(__file__))  # This is the backend directory
@@ -41,13 +46,69 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 # price_service = PriceService(binance_client)
 # support_service = SupportService(support_detector)
 
-# Global variables for tracking current pair and timeframe
-current_pair = "BTCUSDT"
-current_timeframe = "1h"
+# Subscription new clients start with
+default_pair = "BTCUSDT"
+default_timeframe = "1h"
+
+# Chart payload format negotiated per client ('rows' or 'columnar'), keyed by sid
+client_chart_formats = {}
+
+# Update protocol negotiated per client, keyed by sid: '' for full payloads,
+# or the encoding ('json' or 'binary') of sequenced delta updates
+client_protocols = {}
+
+# Sequenced delta streams shared by every delta client of a pair / subscription
+ticker_channels = {}  # pair -> TickerChannel
+chart_channels = {}  # (pair, timeframe) -> ChartChannel
 
 # These will be set later via dependency injection
 price_service = None
 support_service = None
+alert_service = None
+subscriptions = SubscriptionService()
+
+# Set in cluster mode; requests needing market data are then answered by the ingest leader
+cluster = None
+
+# Symbols whose prices arrive over the connected market stream; the ticker
+# task polls only the other watched and alert pairs
+streamed_pairs = frozenset()
+
+# Background tasks that compute and broadcast market data; in cluster mode they
+# run only on the ingest leader
+INGEST_TASKS = ('ticker', 'charts', 'supports', 'candle_close')
+scheduler = None
+support_interval = "1h"  # candles support levels are detected on
+pending_supports = set()  # pairs whose support interval candle closed since the last refresh
+
+# Broadcast state updates that may be coalesced for a backed-up client; for
+# delta streams the held update is replaced by a fresh snapshot
+COALESCED_EVENTS = ('price_update', 'support_update', 'chart_update', 'ticker_delta', 'chart_delta')
+
+# Serialized REST API responses; each key is reloaded at most once per max_age seconds
+response_cache = ResponseCache(max_age=1.0)
+MAX_HISTORY_LIMIT = 1000  # most candles the exchange returns per request
+
+# Instrumentation served on /metrics
+EMITS = registry.counter('socketio_emits_total',
+                         'Socket.IO messages sent, one per room or client', ('event',))
+PAYLOAD_BYTES = registry.histogram('socketio_payload_bytes',
+                                   'Encoded size of emitted payloads, sampled 1 in PAYLOAD_SAMPLE_EVERY',
+                                   ('event',), SIZE_BUCKETS)
+# Sizing a payload means encoding it a second time, which costs about as much
+# as building a chart payload, so only every Nth payload of an event is sized
+PAYLOAD_SAMPLE_EVERY = 16
+payload_samples = {}  # event -> payloads sent since the last sized one
+CONNECTED_CLIENTS = registry.gauge('socketio_connected_clients', 'Connected Socket.IO clients')
+ROOMS = registry.gauge('socketio_rooms', 'Subscription rooms with at least one client')
+WATCHED_PAIRS = registry.gauge('watched_pairs', 'Pairs with at least one subscribed client')
+CACHE_HIT_RATIO = registry.gauge('cache_hit_ratio', 'Hits per lookup since start', ('cache',))
+CACHE_LOOKUPS = registry.counter('cache_lookups_total', 'Cache lookups', ('cache', 'result'))
+CACHE_EVICTIONS = registry.counter('cache_evictions_total', 'Entries evicted for size', ('cache',))
+CACHE_BYTES = registry.gauge('cache_bytes', 'Estimated size of cached entries', ('cache',))
+CACHE_ENTRIES = registry.gauge('cache_entries', 'Cached entries', ('cache',))
+API_RESPONSES = registry.counter('api_responses_total', 'REST API responses',
+                                 ('endpoint', 'status'))
 
 @app.route('/')
 def index():
@@ -56,65 +117,606 @@ def index():
     print(f"Does index.html exist: {os.path.exists(os.path.join(app.template_folder, 'index.html'))}")
     return render_template('index.html')
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint"""
+    stats = subscriptions.stats()
+    CONNECTED_CLIENTS.set(len(client_protocols))
+    ROOMS.set(stats['rooms'])
+    WATCHED_PAIRS.set(stats['pairs'])
+
+    services = app.config.get('services') or {'price_service': price_service}
+    caches = {'api.responses': response_cache.stats()}
+    for name, service in services.items():
+        if not hasattr(service, 'get_cache_stats'):
+            continue
+        for cache_name, cache_stats in service.get_cache_stats().items():
+            caches[f"{name}.{cache_name}"] = cache_stats
+    for cache, cache_stats in caches.items():
+        CACHE_HIT_RATIO.set(cache_stats['hit_rate'], cache=cache)
+        CACHE_LOOKUPS.set(cache_stats['hits'], cache=cache, result='hit')
+        CACHE_LOOKUPS.set(cache_stats['misses'], cache=cache, result='miss')
+        CACHE_EVICTIONS.set(cache_stats['evictions'], cache=cache)
+        CACHE_BYTES.set(cache_stats['bytes'], cache=cache)
+        CACHE_ENTRIES.set(cache_stats['entries'], cache=cache)
+    return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/price/<symbol>')
+def api_price(symbol):
+    """Latest ticker of a symbol"""
+    symbol = symbol.upper()
+
+    def load():
+        # Watched pairs are kept current by the ticker task (or, on cluster
+        # workers, by the leader); only an ingesting process asks the exchange
+        latest = subscriptions.latest(symbol, 'price_update')
+        if latest is None and ingests():
+            latest = price_service.get_current_price(symbol)
+        return latest
+
+    return api_response('price', ('price', symbol), load)
+
+@app.route('/api/history/<symbol>')
+def api_history(symbol):
+    """Candles and volume profile of a symbol, as in `chart_update`
+
+    Query parameters: `interval` (default 1h), `limit` (default 500) and
+    `format` ('rows' or 'columnar').
+    """
+    symbol = symbol.upper()
+    interval = request.args.get('interval', '1h')
+    fmt = request.args.get('format', 'rows')
+    try:
+        limit = int(request.args.get('limit', 500))
+    except ValueError:
+        return api_error('history', 400, 'limit must be an integer')
+    if interval not in INTERVAL_MS:
+        return api_error('history', 400, f"Unknown interval: {interval}")
+    if not 1 <= limit <= MAX_HISTORY_LIMIT:
+        return api_error('history', 400, f"limit must be between 1 and {MAX_HISTORY_LIMIT}")
+    if fmt not in ('rows', 'columnar'):
+        return api_error('history', 400, f"Unknown format: {fmt}")
+    if not ingests():
+        return api_error('history', 503, 'History is served by the ingest leader')
+    return api_response('history', ('history', symbol, interval, limit, fmt),
+                        lambda: price_service.get_historical_data(symbol, interval, limit, fmt))
+
+@app.route('/api/supports/<symbol>')
+def api_supports(symbol):
+    """Support levels of a symbol
+
+    With `interval`, the levels of the latest detection on that interval;
+    otherwise the levels broadcast as `support_update`. Until the first
+    detection of a pair on `support_interval` finishes, it is requested
+    and 202 is returned.
+    """
+    symbol = symbol.upper()
+    interval = request.args.get('interval')
+    if interval is not None and interval not in INTERVAL_MS:
+        return api_error('supports', 400, f"Unknown interval: {interval}")
+    if not ingests():
+        # Cluster workers only have what the leader shared
+        if interval is not None:
+            return api_error('supports', 503, 'Per-interval levels are served by the ingest leader')
+        return api_response('supports', ('supports', symbol),
+                            lambda: subscriptions.latest(symbol, 'support_update'))
+
+    if interval is not None and interval != support_interval:
+        def load():
+            if not support_service.is_refreshed(symbol, interval):
+                return None
+            return support_service.get_interval_levels(symbol, interval)
+
+        return api_response('supports', ('supports', symbol, interval), load)
+
+    if support_service is not None and subscriptions.latest(symbol, 'support_update') is None \
+            and not support_service.is_refreshed(symbol, support_interval):
+        # Only listed symbols are detected, so a misspelled one costs no klines requests
+        listed = symbol_listed(symbol)
+        if listed is None:
+            return api_error('supports', 503, 'The exchange symbol list is unavailable')
+        if not listed:
+            return api_error('supports', 404, f"Unknown symbol: {symbol}")
+        request_support_refresh([symbol])
+        return api_pending('supports', 'Support levels are being detected')
+    return api_response('supports', ('supports', symbol),
+                        lambda: latest_payload(symbol, 'support_update'))
+
+def symbol_listed(symbol):
+    """Whether the exchange trades a symbol, or None if its symbol list is unavailable
+
+    The client caches the list (and a failed fetch), so this is usually a
+    set lookup.
+    """
+    if support_service is None or support_service.binance_client is None:
+        return None
+    symbols = support_service.binance_client.get_symbols()
+    return None if symbols is None else symbol in symbols
+
+def ingests():
+    """Whether this process fetches market data itself (not a cluster follower)"""
+    return cluster is None or cluster.is_leader
+
+def api_response(endpoint, key, load):
+    """Serve a cached JSON response, or 304 if the client has this version"""
+    if price_service is None or support_service is None:
+        return api_error(endpoint, 503, 'Services are not initialized')
+    try:
+        cached = response_cache.get(key, load)
+    except Exception as e:
+        print(f"Error serving {endpoint} API: {str(e)}")
+        return api_error(endpoint, 502, 'Market data is unavailable')
+    if cached is None:
+        return api_error(endpoint, 404, 'No data')
+
+    headers = {
+        'ETag': cached.etag,
+        'Last-Modified': cached.last_modified_header,
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding'
+    }
+    if cached.not_modified(request.headers):
+        API_RESPONSES.inc(endpoint=endpoint, status='304')
+        return Response(status=304, headers=headers)
+    body = cached.body
+    if request.accept_encodings.quality('gzip') > 0:
+        body = cached.gzipped
+        headers['Content-Encoding'] = 'gzip'
+    API_RESPONSES.inc(endpoint=endpoint, status='200')
+    return Response(body, content_type='application/json', headers=headers)
+
+def api_pending(endpoint, message):
+    """202: the data is being prepared, poll again shortly"""
+    API_RESPONSES.inc(endpoint=endpoint, status='202')
+    return Response(json.dumps({'status': 'pending', 'message': message}), status=202,
+                    content_type='application/json',
+                    headers={'Retry-After': str(max(1, int(response_cache.max_age)))})
+
+def api_error(endpoint, status, message):
+    API_RESPONSES.inc(endpoint=endpoint, status=str(status))
+    return Response(json.dumps({'error': message}), status=status, content_type='application/json')
+
 @socketio.on('connect')
 def handle_connect():
     print('Client connected')
-    # Send initial data
-    emit('initial_data', {
-        'pair': current_pair,
-        'timeframe': current_timeframe,
-        'price_data': price_service.get_current_price(current_pair),
-        'support_levels': support_service.get_support_levels(current_pair)
-    })
+    # Clients opt into columnar chart payloads with ?chart_format=columnar
+    chart_format = request.args.get('chart_format', 'rows')
+    client_chart_formats[request.sid] = chart_format if chart_format in ('rows', 'columnar') else 'rows'
+    # and into sequenced delta updates with ?updates=delta (&encoding=binary)
+    variant = ''
+    if request.args.get('updates') == 'delta':
+        encoding = request.args.get('encoding', 'json')
+        variant = encoding if encoding in ENCODINGS else 'json'
+    client_protocols[request.sid] = variant
+    subscribe_client(request.sid, default_pair, default_timeframe)
+    serve('initial', request.sid)
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    serve('disconnect', request.sid)
+    client_chart_formats.pop(request.sid, None)
+    client_protocols.pop(request.sid, None)
+    subscriptions.unsubscribe(request.sid)
 
 @socketio.on('change_pair')
 def handle_pair_change(data):
-    global current_pair
-    current_pair = data['pair']
-    # Update data for new pair
-    emit('price_update', price_service.get_current_price(current_pair))
-    emit('support_update', support_service.get_support_levels(current_pair))
+    _, timeframe = subscriptions.subscription(request.sid) or (default_pair, default_timeframe)
+    subscribe_client(request.sid, data['pair'], timeframe)
+    serve('change_pair', request.sid)
 
 @socketio.on('change_timeframe')
 def handle_timeframe_change(data):
-    global current_timeframe
-    current_timeframe = data['timeframe']
-    # Update chart data for new timeframe
-    emit('chart_update', price_service.get_historical_data(current_pair, current_timeframe))
-
-def background_price_updates():
-    """Background thread for sending real-time price updates"""
-    while True:
-        try:
-            with app.app_context():
-                # Get services from app config if available
-                services = app.config.get('services', {})
-                price_service = services.get('price_service')
-                support_service = services.get('support_service')
-                
-                # Fall back to global variables if services aren't in app config
-                if not price_service:
-                    price_service = globals().get('price_service')
-                if not support_service:
-                    support_service = globals().get('support_service')
-                
-                # Get current price if service is available
-                if price_service:
-                    price_data = price_service.get_current_price(current_pair)
-                    if price_data:
-                        socketio.emit('price_update', price_data)
-                
-                # Update support levels if needed and service is available
-                if support_service and support_service.should_update_supports(current_pair):
-                    support_data = support_service.get_support_levels(current_pair)
-                    if support_data:
-                        socketio.emit('support_update', support_data)
-        except Exception as e:
-            print(f"Error in background thread: {e}")
-            
-        time.sleep(1)  # Update every second
+    pair, _ = subscriptions.subscription(request.sid) or (default_pair, default_timeframe)
+    subscribe_client(request.sid, pair, data['timeframe'])
+    serve('change_timeframe', request.sid)
+
+@socketio.on('resync')
+def handle_resync(data):
+    """Resend a snapshot to a delta client that detected a sequence gap"""
+    if subscriptions.subscription(request.sid) is None or not client_protocols.get(request.sid):
+        return
+    serve('resync', request.sid, {'stream': data.get('stream')})
+
+@socketio.on('add_alert_level')
+def handle_add_alert_level(data):
+    """Watch a price level for the sending client"""
+    serve('add_alert_level', request.sid,
+          {'pair': data['pair'], 'price': float(data['price']), 'label': data.get('label')})
+
+@socketio.on('remove_alert_level')
+def handle_remove_alert_level(data):
+    serve('remove_alert_level', request.sid, {'id': data['id']})
+
+def serve(action, sid, data=None):
+    """Answer a client request here, or on the ingest leader in cluster mode
+
+    The request carries what the answer depends on (the client's
+    subscription and protocol), so the leader needs no per-client state.
+    """
+    pair, timeframe = subscriptions.subscription(sid) or (default_pair, default_timeframe)
+    client = {
+        'sid': sid,
+        'pair': pair,
+        'timeframe': timeframe,
+        'variant': client_protocols.get(sid, ''),
+        'chart_format': client_chart_formats.get(sid, 'rows')
+    }
+    if cluster is not None and not cluster.is_leader:
+        cluster.request(action, client, data)
+        return
+    CLIENT_REQUESTS[action](client, data or {})
+
+def serve_initial(client, data):
+    sid, pair, timeframe = client['sid'], client['pair'], client['timeframe']
+    send('initial_data', {
+        'pair': pair,
+        'timeframe': timeframe,
+        'price_data': latest_payload(pair, 'price_update'),
+        'support_levels': latest_payload(pair, 'support_update') or []
+    }, [sid])
+    if client['variant']:
+        send_ticker_snapshot(sid, pair)
+        send_chart_snapshot(sid, pair, timeframe, client['variant'])
+
+def serve_pair_change(client, data):
+    sid, pair = client['sid'], client['pair']
+    if client['variant']:
+        send_ticker_snapshot(sid, pair)
+        send_chart_snapshot(sid, pair, client['timeframe'], client['variant'])
+    else:
+        send('price_update', latest_payload(pair, 'price_update'), [sid])
+    send('support_update', latest_payload(pair, 'support_update') or [], [sid])
+
+def serve_timeframe_change(client, data):
+    sid, pair, timeframe = client['sid'], client['pair'], client['timeframe']
+    if client['variant']:
+        send_chart_snapshot(sid, pair, timeframe, client['variant'])
+        return
+    send('chart_update', price_service.get_historical_data(pair, timeframe, fmt=client['chart_format']),
+         [sid])
+
+def serve_resync(client, data):
+    if data.get('stream') == 'ticker':
+        send_ticker_snapshot(client['sid'], client['pair'])
+    else:
+        send_chart_snapshot(client['sid'], client['pair'], client['timeframe'], client['variant'])
+
+def serve_add_alert_level(client, data):
+    if not alert_service:
+        return
+    level = alert_service.add_user_level(data['pair'], data['price'],
+                                         owner=client['sid'], label=data.get('label'))
+    send('alert_level_added', level, [client['sid']])
+
+def serve_remove_alert_level(client, data):
+    if alert_service and alert_service.remove_user_level(data['id'], owner=client['sid']):
+        send('alert_level_removed', {'id': data['id']}, [client['sid']])
+
+def serve_disconnect(client, data):
+    if alert_service:
+        alert_service.remove_owner(client['sid'])
+
+CLIENT_REQUESTS = {
+    'initial': serve_initial,
+    'change_pair': serve_pair_change,
+    'change_timeframe': serve_timeframe_change,
+    'resync': serve_resync,
+    'add_alert_level': serve_add_alert_level,
+    'remove_alert_level': serve_remove_alert_level,
+    'disconnect': serve_disconnect
+}
+
+def subscribe_client(sid, pair, timeframe):
+    """Move a client into the room of its (pair, timeframe) subscription"""
+    variant = client_protocols.get(sid, '')
+    previous = subscriptions.subscribe(sid, pair, timeframe, variant)
+    if previous == (pair, timeframe, variant):
+        return
+    if previous is not None:
+        leave_room(SubscriptionService.room(*previous), sid=sid)
+    join_room(SubscriptionService.room(pair, timeframe, variant), sid=sid)
+
+def latest_payload(pair, event):
+    """Latest broadcast payload for a pair, fetched only if none was sent yet
+
+    Support levels come only from detections; before the pair's first one
+    finishes this returns None.
+    """
+    payload = subscriptions.latest(pair, event)
+    if payload is None:
+        if event == 'price_update':
+            payload = price_service.get_current_price(pair)
+        else:
+            payload = detected_supports(pair)
+        if payload:
+            subscriptions.remember(pair, event, payload)
+    return payload
+
+def detected_supports(pair):
+    """Levels of the pair's latest detection on `support_interval`, or None
+
+    Missing or stale levels are refreshed in the background.
+    """
+    refreshed = support_service.is_refreshed(pair, support_interval)
+    if not refreshed or support_service.should_update_supports(pair):
+        request_support_refresh([pair])
+    return support_service.get_interval_levels(pair, support_interval) if refreshed else None
+
+def broadcast(pair, event, payload):
+    """Send a pair's payload once to each of its subscription rooms
+
+    Delta clients get price updates as a `ticker_delta` of the changed
+    fields, or nothing when the ticker did not change.
+    """
+    subscriptions.remember(pair, event, payload)
+    if cluster is not None and cluster.is_leader:
+        # Workers serve the REST API from what the leader broadcast
+        cluster.share(pair, event, payload)
+    if event == 'price_update':
+        check_alerts(pair, payload)
+    elif event == 'support_update' and alert_service:
+        alert_service.set_support_levels(pair, payload)
+    rooms = subscriptions.rooms_for(pair)
+    if rooms:
+        send(event, payload, rooms)
+
+    delta_rooms = [room for encoding in ENCODINGS for room in subscriptions.rooms_for(pair, variant=encoding)]
+    if not delta_rooms:
+        return
+    if event == 'price_update':
+        event, payload = 'ticker_delta', ticker_channel(pair).update(payload)
+        if payload is None:
+            return
+    send(event, payload, delta_rooms)
+
+def check_alerts(pair, price_data):
+    """Send the alerts a price tick raises
+
+    Alerts on detected or shared levels go to every room of the pair;
+    alerts on a client's own levels go to that client only.
+    """
+    if not alert_service or not price_data:
+        return
+    alerts = alert_service.on_price(pair, price_data['price'])
+    if not alerts:
+        return
+    shared = [alert for alert in alerts if not alert['level'].get('owner')]
+    if shared:
+        rooms = [room for variant in ('',) + ENCODINGS for room in subscriptions.rooms_for(pair, variant=variant)]
+        if rooms:
+            send('support_alert', shared, rooms)
+    by_owner = {}
+    for alert in alerts:
+        if alert['level'].get('owner'):
+            by_owner.setdefault(alert['level']['owner'], []).append(alert)
+    for owner, owned in by_owner.items():
+        send('support_alert', owned, [owner])
+
+def send(event, payload, rooms):
+    """Emit a payload to each room (or client sid), counting messages and bytes
+
+    Backed-up clients are skipped for state updates, which the outbox
+    keeps for them instead.
+    """
+    sent = payload_samples.get(event, 0)
+    payload_samples[event] = sent + 1
+    if sent % PAYLOAD_SAMPLE_EVERY == 0:
+        PAYLOAD_BYTES.observe(json_size(payload), event=event)
+    for room in rooms:
+        skipped = outbox.backed_up(room) if event in COALESCED_EVENTS else None
+        if skipped:
+            outbox.hold(skipped, event, payload)
+            socketio.emit(event, payload, to=room, skip_sid=skipped)
+        else:
+            socketio.emit(event, payload, to=room)
+    EMITS.inc(len(rooms), event=event)
+
+def client_queue_size(sid):
+    """Packets waiting in a local client's Engine.IO send queue"""
+    server = socketio.server
+    eio_sid = server.manager.eio_sid_from_sid(sid, '/')
+    client = server.eio.sockets.get(eio_sid) if eio_sid else None
+    return client.queue.qsize() if client is not None else None
+
+outbox = Outbox(client_queue_size, lambda sid: socketio.server.rooms(sid, namespace='/'))
+
+def flush_outbox():
+    """Outbox task: deliver the latest held state to clients that drained"""
+    for sid, held in outbox.refresh(list(client_protocols)).items():
+        for event, payload in held.items():
+            if event == 'ticker_delta':
+                serve('resync', sid, {'stream': 'ticker'})
+            elif event == 'chart_delta':
+                serve('resync', sid, {'stream': 'chart'})
+            else:
+                send(event, payload, [sid])
+
+def ticker_channel(pair):
+    return ticker_channels.setdefault(pair, TickerChannel())
+
+def chart_channel(pair, timeframe):
+    return chart_channels.setdefault((pair, timeframe), ChartChannel(pair, timeframe))
+
+def publish_chart_delta(pair, timeframe, delta):
+    """Send a chart delta to the subscription's delta rooms, encoded once per encoding"""
+    for encoding in ENCODINGS:
+        rooms = subscriptions.rooms_for(pair, timeframe, encoding)
+        if rooms:
+            send('chart_delta', chart_channel(pair, timeframe).encode(delta, encoding), rooms)
+
+def refresh_chart(pair, timeframe):
+    """Diff the latest chart payload against the subscription's chart stream"""
+    payload = price_service.get_historical_data(pair, timeframe, fmt='columnar')
+    if payload:
+        delta = chart_channel(pair, timeframe).update(payload)
+        if delta:
+            publish_chart_delta(pair, timeframe, delta)
+
+def send_ticker_snapshot(sid, pair):
+    """Start (or restart) a client's ticker stream"""
+    channel = ticker_channel(pair)
+    if channel.snapshot()['ticker'] is None:
+        price_data = latest_payload(pair, 'price_update')
+        if price_data:
+            broadcast(pair, 'price_update', price_data)
+    snapshot = channel.snapshot()
+    snapshot['symbol'] = pair
+    send('ticker_snapshot', snapshot, [sid])
+
+def send_chart_snapshot(sid, pair, timeframe, encoding=None):
+    """Start (or restart) a client's chart stream"""
+    encoding = encoding or client_protocols.get(sid) or 'json'
+    snapshot = chart_channel(pair, timeframe).snapshot(encoding)
+    if snapshot is None:
+        refresh_chart(pair, timeframe)
+        snapshot = chart_channel(pair, timeframe).snapshot(encoding)
+    if snapshot is not None:
+        send('chart_snapshot', snapshot, [sid])
+
+def attach_market_stream(event_bus):
+    """Relay streamed market data to Socket.IO clients"""
+    def on_ticker(price_data):
+        if subscriptions.refcount(price_data['symbol']):
+            broadcast(price_data['symbol'], 'price_update', price_data)
+        elif alert_service and alert_service.has_levels(price_data['symbol']):
+            check_alerts(price_data['symbol'], price_data)
+
+    def on_kline(candle):
+        symbol = candle['symbol']
+        if candle['closed'] and candle['interval'] == support_interval and \
+                (subscriptions.refcount(symbol) or support_service.is_refreshed(symbol, support_interval)):
+            request_support_refresh([symbol])
+        key = (candle['symbol'], candle['interval'])
+        if key in subscriptions.active_subscriptions(ENCODINGS):
+            delta = chart_channel(*key).apply_candle(candle, max_length=500)
+            if delta:
+                publish_chart_delta(*key, delta)
+
+    def on_status(status):
+        global streamed_pairs
+        streamed_pairs = frozenset(status['symbols']) if status['connected'] else frozenset()
+
+    event_bus.subscribe('ticker', on_ticker)
+    event_bus.subscribe('kline', on_kline)
+    event_bus.subscribe('stream_status', on_status)
+
+def use_message_queue(client_manager):
+    """Relay emits through a message queue shared with other processes
+
+    Must be called before any client connects.
+    """
+    socketio.server.manager = client_manager
+    client_manager.set_server(socketio.server)
+    # Listen right away rather than on the first connection, so answers the
+    # leader sends to that connection are not missed
+    socketio.server.manager_initialized = True
+    client_manager.initialize()
+
+def attach_cluster(cluster_service, event_bus):
+    """Join a cluster: run the ingest tasks and answer requests forwarded by
+    other workers only while leading
+    """
+    global cluster
+    cluster = cluster_service
+
+    def on_leadership(event):
+        if scheduler is None:
+            return
+        if event['leader']:
+            scheduler.resume(*INGEST_TASKS)
+        else:
+            scheduler.pause(*INGEST_TASKS)
+
+    def on_request(message):
+        with app.app_context():
+            CLIENT_REQUESTS[message['action']](message['client'], message['data'])
+
+    event_bus.subscribe('leadership', on_leadership)
+    event_bus.subscribe('client_request', on_request)
+
+def poll_prices():
+    """Ticker task: broadcast watched pairs' prices, fetched in one bulk request
+
+    Pairs covered by the market stream are skipped.
+    """
+    if not price_service:
+        return
+    watched = [pair for pair in subscriptions.active_pairs() if pair not in streamed_pairs]
+    # Pairs nobody watches are still polled while someone has an alert on them
+    alert_only = [pair for pair in alert_service.symbols()
+                  if pair not in watched and pair not in streamed_pairs] if alert_service else []
+    if not watched and not alert_only:
+        return
+    prices = price_service.get_current_prices(watched + alert_only)
+    for pair in watched:
+        if prices.get(pair):
+            broadcast(pair, 'price_update', prices[pair])
+    for pair in alert_only:
+        check_alerts(pair, prices.get(pair))
+
+def refresh_charts():
+    """Chart task: send delta clients only the candles that changed"""
+    active = subscriptions.active_subscriptions(ENCODINGS)
+    if price_service:
+        for pair, timeframe in active:
+            refresh_chart(pair, timeframe)
+    for key in [key for key in chart_channels if key not in active]:
+        chart_channels.pop(key, None)
+
+def request_support_refresh(pairs):
+    """Refresh supports of these pairs soon, e.g. after their candle closed"""
+    pending_supports.update(pairs)
+    if scheduler is not None:
+        scheduler.trigger('supports')
+
+def refresh_supports():
+    """Support task: refresh due pairs
+
+    Pairs with incremental detection state only apply their latest candles;
+    the rest are detected from scratch in the detection process pool.
+    """
+    if not support_service or support_service.binance_client is None:
+        return
+    watched = subscriptions.active_pairs()
+    # Requested pairs are refreshed even if unwatched, e.g. for the REST API
+    requested = set(pending_supports)
+    pending_supports.difference_update(requested)
+    due = [pair for pair in watched
+           if pair in requested or support_service.should_update_supports(pair)
+           or not support_service.is_refreshed(pair, support_interval)]
+    due += [pair for pair in requested if pair not in watched]
+    symbols = support_service.binance_client.get_symbols() if due else None
+    if symbols is not None:
+        # Watched or requested pairs the exchange does not list never get levels
+        due = [pair for pair in due if pair in symbols]
+    if not due:
+        return
+    for pair, support_data in support_service.refresh_supports(due, support_interval).items():
+        broadcast(pair, 'support_update', support_data)
+
+def create_scheduler(ticker_interval=1.0, chart_interval=1.0, support_check_interval=5.0,
+                     outbox_interval=0.5, ingest=True):
+    """Background updates, each task at its own cadence
+
+    Prices go out every `ticker_interval` seconds however long support
+    detection takes, and supports are updated right after each
+    `support_interval` candle closes as well as whenever they are due.
+    With `ingest=False` (cluster workers until elected) only the outbox
+    runs; `scheduler.resume(*INGEST_TASKS)` starts the rest.
+    """
+    global scheduler
+    scheduler = Scheduler()
+    paused = not ingest
+    scheduler.add('ticker', poll_prices, ticker_interval, paused=paused)
+    scheduler.add('charts', refresh_charts, chart_interval, paused=paused)
+    scheduler.add('supports', refresh_supports, support_check_interval, paused=paused)
+    # A couple of seconds after each close, so the exchange has the final candle
+    scheduler.add('candle_close', lambda: request_support_refresh(subscriptions.active_pairs()),
+                  INTERVAL_MS[support_interval] / 1000, align=True, offset=2.0, paused=paused)
+    scheduler.add('outbox', flush_outbox, outbox_interval)
+    return scheduler
 
 if __name__ == '__main__':
-    # Start background thread for price updates
-    Thread(target=background_price_updates, daemon=True).start()
+    # Start background price, chart and support updates
+    create_scheduler().start()
     socketio.run(app, debug=True)
\ No newline at end of file
@@ -0,0 +1,60 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class Config:
+    """Application configuration, overridable through environment variables"""
+
+    # Binance REST: asyncio client with bounded concurrency instead of requests
+    BINANCE_ASYNC = os.getenv('BINANCE_ASYNC', '0').lower() in ('1', 'true', 'yes')
+    BINANCE_MAX_CONCURRENCY = int(os.getenv('BINANCE_MAX_CONCURRENCY', 50))
+
+    # Base interval all chart timeframes are resampled from (empty to fetch each one)
+    BASE_INTERVAL = os.getenv('BASE_INTERVAL', '5m')
+
+    # Support detection
+    MIN_TOUCHES = int(os.getenv('MIN_TOUCHES', 3))
+    MIN_DISTANCE_PERCENT = float(os.getenv('MIN_DISTANCE_PERCENT', 0.5))
+    SUPPORT_INTERVAL = os.getenv('SUPPORT_INTERVAL', '1h')
+
+    # Background update cadences in seconds
+    TICKER_INTERVAL = float(os.getenv('TICKER_INTERVAL', 1))
+    CHART_INTERVAL = float(os.getenv('CHART_INTERVAL', 1))
+    SUPPORT_CHECK_INTERVAL = float(os.getenv('SUPPORT_CHECK_INTERVAL', 5))
+
+    # Per-client backpressure: queued packets at which a client is treated as
+    # backed up (updates coalesced), and at which it has caught up again
+    BACKPRESSURE_HIGH_WATER = int(os.getenv('BACKPRESSURE_HIGH_WATER', 64))
+    BACKPRESSURE_LOW_WATER = int(os.getenv('BACKPRESSURE_LOW_WATER', 8))
+
+    # Seconds a REST API response is served before its data is checked again
+    API_MAX_AGE = float(os.getenv('API_MAX_AGE', 1))
+
+    # Batch detection process pool (0 = one worker per CPU core)
+    DETECTION_WORKERS = int(os.getenv('DETECTION_WORKERS', 0))
+
+    # Support alerts: proximity band and per-level cooldown in seconds
+    ALERT_PROXIMITY_PERCENT = float(os.getenv('ALERT_PROXIMITY_PERCENT', 0.5))
+    ALERT_COOLDOWN = float(os.getenv('ALERT_COOLDOWN', 300))
+
+    # Local kline store (empty to disable)
+    KLINE_STORE_DIR = os.getenv('KLINE_STORE_DIR', 'data/klines')
+
+    # Warm-start snapshot of detector and cache state (empty to disable)
+    SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', 'data/snapshot.bin')
+    SNAPSHOT_INTERVAL = float(os.getenv('SNAPSHOT_INTERVAL', 60))
+    SNAPSHOT_MAX_AGE = float(os.getenv('SNAPSHOT_MAX_AGE', 900))
+
+    # Cluster mode: message queue shared by the ingest leader and web workers
+    # (broker://host:port or redis://...; empty to run as a single process)
+    MESSAGE_QUEUE = os.getenv('MESSAGE_QUEUE', '')
+    CLUSTER_ROLE = os.getenv('CLUSTER_ROLE', 'all')
+    CLUSTER_CHANNEL = os.getenv('CLUSTER_CHANNEL', 'crypto-support-tracker')
+    CLUSTER_LEASE_TTL = float(os.getenv('CLUSTER_LEASE_TTL', 10))
+    CLUSTER_HEARTBEAT = float(os.getenv('CLUSTER_HEARTBEAT', 2))
+
+    # Socket.IO
+    SOCKET_PING_INTERVAL = int(os.getenv('SOCKET_PING_INTERVAL', 25))
+    SOCKET_PING_TIMEOUT = int(os.getenv('SOCKET_PING_TIMEOUT', 60))
@@ -0,0 +1,167 @@
+import itertools
+import time
+from threading import Lock
+from typing import Dict, List, Optional
+from backend.utils.level_index import LevelIndex
+from backend.utils.metrics import registry
+
+ALERTS = registry.counter('support_alerts_total', 'Support alerts raised', ('type', 'source'))
+ALERTS_SUPPRESSED = registry.counter('support_alerts_suppressed_total',
+                                     'Alerts dropped as duplicates or within their cooldown')
+
+
+class AlertService:
+    """Price alerts against detected and user-defined support levels
+
+    Levels of each symbol live in a sorted `LevelIndex`. Every price tick
+    is compared with the symbol's previous tick, so only the levels price
+    moved through ('break' falling, 'reclaim' rising) or fell within
+    `proximity_percent` of ('approach') are visited. An alert for the same
+    level and type is suppressed for `cooldown` seconds, and detected and
+    user levels at one price raise one broadcast alert per tick.
+    """
+
+    def __init__(self, proximity_percent: float = 0.5, cooldown: float = 300.0):
+        self.proximity_percent = proximity_percent
+        self.cooldown = cooldown
+        self._indexes = {}  # symbol -> LevelIndex
+        self._levels = {}  # level id -> level dict
+        self._owned = {}  # owner -> ids of the user levels it added
+        self._last_price = {}  # symbol -> price at the previous tick
+        self._last_alert = {}  # (level id, type) -> time of the last alert
+        self._ids = itertools.count(1)
+        self._lock = Lock()
+
+    def set_support_levels(self, symbol: str, levels: List[Dict]):
+        """Replace a symbol's detected levels
+
+        Ids derive from the price, so a level that survives a refresh keeps
+        its cooldowns.
+        """
+        prefix = f"{symbol}:detected:"
+        with self._lock:
+            index = self._indexes.setdefault(symbol, LevelIndex())
+            for level_id in index.remove_where(lambda level_id: level_id.startswith(prefix)):
+                self._levels.pop(level_id, None)
+            added = []
+            for level in levels:
+                level_id = f"{prefix}{level['price']}"
+                if level_id in self._levels:
+                    continue
+                self._levels[level_id] = {
+                    'id': level_id,
+                    'symbol': symbol,
+                    'price': float(level['price']),
+                    'source': 'detected',
+                    'strength': level.get('strength')
+                }
+                added.append((level_id, float(level['price'])))
+            index.add_many(added)
+            self._prune_cooldowns()
+
+    def add_user_level(self, symbol: str, price: float, owner: Optional[str] = None,
+                       label: Optional[str] = None) -> Dict:
+        """Watch a user-defined level; alerts for it go to `owner` only, if given"""
+        with self._lock:
+            level_id = f"{symbol}:user:{next(self._ids)}"
+            level = {
+                'id': level_id,
+                'symbol': symbol,
+                'price': float(price),
+                'source': 'user',
+                'owner': owner,
+                'label': label
+            }
+            self._levels[level_id] = level
+            self._indexes.setdefault(symbol, LevelIndex()).add(level_id, level['price'])
+            if owner is not None:
+                self._owned.setdefault(owner, set()).add(level_id)
+            return level
+
+    def remove_user_level(self, level_id: str, owner: Optional[str] = None) -> bool:
+        """Stop watching a user level (only its owner's, when `owner` is given)"""
+        with self._lock:
+            level = self._levels.get(level_id)
+            if level is None or level['source'] != 'user':
+                return False
+            if owner is not None and level['owner'] != owner:
+                return False
+            self._remove(level)
+            return True
+
+    def remove_owner(self, owner: str):
+        """Drop every level a client added, e.g. when it disconnects"""
+        with self._lock:
+            for level_id in list(self._owned.get(owner, ())):
+                level = self._levels.get(level_id)
+                if level is not None:
+                    self._remove(level)
+            self._owned.pop(owner, None)
+
+    def symbols(self) -> List[str]:
+        """Symbols with at least one level to watch"""
+        with self._lock:
+            return [symbol for symbol, index in self._indexes.items() if len(index)]
+
+    def has_levels(self, symbol: str) -> bool:
+        index = self._indexes.get(symbol)
+        return index is not None and len(index) > 0
+
+    def on_price(self, symbol: str, price: float, now: Optional[float] = None) -> List[Dict]:
+        """Alerts raised by a new price tick, nearest level first"""
+        now = time.time() if now is None else now
+        with self._lock:
+            previous = self._last_price.get(symbol)
+            self._last_price[symbol] = price
+            index = self._indexes.get(symbol)
+            if previous is None or index is None or price == previous:
+                return []
+
+            broken, reclaimed = index.crossed(previous, price)
+            approached = index.approached(previous, price, self.proximity_percent)
+            alerts = []
+            seen = set()
+            for kind, level_ids in (('break', broken), ('reclaim', reclaimed),
+                                    ('approach', approached)):
+                for level_id in level_ids:
+                    level = self._levels[level_id]
+                    if level['source'] == 'detected' or level['owner'] is None:
+                        # One broadcast alert per price, whichever list it came from
+                        key = (kind, level['price'])
+                        if key in seen:
+                            ALERTS_SUPPRESSED.inc()
+                            continue
+                        seen.add(key)
+                    last = self._last_alert.get((level_id, kind))
+                    if last is not None and now - last < self.cooldown:
+                        ALERTS_SUPPRESSED.inc()
+                        continue
+                    self._last_alert[(level_id, kind)] = now
+                    ALERTS.inc(type=kind, source=level['source'])
+                    alerts.append({
+                        'id': f"{level_id}:{kind}:{int(now * 1000)}",
+                        'symbol': symbol,
+                        'type': kind,
+                        'level': dict(level),
+                        'price': price,
+                        'previous_price': previous,
+                        'distance': round((price - level['price']) / price * 100, 4),
+                        'timestamp': int(now * 1000)
+                    })
+            alerts.sort(key=lambda alert: abs(alert['distance']))
+            return alerts
+
+    def _remove(self, level: Dict):
+        self._levels.pop(level['id'], None)
+        index = self._indexes.get(level['symbol'])
+        if index is not None:
+            index.remove(level['id'], level['price'])
+        if level.get('owner') is not None:
+            self._owned.get(level['owner'], set()).discard(level['id'])
+        for kind in ('break', 'reclaim', 'approach'):
+            self._last_alert.pop((level['id'], kind), None)
+
+    def _prune_cooldowns(self):
+        """Forget cooldowns of levels that no longer exist"""
+        for key in [key for key in self._last_alert if key[0] not in self._levels]:
+            del self._last_alert[key]
@@ -0,0 +1,187 @@
+import time
+import uuid
+from threading import Event, Lock, Thread
+from typing import Dict, Optional
+from backend.services.subscription_service import SubscriptionService
+from backend.utils.event_bus import EventBus
+from backend.utils.metrics import registry
+
+ROLES = ('all', 'web', 'ingest')
+
+IS_LEADER = registry.gauge('cluster_leader', '1 while this process is the ingest leader')
+WORKERS = registry.gauge('cluster_workers', 'Other web workers reporting subscriptions')
+REQUESTS = registry.counter('cluster_requests_total',
+                            'Client requests forwarded to or served for other workers',
+                            ('direction',))
+
+
+class ClusterService:
+    """Coordinates an ingest leader and stateless web workers over a message queue
+
+    Processes with the 'all' or 'ingest' role contend for a lease; the
+    holder publishes a 'leadership' event on its EventBus and runs ingest
+    until it loses the lease. Web workers ('all' or 'web') report their
+    subscription counts on a control channel every `heartbeat` seconds,
+    and as soon as they change, and forward client requests that need
+    market data to the leader, which answers the client through the
+    Socket.IO message queue. The leader also shares the latest price and
+    support payload of each pair, which workers keep for their REST API.
+    Workers that stop reporting are forgotten after three heartbeats.
+    """
+
+    def __init__(self, message_queue, subscriptions: SubscriptionService, role: str = 'all',
+                 channel: str = 'crypto-support-tracker', lease_ttl: float = 10.0,
+                 heartbeat: float = 2.0, worker_id: Optional[str] = None):
+        if role not in ROLES:
+            raise ValueError(f"Unknown cluster role: {role}")
+        self.message_queue = message_queue
+        self.subscriptions = subscriptions
+        self.role = role
+        self.channel = channel
+        self.lease_name = f"{channel}:leader"
+        self.lease_ttl = lease_ttl
+        self.heartbeat = heartbeat
+        self.worker_id = worker_id or uuid.uuid4().hex
+        self.is_leader = False
+        self.event_bus = None
+        self._reported = None  # counts last published
+        self._seen = {}  # worker id -> time of its last report
+        self._lock = Lock()
+        self._stop = Event()
+        self._threads = []
+
+    @property
+    def contends(self) -> bool:
+        return self.role in ('all', 'ingest')
+
+    @property
+    def serves_clients(self) -> bool:
+        return self.role in ('all', 'web')
+
+    def attach_event_bus(self, event_bus: EventBus):
+        """Publish 'leadership' and (on the leader) 'client_request' events"""
+        self.event_bus = event_bus
+
+    def start(self):
+        """Start the election/heartbeat and control channel threads"""
+        if self._threads:
+            return
+        self._stop.clear()
+        self._threads = [Thread(target=self._run_heartbeat, daemon=True),
+                         Thread(target=self._run_listener, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Give up leadership and leave the cluster"""
+        self._stop.set()
+        for thread in self._threads[:1]:
+            thread.join()
+        self._threads = []
+        if self.is_leader:
+            self.message_queue.release(self.lease_name, self.worker_id)
+            self._set_leader(False)
+        if self.serves_clients:
+            self.message_queue.publish(self.channel, {'type': 'leave', 'worker': self.worker_id})
+
+    def request(self, action: str, client: Dict, data: Optional[Dict] = None):
+        """Forward a client request to the leader"""
+        REQUESTS.inc(direction='forwarded')
+        self.message_queue.publish(self.channel, {
+            'type': 'request',
+            'worker': self.worker_id,
+            'action': action,
+            'client': client,
+            'data': data or {}
+        })
+
+    def share(self, pair: str, event: str, payload):
+        """Publish a pair's latest broadcast payload to the other workers"""
+        self.message_queue.publish(self.channel, {
+            'type': 'latest',
+            'worker': self.worker_id,
+            'pair': pair,
+            'event': event,
+            'payload': payload
+        })
+
+    def report(self, force: bool = False):
+        """Publish this worker's subscription counts if they changed"""
+        counts = self.subscriptions.local_counts()
+        with self._lock:
+            if not force and counts == self._reported:
+                return
+            self._reported = counts
+        self.message_queue.publish(self.channel, {
+            'type': 'subscriptions',
+            'worker': self.worker_id,
+            'counts': [[*key, count] for key, count in counts.items()]
+        })
+
+    def _run_heartbeat(self):
+        # Change checks run more often than full reports and lease renewals
+        poll = min(0.25, self.heartbeat)
+        next_heartbeat = next_renewal = 0.0
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if self.contends and now >= next_renewal:
+                self._set_leader(self.message_queue.acquire(self.lease_name, self.worker_id,
+                                                            self.lease_ttl))
+                next_renewal = now + self.lease_ttl / 3
+            if self.serves_clients:
+                self.report(force=now >= next_heartbeat)
+            if now >= next_heartbeat:
+                next_heartbeat = now + self.heartbeat
+                self._expire_workers(now)
+            self._stop.wait(poll)
+
+    def _run_listener(self):
+        for message in self.message_queue.listen(self.channel):
+            if self._stop.is_set():
+                return
+            try:
+                self._handle(message)
+            except Exception as e:
+                print(f"Error handling cluster message: {str(e)}")
+
+    def _handle(self, message: Dict):
+        worker = message.get('worker')
+        if worker == self.worker_id:
+            return
+        if message['type'] == 'subscriptions':
+            with self._lock:
+                self._seen[worker] = time.monotonic()
+            self.subscriptions.set_remote(
+                worker, {tuple(entry[:3]): entry[3] for entry in message['counts']}
+            )
+        elif message['type'] == 'leave':
+            with self._lock:
+                self._seen.pop(worker, None)
+            self.subscriptions.set_remote(worker, None)
+        elif message['type'] == 'latest':
+            self.subscriptions.remember(message['pair'], message['event'], message['payload'])
+            return
+        elif message['type'] == 'request' and self.is_leader and self.event_bus:
+            REQUESTS.inc(direction='served')
+            self.event_bus.publish('client_request', message)
+        WORKERS.set(len(self._seen))
+
+    def _expire_workers(self, now: float):
+        with self._lock:
+            expired = [worker for worker, seen in self._seen.items()
+                       if now - seen > 3 * self.heartbeat]
+            for worker in expired:
+                del self._seen[worker]
+        for worker in expired:
+            print(f"Worker {worker} stopped reporting, dropping its subscriptions")
+            self.subscriptions.set_remote(worker, None)
+        WORKERS.set(len(self._seen))
+
+    def _set_leader(self, leader: bool):
+        if leader == self.is_leader:
+            return
+        self.is_leader = leader
+        IS_LEADER.set(1 if leader else 0)
+        print(f"Worker {self.worker_id} {'is now' if leader else 'is no longer'} the ingest leader")
+        if self.event_bus:
+            self.event_bus.publish('leadership', {'leader': leader, 'worker': self.worker_id})
@@ -0,0 +1,173 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from backend.utils.metrics import registry
+from backend.utils.support_detector import SupportDetector
+
+# Per-process detector, created once by the pool initializer
+_worker_detector = None
+
+POOL_RESTARTS = registry.counter('detection_pool_restarts_total',
+                                 'Detection process pools replaced after a worker died')
+
+
+def _init_worker(detector_params: Dict, detector_settings: Dict):
+    """Create the detector used by every task in this worker process"""
+    global _worker_detector
+    _worker_detector = SupportDetector(**detector_params)
+    for name, value in detector_settings.items():
+        setattr(_worker_detector, name, value)
+
+
+def _block_views(shm: shared_memory.SharedMemory, total: int):
+    """Views of a batch block: (2, total) lows/volumes and total int64 timestamps"""
+    prices = np.ndarray((2, total), dtype=np.float64, buffer=shm.buf)
+    times = np.ndarray((total,), dtype=np.int64, buffer=shm.buf, offset=prices.nbytes)
+    return prices, times
+
+
+def _detect_task(shm_name: str, symbol: str, interval: str, offset: int, length: int,
+                 total: int) -> Tuple[List[Dict], Any, float, int]:
+    """Run detection over one task's slice of the shared OHLCV block
+
+    Also returns the incremental state, so the parent can keep the levels
+    current as candles close without detecting from scratch.
+    """
+    started = time.perf_counter()
+    # Workers share the parent's resource tracker, which owns the block
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        prices, times = _block_views(shm, total)
+        lows = prices[0, offset:offset + length]
+        volumes = prices[1, offset:offset + length]
+        timestamps = times[offset:offset + length].view('datetime64[ns]')
+        # The state copies the slice, so it outlives the block
+        levels = _worker_detector.update_from_arrays(symbol, interval, lows, volumes, timestamps)
+        state = _worker_detector.pop_state(symbol, interval)
+        # Drop views into the block before closing it
+        del prices, times, lows, volumes, timestamps
+    finally:
+        shm.close()
+    return levels, state, time.perf_counter() - started, os.getpid()
+
+
+class DetectionPool:
+    """Fans support detection for many symbol/interval pairs over processes
+
+    OHLCV columns for a whole batch are packed into one shared-memory block,
+    so workers receive only offsets instead of pickled DataFrames. If a
+    worker dies, the pairs still in flight fail for that batch and the
+    broken pool is replaced on the next one.
+    """
+
+    def __init__(self, support_detector: SupportDetector, max_workers: Optional[int] = None):
+        self.support_detector = support_detector
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            detector = self.support_detector
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=({
+                    'min_touches': detector.min_touches,
+                    'min_distance_percent': detector.min_distance_percent,
+                    'engine': detector.engine
+                }, {
+                    'window_size': detector.window_size,
+                    'tolerance': detector.tolerance
+                })
+            )
+        return self._executor
+
+    def run(self, candles: Dict[Tuple[str, str], pd.DataFrame]) -> Dict[Tuple[str, str], Dict]:
+        """Detect support levels for every (symbol, interval) DataFrame
+
+        Returns `{(symbol, interval): {'levels', 'state', 'candles',
+        'detect_time', 'wall_time', 'worker'}}`; times are in seconds and
+        'state' is the detector's incremental state for the pair.
+        """
+        tasks = [(key, df) for key, df in candles.items() if df is not None and len(df)]
+        if not tasks:
+            return {}
+
+        total = sum(len(df) for _, df in tasks)
+        shm = shared_memory.SharedMemory(create=True, size=3 * total * 8)
+        results = {}
+        try:
+            prices, times = _block_views(shm, total)
+            offsets = {}
+            offset = 0
+            for key, df in tasks:
+                length = len(df)
+                prices[0, offset:offset + length] = df['low'].values
+                prices[1, offset:offset + length] = df['volume'].values
+                times[offset:offset + length] = \
+                    df['timestamp'].values.astype('datetime64[ns]').view(np.int64)
+                offsets[key] = (offset, length)
+                offset += length
+            del prices, times
+
+            submitted = {}
+            broken = None
+            try:
+                submitted = self._submit(shm.name, offsets, total)
+            except BrokenProcessPool:
+                # A worker died after the previous batch: start this one on a new pool
+                POOL_RESTARTS.inc()
+                self.shutdown()
+                try:
+                    submitted = self._submit(shm.name, offsets, total)
+                except BrokenProcessPool as e:
+                    broken = e
+
+            for future in as_completed(submitted):
+                key, started = submitted[future]
+                try:
+                    levels, state, detect_time, worker = future.result()
+                except BrokenProcessPool as e:
+                    broken = e
+                    continue
+                except Exception as e:
+                    print(f"Error detecting supports for {key[0]} {key[1]}: {str(e)}")
+                    continue
+                results[key] = {
+                    'levels': levels,
+                    'state': state,
+                    'candles': offsets[key][1],
+                    'detect_time': detect_time,
+                    'wall_time': time.perf_counter() - started,
+                    'worker': worker
+                }
+            if broken is not None:
+                print(f"Error detecting supports for {len(offsets) - len(results)} pairs, "
+                      f"restarting the detection pool: {str(broken)}")
+                POOL_RESTARTS.inc()
+                self.shutdown()
+        finally:
+            shm.close()
+            shm.unlink()
+        return results
+
+    def _submit(self, shm_name: str, offsets: Dict[Tuple[str, str], Tuple[int, int]],
+                total: int) -> Dict:
+        """Submit one detection task per pair; returns {future: (key, submit time)}"""
+        executor = self._get_executor()
+        submitted = {}
+        for key, (offset, length) in offsets.items():
+            future = executor.submit(_detect_task, shm_name, key[0], key[1], offset, length, total)
+            submitted[future] = (key, time.perf_counter())
+        return submitted
+
+    def shutdown(self):
+        """Stop the worker processes; the next batch starts a new pool"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,98 @@
+import time
+from threading import Lock, Thread
+from typing import Dict, List, Optional
+from backend.utils.binance_client import BinanceClient
+from backend.utils.event_bus import EventBus
+from backend.utils.metrics import registry
+from backend.utils.order_book import OrderBook
+
+BOOK_RESYNCS = registry.counter('order_book_resyncs_total',
+                                'Order book snapshots fetched after a gap or on start', ('symbol',))
+
+
+class OrderBookService:
+    """Local order books per symbol from depth snapshots plus streamed diffs
+
+    Consumes 'depth' events from the EventBus. Until a book is synced,
+    diffs are buffered while its REST snapshot is fetched on a separate
+    thread, so the stream thread never waits on REST. A sequence gap
+    triggers a fresh snapshot the same way.
+    """
+
+    def __init__(self, binance_client: BinanceClient, snapshot_limit: int = 1000,
+                 max_levels: int = 5000, wall_distance_percent: float = 5.0,
+                 wall_bucket_percent: float = 0.05, wall_multiple: float = 5.0,
+                 max_buffered: int = 1000, retry_delay: float = 5.0):
+        self.binance_client = binance_client
+        self.snapshot_limit = snapshot_limit
+        self.max_levels = max_levels
+        self.wall_distance_percent = wall_distance_percent
+        self.wall_bucket_percent = wall_bucket_percent
+        self.wall_multiple = wall_multiple
+        self.max_buffered = max_buffered
+        self.retry_delay = retry_delay
+        self._books = {}  # symbol -> OrderBook
+        self._buffers = {}  # symbol -> diffs received while syncing
+        self._syncing = set()
+        self._retry_at = {}  # symbol -> earliest time to retry a failed snapshot
+        self._lock = Lock()
+
+    def attach_event_bus(self, event_bus: EventBus):
+        """Maintain books from streamed 'depth' events"""
+        event_bus.subscribe('depth', self.apply_diff)
+
+    def apply_diff(self, diff: Dict):
+        """Apply one parsed depth event, (re)syncing the book when needed"""
+        symbol = diff['symbol']
+        with self._lock:
+            book = self._books.get(symbol)
+            if book is not None and book.synced:
+                if book.apply_diff(diff):
+                    return
+                print(f"Order book gap for {symbol}, resyncing")
+            buffer = self._buffers.setdefault(symbol, [])
+            buffer.append(diff)
+            if len(buffer) > self.max_buffered:
+                del buffer[0]
+            if symbol in self._syncing or time.monotonic() < self._retry_at.get(symbol, 0):
+                return
+            self._syncing.add(symbol)
+        Thread(target=self._sync, args=(symbol,), daemon=True).start()
+
+    def get_book(self, symbol: str) -> Optional[OrderBook]:
+        """The symbol's book, if it is in sync"""
+        book = self._books.get(symbol)
+        return book if book is not None and book.synced else None
+
+    def get_walls(self, symbol: str, side: str = 'bids') -> List[Dict]:
+        """Liquidity walls on one side of a symbol's book (bids are supports)"""
+        with self._lock:
+            book = self.get_book(symbol)
+            if book is None:
+                return []
+            return book.walls(side, self.wall_distance_percent,
+                              self.wall_bucket_percent, self.wall_multiple)
+
+    def _sync(self, symbol: str):
+        """Load a snapshot, then replay the diffs buffered meanwhile"""
+        try:
+            BOOK_RESYNCS.inc(symbol=symbol)
+            snapshot = self.binance_client.get_depth(symbol, self.snapshot_limit)
+            with self._lock:
+                if snapshot is None:
+                    self._retry_at[symbol] = time.monotonic() + self.retry_delay
+                    return
+                book = OrderBook(symbol, self.max_levels)
+                book.apply_snapshot(snapshot)
+                buffered = self._buffers.pop(symbol, [])
+                for diff in buffered:
+                    if not book.apply_diff(diff):
+                        # The snapshot is older than the buffered diffs;
+                        # the next diff starts another sync
+                        break
+                self._books[symbol] = book
+        except Exception as e:
+            print(f"Error syncing order book for {symbol}: {str(e)}")
+        finally:
+            with self._lock:
+                self._syncing.discard(symbol)
@@ -1,92 +1,213 @@
+import time
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from backend.utils.binance_client import BinanceClient
+from backend.utils.cache import Cache, estimate_size
+from backend.utils.event_bus import EventBus
+from backend.utils.kline_store import KlineStore
+from backend.utils.metrics import COMPUTE_BUCKETS, registry
+from backend.utils.timeframe_aggregator import TimeframeAggregator
+from backend.utils.volume_profile import volume_profile_from_frame
+
+# Chart payload layouts: one dict per candle, or parallel arrays per field
+CHART_FORMATS = ('rows', 'columnar')
+
+VOLUME_PROFILE_SECONDS = registry.histogram(
+    'volume_profile_seconds', 'Volume profile computation time per symbol/interval',
+    ('symbol', 'interval', 'mode'), COMPUTE_BUCKETS
+)
 
 class PriceService:
-    def __init__(self, binance_client: BinanceClient):
+    def __init__(self, binance_client: BinanceClient, volume_profile_bins: int = 50,
+                 tick_size: Optional[float] = None,
+                 kline_store: Optional[KlineStore] = None,
+                 cache_bytes: int = 64 * 1024 * 1024,
+                 timeframe_aggregator: Optional[TimeframeAggregator] = None):
         self.binance_client = binance_client
-        self._price_cache = {}
-        self._historical_cache = {}
-        self._cache_timeout = timedelta(minutes=5)
-        self._last_update = {}
+        self.kline_store = kline_store
+        self.timeframe_aggregator = timeframe_aggregator
+        self.volume_profile_bins = volume_profile_bins
+        self.tick_size = tick_size
+        self._price_cache = {}  # symbol -> (received at, streamed ticker)
+        self._stream_max_age = 5  # seconds before falling back to REST
+        self._cache_timeout = 300  # seconds
+        # (symbol, interval, limit) -> DataFrame
+        self._historical_frames = Cache(max_bytes=cache_bytes // 2, ttl=self._cache_timeout)
+        # (symbol, interval, limit, fmt) -> (source DataFrame, chart payload)
+        self._historical_cache = Cache(max_bytes=cache_bytes // 2, ttl=self._cache_timeout,
+                                       sizeof=lambda entry: estimate_size(entry[1]))
 
     def get_current_price(self, symbol: str) -> Optional[Dict]:
-        """Get current price data for a symbol"""
+        """Get current price data for a symbol
+
+        Prefers the latest streamed ticker and falls back to REST when the
+        stream has nothing recent for the symbol.
+        """
+        streamed = self._price_cache.get(symbol)
+        if streamed and time.time() - streamed[0] < self._stream_max_age:
+            return streamed[1]
         return self.binance_client.get_current_price(symbol)
 
+    def get_current_prices(self, symbols: List[str]) -> Dict[str, Dict]:
+        """Current price data for many symbols
+
+        Recently streamed tickers are used as they are; the rest are fetched
+        in one bulk request.
+        """
+        now = time.time()
+        prices = {}
+        missing = []
+        for symbol in symbols:
+            streamed = self._price_cache.get(symbol)
+            if streamed and now - streamed[0] < self._stream_max_age:
+                prices[symbol] = streamed[1]
+            else:
+                missing.append(symbol)
+        if missing:
+            fetched = self.binance_client.get_current_prices(missing)
+            prices.update({symbol: fetched[symbol] for symbol in missing if symbol in fetched})
+        return prices
+
+    def attach_event_bus(self, event_bus: EventBus):
+        """Consume streamed tickers and klines instead of polling REST"""
+        event_bus.subscribe('ticker', self._on_ticker)
+        event_bus.subscribe('kline', self._on_kline)
+
+    def _on_ticker(self, price_data: Dict):
+        self._price_cache[price_data['symbol']] = (time.time(), price_data)
+
+    def _on_kline(self, candle: Dict):
+        # A closed candle makes the cached history for that interval stale
+        if candle['closed']:
+            series = (candle['symbol'], candle['interval'])
+            stale = lambda key: key[:2] == series
+            aggregator = self.timeframe_aggregator
+            if aggregator is not None and candle['interval'] == aggregator.base_interval:
+                # Every derived timeframe changed with it
+                stale = lambda key: key[0] == series[0]
+            self._historical_frames.invalidate_where(stale)
+            # Volume profiles are part of the payloads, so they are rebuilt
+            # from the refetched window with them
+            self._historical_cache.invalidate_where(stale)
+
     def get_historical_data(self, symbol: str, interval: str, 
-                          limit: int = 500) -> Optional[Dict]:
-        """Get historical price data with caching"""
-        cache_key = f"{symbol}_{interval}"
-        now = datetime.now()
-
-        # Check cache
-        if cache_key in self._historical_cache:
-            last_update = self._last_update.get(cache_key)
-            if last_update and (now - last_update) < self._cache_timeout:
-                return self._historical_cache[cache_key]
-
-        # Fetch new data
-        df = self.binance_client.get_historical_data(symbol, interval, limit)
+                          limit: int = 500, fmt: str = 'rows') -> Optional[Dict]:
+        """Get historical price data with caching
+
+        `fmt` selects the chart payload layout, see `_process_historical_data`.
+        Concurrent misses for the same candles share one upstream fetch.
+        """
+        if fmt not in CHART_FORMATS:
+            raise ValueError(f"Unknown chart format: {fmt}")
+
+        # Fetch candles, resampled from one base series or from the local
+        # store when there is one
+        source = self.timeframe_aggregator or self.kline_store or self.binance_client
+        df = self._historical_frames.get_or_load(
+            (symbol, interval, limit),
+            lambda: source.get_historical_data(symbol, interval, limit)
+        )
         if df is None:
             return None
 
-        # Process data for chart
-        processed_data = self._process_historical_data(df)
-        
-        # Update cache
-        self._historical_cache[cache_key] = processed_data
-        self._last_update[cache_key] = now
+        # Same candles in any layout are processed once
+        payload_key = (symbol, interval, limit, fmt)
+        entry = self._historical_cache.get_or_load(
+            payload_key, lambda: (df, self._process_historical_data(df, fmt, symbol, interval))
+        )
+        if entry[0] is not df:
+            # Built from candles that have since been refetched
+            self._historical_cache.invalidate(payload_key)
+            entry = self._historical_cache.get_or_load(
+                payload_key, lambda: (df, self._process_historical_data(df, fmt, symbol, interval))
+            )
+        return entry[1]
 
-        return processed_data
+    def get_cache_stats(self) -> Dict[str, Dict]:
+        """Hit/miss statistics of the candle and chart payload caches"""
+        return {
+            'frames': self._historical_frames.stats(),
+            'payloads': self._historical_cache.stats()
+        }
+
+    def _process_historical_data(self, df: pd.DataFrame, fmt: str = 'rows',
+                                 symbol: str = '', interval: str = '') -> Dict:
+        """Process historical data for chart display
 
-    def _process_historical_data(self, df: pd.DataFrame) -> Dict:
-        """Process historical data for chart display"""
+        'rows' emits one dict per candle with ISO timestamps. 'columnar' emits
+        parallel arrays with epoch-ms timestamps, which is much cheaper to
+        build and to send. `symbol` and `interval` only label metrics.
+        """
+        if fmt == 'columnar':
+            price = self._columnar_candles(df)
+        else:
+            price = self._row_candles(df)
+        # Rebuilt for every window, so the bins depend only on its candles
+        started = time.perf_counter()
+        volume_profile = self._calculate_volume_profile(df)
+        VOLUME_PROFILE_SECONDS.observe(time.perf_counter() - started,
+                                       symbol=symbol, interval=interval, mode='full')
         return {
-            'price': [{
-                'timestamp': row['timestamp'].isoformat(),
-                'open': float(row['open']),
-                'high': float(row['high']),
-                'low': float(row['low']),
-                'close': float(row['close']),
-                'volume': float(row['volume'])
-            } for _, row in df.iterrows()],
-            'volume_profile': self._calculate_volume_profile(df)
+            'format': fmt,
+            'price': price,
+            'volume_profile': volume_profile
         }
 
+    def _row_candles(self, df: pd.DataFrame) -> List[Dict]:
+        """One dict per candle, built column-wise instead of with iterrows"""
+        timestamps = [ts.isoformat() for ts in pd.DatetimeIndex(df['timestamp'])]
+        columns = [df[col].to_numpy(dtype=np.float64).tolist()
+                   for col in ('open', 'high', 'low', 'close', 'volume')]
+        return [{
+            'timestamp': timestamp,
+            'open': open_,
+            'high': high,
+            'low': low,
+            'close': close,
+            'volume': volume
+        } for timestamp, open_, high, low, close, volume in zip(timestamps, *columns)]
+
+    def _columnar_candles(self, df: pd.DataFrame) -> Dict[str, List]:
+        """Parallel arrays per candle field with epoch-ms timestamps"""
+        timestamps = df['timestamp'].to_numpy().astype('datetime64[ms]').astype(np.int64)
+        payload = {'timestamp': timestamps.tolist()}
+        for col in ('open', 'high', 'low', 'close', 'volume'):
+            payload[col] = df[col].to_numpy(dtype=np.float64).tolist()
+        return payload
+
     def _calculate_volume_profile(self, df: pd.DataFrame, 
-                                num_bins: int = 50) -> Dict:
-        """Calculate volume profile for price levels"""
-        price_range = df['high'].max() - df['low'].min()
-        bin_size = price_range / num_bins
-        
-        volume_profile = []
-        current_price = df['low'].min()
-        
-        for _ in range(num_bins):
-            mask = (df['low'] <= current_price + bin_size) & \
-                  (df['high'] >= current_price)
-            volume = df.loc[mask, 'volume'].sum()
-            
-            if volume > 0:
-                volume_profile.append({
-                    'price_level': float(current_price),
-                    'volume': float(volume)
-                })
-            
-            current_price += bin_size
-
-        return volume_profile
+                                num_bins: Optional[int] = None,
+                                tick_size: Optional[float] = None) -> List[Dict]:
+        """Calculate volume profile for price levels
+
+        Each candle's volume is spread across its high-low range in a single
+        vectorized pass, see `VolumeProfile`.
+        """
+        if df is None or df.empty:
+            return []
+        return volume_profile_from_frame(
+            df, num_bins or self.volume_profile_bins, tick_size or self.tick_size
+        ).levels()
+
+    def export_state(self) -> Dict:
+        """Cached candles and chart payloads for a snapshot"""
+        return {
+            'frames': self._historical_frames.export(),
+            'payloads': self._historical_cache.export()
+        }
+
+    def restore_state(self, state: Dict, age: float = 0.0):
+        """Reload a snapshot taken `age` seconds ago; expired entries are skipped"""
+        self._historical_frames.restore(state.get('frames', []), age)
+        self._historical_cache.restore(state.get('payloads', []), age)
 
     def invalidate_cache(self, symbol: str = None):
         """Invalidate cache for a symbol or all symbols"""
         if symbol:
-            keys_to_remove = [k for k in self._historical_cache.keys() 
-                            if k.startswith(symbol)]
-            for key in keys_to_remove:
-                self._historical_cache.pop(key, None)
-                self._last_update.pop(key, None)
+            # Exact symbol match: 'BTC' must not evict 'BTCDOWNUSDT'
+            self._historical_cache.invalidate_where(lambda key: key[0] == symbol)
+            self._historical_frames.invalidate_where(lambda key: key[0] == symbol)
         else:
             self._historical_cache.clear()
-            self._last_update.clear()
\ No newline at end of file
+            self._historical_frames.clear()
\ No newline at end of file
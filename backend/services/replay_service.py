@@ -0,0 +1,323 @@
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List
+import numpy as np
+import pandas as pd
+from backend.utils.support_detector import SupportDetector
+
+# Kline files the replay reads, e.g. data.binance.vision dumps
+# (BTCUSDT-1m-2023-01.zip) or exports named BTCUSDT_1m.parquet
+KLINE_EXTENSIONS = ('.csv', '.csv.gz', '.zip', '.parquet')
+
+# Columns read from headerless Binance kline CSVs (open time, low, close, volume)
+_BINANCE_CSV_COLUMNS = {0: 'timestamp', 3: 'low', 4: 'close', 5: 'volume'}
+
+# Tracked level states
+_ARMED, _TESTING = 0, 1
+
+
+def find_kline_files(data_dir: str, symbol: str, interval: str) -> List[str]:
+    """Kline files for a symbol/interval under `data_dir`, in name (= date) order"""
+    paths = []
+    for separator in ('-', '_'):
+        pattern = os.path.join(data_dir, '**', f"{symbol}{separator}{interval}*")
+        paths.extend(path for path in glob.glob(pattern, recursive=True)
+                     if path.endswith(KLINE_EXTENSIONS))
+    return sorted(set(paths), key=os.path.basename)
+
+
+def read_klines(path: str, chunk_size: int = 100_000) -> Iterator[Dict[str, np.ndarray]]:
+    """Stream epoch-ms timestamp, low, close and volume columns in chunks
+
+    CSVs may be headerless Binance dumps or have a header naming
+    `timestamp` (or `open_time`), `low`, `close` and `volume`; Parquet needs
+    pyarrow. Microsecond timestamps (Binance spot dumps since 2025) are
+    converted to milliseconds.
+    """
+    if path.endswith('.parquet'):
+        chunks = _read_parquet(path, chunk_size)
+    else:
+        chunks = _read_csv(path, chunk_size)
+    for chunk in chunks:
+        timestamps = chunk['timestamp'].to_numpy(dtype=np.int64)
+        if len(timestamps) and timestamps[0] > 10 ** 14:
+            timestamps = timestamps // 1000
+        yield {
+            'timestamp': timestamps,
+            'low': chunk['low'].to_numpy(dtype=np.float64),
+            'close': chunk['close'].to_numpy(dtype=np.float64),
+            'volume': chunk['volume'].to_numpy(dtype=np.float64)
+        }
+
+
+def _read_csv(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    first = pd.read_csv(path, header=None, nrows=1).iloc[0, 0]
+    if isinstance(first, str) and not first.strip().isdigit():
+        header = pd.read_csv(path, nrows=0).columns
+        timestamp = 'timestamp' if 'timestamp' in header else 'open_time'
+        reader = pd.read_csv(path, usecols=[timestamp, 'low', 'close', 'volume'],
+                             chunksize=chunk_size)
+        for chunk in reader:
+            yield chunk.rename(columns={timestamp: 'timestamp'})
+        return
+    reader = pd.read_csv(path, header=None, usecols=list(_BINANCE_CSV_COLUMNS),
+                         chunksize=chunk_size)
+    for chunk in reader:
+        yield chunk.rename(columns=_BINANCE_CSV_COLUMNS)
+
+
+def _read_parquet(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading Parquet klines needs pyarrow (pip install pyarrow)")
+    parquet_file = pq.ParquetFile(path)
+    names = parquet_file.schema_arrow.names
+    timestamp = 'timestamp' if 'timestamp' in names else 'open_time'
+    for batch in parquet_file.iter_batches(batch_size=chunk_size,
+                                           columns=[timestamp, 'low', 'close', 'volume']):
+        chunk = batch.to_pandas().rename(columns={timestamp: 'timestamp'})
+        if np.issubdtype(chunk['timestamp'].dtype, np.datetime64):
+            chunk['timestamp'] = chunk['timestamp'].values.astype('datetime64[ms]').astype(np.int64)
+        yield chunk
+
+
+class _LevelBook:
+    """Levels being tracked, as parallel arrays for vectorized checks"""
+
+    def __init__(self, tolerance: float, break_percent: float, bounce_percent: float,
+                 horizon: int):
+        self.tolerance = tolerance
+        self.break_factor = 1 - break_percent / 100
+        self.bounce_factor = 1 + bounce_percent / 100
+        self.horizon = horizon
+        self.prices = np.empty(0)
+        self.states = np.empty(0, dtype=np.int8)
+        self.expires = np.empty(0, dtype=np.int64)  # candle index the level expires at
+        self.records = []  # one dict per tracked level, aligned with the arrays
+        self.finished = []
+        self.skipped = 0  # detected levels already broken when reported
+
+    def track(self, levels: List[Dict], index: int, timestamp: int, close: float):
+        """Start tracking newly detected levels; refresh ones already tracked
+
+        Levels the close is already below the break threshold of are
+        resistance rather than support at this point, and are only counted.
+        """
+        added = []
+        for level in levels:
+            price = level['price']
+            if close < price * self.break_factor:
+                self.skipped += 1
+                continue
+            same = np.flatnonzero(np.abs(self.prices - price) <= price * self.tolerance)
+            if len(same):
+                self.records[same[0]]['detections'] += 1
+                self.expires[same[0]] = max(self.expires[same[0]], index + self.horizon)
+                continue
+            self.records.append({
+                'price': price,
+                'strength': level['strength'],
+                'touches': level['touches'],
+                'detected_at': timestamp,
+                'detections': 1,
+                'hits': 0,
+                'bounces': 0,
+                'first_hit_at': None,
+                'ended_at': None,
+                'status': 'open'
+            })
+            added.append(price)
+        if not added:
+            return
+        added = np.array(added)
+        # Levels the close is inside the band of are already being tested
+        states = np.where(close > added * (1 + self.tolerance), _ARMED, _TESTING)
+        self.prices = np.concatenate([self.prices, added])
+        self.states = np.concatenate([self.states, states.astype(np.int8)])
+        self.expires = np.concatenate([self.expires, np.full(len(added), index + self.horizon)])
+
+    def evaluate(self, lows: np.ndarray, closes: np.ndarray, timestamps: np.ndarray,
+                 offset: int):
+        """Record hits, bounces, breaks and expiries over consecutive candles
+
+        Only levels with a possible event in the segment are walked candle
+        by candle; the rest are ruled out with one comparison matrix each.
+        """
+        if not len(self.prices) or not len(lows):
+            return
+        prices = self.prices[:, None]
+        touched = (lows[None, :] <= prices * (1 + self.tolerance)).any(axis=1) & \
+            (self.states == _ARMED)
+        broken = (closes[None, :] < prices * self.break_factor).any(axis=1)
+        bounced = (closes[None, :] >= prices * self.bounce_factor).any(axis=1) & \
+            (self.states == _TESTING)
+        expiring = self.expires < offset + len(lows)
+        candidates = np.flatnonzero(touched | broken | bounced | expiring)
+        if not len(candidates):
+            return
+
+        retired = []
+        for i in candidates:
+            record = self.records[i]
+            price = self.prices[i]
+            upper = price * (1 + self.tolerance)
+            floor = price * self.break_factor
+            target = price * self.bounce_factor
+            state = self.states[i]
+            for j in range(len(lows)):
+                index = offset + j
+                if index >= self.expires[i]:
+                    record['status'] = 'expired'
+                    record['ended_at'] = int(timestamps[j])
+                    retired.append(i)
+                    break
+                if state == _ARMED and lows[j] <= upper:
+                    state = _TESTING
+                    record['hits'] += 1
+                    if record['first_hit_at'] is None:
+                        record['first_hit_at'] = int(timestamps[j])
+                    self.expires[i] = max(self.expires[i], index + self.horizon)
+                if closes[j] < floor:
+                    record['status'] = 'broken'
+                    record['ended_at'] = int(timestamps[j])
+                    retired.append(i)
+                    break
+                if state == _TESTING and closes[j] >= target:
+                    state = _ARMED
+                    record['bounces'] += 1
+                    self.expires[i] = max(self.expires[i], index + self.horizon)
+            self.states[i] = state
+
+        if retired:
+            keep = np.ones(len(self.prices), dtype=bool)
+            keep[retired] = False
+            self.finished.extend(self.records[i] for i in retired)
+            self.records = [record for record, kept in zip(self.records, keep) if kept]
+            self.prices = self.prices[keep]
+            self.states = self.states[keep]
+            self.expires = self.expires[keep]
+
+    def all_records(self) -> List[Dict]:
+        return self.finished + self.records
+
+
+class ReplayService:
+    """Replays historical klines through the support detector
+
+    Candles are streamed from local files in chunks, and the detector runs
+    every `detect_every` candles over the latest `window` of them, as the
+    live app does. Each detected level is then followed through the
+    candles that come after its detection: a low inside its tolerance band
+    is a hit, a close `bounce_percent` above it after a hit is a bounce,
+    and a close `break_percent` below it breaks (and retires) it. Levels
+    with no detection or event for `horizon` candles expire. Memory stays
+    bounded by `chunk_size + window` candles plus the level records.
+    """
+
+    def __init__(self, support_detector: SupportDetector, window: int = 500,
+                 detect_every: int = 15, horizon: int = 1000,
+                 break_percent: float = 0.5, bounce_percent: float = 1.0,
+                 chunk_size: int = 100_000):
+        if window < 2 * support_detector.window_size:
+            raise ValueError(f"Replay window must be at least {2 * support_detector.window_size} candles")
+        self.support_detector = support_detector
+        self.window = window
+        self.detect_every = detect_every
+        self.horizon = horizon
+        self.break_percent = break_percent
+        self.bounce_percent = bounce_percent
+        self.chunk_size = chunk_size
+
+    def replay_symbol(self, symbol: str, paths: Iterable[str]) -> Dict:
+        """Replay one symbol's kline files; returns its summary and level records"""
+        started = time.perf_counter()
+        detector = self.support_detector
+        book = _LevelBook(detector.tolerance, self.break_percent, self.bounce_percent,
+                          self.horizon)
+        tail = {name: np.empty(0, dtype=np.int64 if name == 'timestamp' else np.float64)
+                for name in ('timestamp', 'low', 'close', 'volume')}
+        seen = 0  # candles before the tail
+        detections = 0
+
+        for path in paths:
+            for chunk in read_klines(path, self.chunk_size):
+                data = {name: np.concatenate([tail[name], chunk[name]]) for name in tail}
+                base = seen  # candle index of data[*][0]
+                lows, closes = data['low'], data['close']
+                timestamps = data['timestamp']
+                start = len(tail['low'])
+
+                # Detection points: candle indices the live app would refresh at
+                first = base + start
+                end = base + len(lows)
+                point = max(first, self.window - 1)
+                point += (-(point + 1)) % self.detect_every
+                while point < end:
+                    local = point - base
+                    book.evaluate(lows[start:local + 1], closes[start:local + 1],
+                                  timestamps[start:local + 1], base + start)
+                    start = local + 1
+                    window = slice(start - self.window, start)
+                    levels = detector.detect_from_arrays(
+                        symbol, lows[window], data['volume'][window],
+                        timestamps[window].view('datetime64[ms]')
+                    )
+                    detections += 1
+                    book.track(levels, point, int(timestamps[local]), float(closes[local]))
+                    point += self.detect_every
+                book.evaluate(lows[start:], closes[start:], timestamps[start:], base + start)
+
+                keep = min(self.window, len(lows))
+                tail = {name: values[-keep:].copy() for name, values in data.items()}
+                seen = end - keep
+
+        records = book.all_records()
+        for record in records:
+            for field in ('detected_at', 'first_hit_at', 'ended_at'):
+                if record[field] is not None:
+                    record[field] = pd.Timestamp(record[field], unit='ms').isoformat()
+        return {
+            'symbol': symbol,
+            'summary': self.summarize(records, seen + len(tail['low']), detections,
+                                      book.skipped, time.perf_counter() - started),
+            'levels': records
+        }
+
+    def replay(self, sources: Dict[str, List[str]], workers: int = 1) -> Dict[str, Dict]:
+        """Replay several symbols, one process per symbol when `workers` > 1"""
+        if workers <= 1 or len(sources) <= 1:
+            return {symbol: self.replay_symbol(symbol, paths) for symbol, paths in sources.items()}
+        with ProcessPoolExecutor(max_workers=min(workers, len(sources))) as executor:
+            futures = {symbol: executor.submit(self.replay_symbol, symbol, paths)
+                       for symbol, paths in sources.items()}
+            return {symbol: future.result() for symbol, future in futures.items()}
+
+    @staticmethod
+    def summarize(records: List[Dict], candles: int, detections: int,
+                  skipped: int, elapsed: float) -> Dict:
+        """Aggregate outcome of a symbol's levels
+
+        `hold_rate` is the share of resolved tests that bounced rather than
+        broke.
+        """
+        hits = sum(record['hits'] for record in records)
+        bounces = sum(record['bounces'] for record in records)
+        breaks = sum(record['status'] == 'broken' for record in records)
+        return {
+            'candles': candles,
+            'detections': detections,
+            'levels': len(records),
+            'skipped_below_price': skipped,
+            'levels_hit': sum(record['hits'] > 0 for record in records),
+            'hits': hits,
+            'bounces': bounces,
+            'breaks': breaks,
+            'expired': sum(record['status'] == 'expired' for record in records),
+            'open': sum(record['status'] == 'open' for record in records),
+            'hold_rate': round(bounces / (bounces + breaks), 4) if bounces + breaks else None,
+            'elapsed': round(elapsed, 3),
+            'candles_per_second': round(candles / elapsed) if elapsed else None
+        }
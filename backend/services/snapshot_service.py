@@ -0,0 +1,118 @@
+import os
+import pickle
+import struct
+import time
+import zlib
+from threading import Event, Thread
+from typing import Dict, Optional
+from backend.utils.metrics import COMPUTE_BUCKETS, registry
+
+# File layout: magic, format version, creation time (epoch seconds), then the
+# zlib-compressed pickle of {service name: exported state}
+SNAPSHOT_MAGIC = b'CSTSNAP\0'
+SNAPSHOT_VERSION = 2
+_HEADER = struct.Struct('<8sHd')
+
+SNAPSHOT_SECONDS = registry.histogram('snapshot_seconds', 'Time to save or restore a snapshot',
+                                      ('operation',), COMPUTE_BUCKETS)
+
+
+class SnapshotService:
+    """Periodic and on-shutdown snapshots of service state for warm restarts
+
+    Every service in `services` with `export_state`/`restore_state` is
+    included. A snapshot from another format version, or older than
+    `max_age` seconds, is ignored; restored cache entries lose the time
+    spent on disk from their TTL. Snapshots are pickles, so only point
+    `path` at files this process wrote.
+    """
+
+    def __init__(self, path: str, services: Dict[str, object], interval: float = 60.0,
+                 max_age: float = 900.0):
+        self.path = path
+        self.services = services
+        self.interval = interval
+        self.max_age = max_age
+        self._stop = Event()
+        self._thread = None
+
+    def save(self) -> bool:
+        """Write a snapshot, replacing the previous one atomically"""
+        started = time.perf_counter()
+        try:
+            state = {name: service.export_state() for name, service in self.services.items()
+                     if hasattr(service, 'export_state')}
+            body = zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL), 1)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, time.time()))
+                f.write(body)
+            os.replace(temp_path, self.path)
+            return True
+        except Exception as e:
+            print(f"Error saving snapshot: {str(e)}")
+            return False
+        finally:
+            SNAPSHOT_SECONDS.observe(time.perf_counter() - started, operation='save')
+
+    def restore(self) -> bool:
+        """Load the snapshot into the services, if there is a usable one"""
+        started = time.perf_counter()
+        try:
+            state, age = self._read()
+            if state is None:
+                return False
+            for name, service_state in state.items():
+                service = self.services.get(name)
+                if service is not None and hasattr(service, 'restore_state'):
+                    service.restore_state(service_state, age)
+            print(f"Restored snapshot from {self.path} ({age:.0f}s old)")
+            return True
+        except Exception as e:
+            print(f"Error restoring snapshot: {str(e)}")
+            return False
+        finally:
+            SNAPSHOT_SECONDS.observe(time.perf_counter() - started, operation='restore')
+
+    def start(self):
+        """Save every `interval` seconds on a background thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, save: bool = True):
+        """Stop periodic saves, writing a final snapshot"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if save:
+            self.save()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.save()
+
+    def _read(self):
+        """(state, age in seconds), or (None, None) if missing, foreign or stale"""
+        if not os.path.exists(self.path):
+            return None, None
+        with open(self.path, 'rb') as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                print(f"Ignoring truncated snapshot {self.path}")
+                return None, None
+            magic, version, created = _HEADER.unpack(header)
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                print(f"Ignoring snapshot {self.path}: unsupported format version")
+                return None, None
+            age = max(0.0, time.time() - created)
+            if self.max_age is not None and age > self.max_age:
+                print(f"Ignoring snapshot {self.path}: {age:.0f}s old")
+                return None, None
+            return pickle.loads(zlib.decompress(f.read())), age
@@ -0,0 +1,140 @@
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+
+class SubscriptionService:
+    """Tracks what each Socket.IO client watches
+
+    Every client subscribes to one (pair, timeframe), which maps to a
+    Socket.IO room. Subscriptions are reference counted, so the background
+    loop computes each watched pair once per tick and broadcasts it to the
+    pair's rooms, and pairs nobody watches stop being polled. The latest
+    payload per pair and event is kept so joining clients are served
+    without another fetch. Clients that negotiated a different wire
+    protocol (a `variant`) get rooms of their own, so each payload is
+    encoded once per variant.
+
+    In cluster mode, the counts other workers report are merged in with
+    `set_remote`, so the ingest leader sees every room in the cluster.
+    """
+
+    def __init__(self):
+        self._clients = {}  # sid -> (pair, timeframe, variant)
+        self._local = {}  # (pair, timeframe, variant) -> clients of this process
+        self._remote = {}  # worker id -> {(pair, timeframe, variant): clients}
+        self._refcounts = {}  # (pair, timeframe, variant) -> clients, all workers included
+        self._latest = {}  # pair -> {event: payload}
+        self._lock = Lock()
+
+    @staticmethod
+    def room(pair: str, timeframe: str, variant: str = '') -> str:
+        """Socket.IO room name for a subscription"""
+        return f"{pair}:{timeframe}#{variant}" if variant else f"{pair}:{timeframe}"
+
+    def subscribe(self, sid: str, pair: str, timeframe: str,
+                  variant: str = '') -> Optional[Tuple[str, str, str]]:
+        """Move a client to (pair, timeframe); returns its previous subscription"""
+        key = (pair, timeframe, variant)
+        with self._lock:
+            previous = self._clients.get(sid)
+            if previous == key:
+                return previous
+            if previous is not None:
+                self._release(previous)
+            self._clients[sid] = key
+            self._adjust(key, 1)
+        return previous
+
+    def unsubscribe(self, sid: str) -> Optional[Tuple[str, str, str]]:
+        """Drop a client's subscription; returns it"""
+        with self._lock:
+            previous = self._clients.pop(sid, None)
+            if previous is not None:
+                self._release(previous)
+        return previous
+
+    def subscription(self, sid: str) -> Optional[Tuple[str, str]]:
+        """(pair, timeframe) a client is subscribed to"""
+        key = self._clients.get(sid)
+        return key[:2] if key is not None else None
+
+    def active_pairs(self) -> List[str]:
+        """Pairs with at least one subscribed client"""
+        with self._lock:
+            return sorted({pair for pair, _, _ in self._refcounts})
+
+    def active_subscriptions(self, variants: Optional[Tuple[str, ...]] = None) -> List[Tuple[str, str]]:
+        """Distinct (pair, timeframe) subscriptions, optionally of some variants only"""
+        with self._lock:
+            return sorted({(pair, timeframe) for pair, timeframe, variant in self._refcounts
+                           if variants is None or variant in variants})
+
+    def rooms_for(self, pair: str, timeframe: Optional[str] = None,
+                  variant: str = '') -> List[str]:
+        """Rooms of a pair (or of one of its timeframes) for one variant"""
+        with self._lock:
+            return [self.room(*key) for key in self._refcounts
+                    if key[0] == pair and key[2] == variant
+                    and (timeframe is None or key[1] == timeframe)]
+
+    def refcount(self, pair: str, timeframe: Optional[str] = None) -> int:
+        """Subscribed clients for a pair, or for one of its timeframes"""
+        with self._lock:
+            return sum(count for (p, t, _), count in self._refcounts.items()
+                       if p == pair and (timeframe is None or t == timeframe))
+
+    def local_counts(self) -> Dict[Tuple[str, str, str], int]:
+        """Clients of this process per (pair, timeframe, variant)"""
+        with self._lock:
+            return dict(self._local)
+
+    def set_remote(self, worker: str, counts: Optional[Dict[Tuple[str, str, str], int]]):
+        """Replace the counts another worker reported; None forgets the worker"""
+        with self._lock:
+            if counts:
+                self._remote[worker] = dict(counts)
+            else:
+                self._remote.pop(worker, None)
+            refcounts = dict(self._local)
+            for remote in self._remote.values():
+                for key, count in remote.items():
+                    refcounts[key] = refcounts.get(key, 0) + count
+            self._refcounts = refcounts
+            for pair in [pair for pair in self._latest
+                         if not any(key[0] == pair for key in refcounts)]:
+                del self._latest[pair]
+
+    def stats(self) -> Dict[str, int]:
+        """Subscribed clients, rooms and distinct watched pairs"""
+        with self._lock:
+            return {
+                'clients': len(self._clients),
+                'rooms': len(self._refcounts),
+                'pairs': len({key[0] for key in self._refcounts})
+            }
+
+    def remember(self, pair: str, event: str, payload: Dict):
+        """Keep the latest payload broadcast for a pair"""
+        with self._lock:
+            if any(key[0] == pair for key in self._refcounts):
+                self._latest.setdefault(pair, {})[event] = payload
+
+    def latest(self, pair: str, event: str) -> Optional[Dict]:
+        """Latest payload broadcast for a pair"""
+        return self._latest.get(pair, {}).get(event)
+
+    def _adjust(self, key: Tuple[str, str, str], delta: int):
+        for counts in (self._local, self._refcounts):
+            count = counts.get(key, 0) + delta
+            if count > 0:
+                counts[key] = count
+            else:
+                counts.pop(key, None)
+
+    def _release(self, key: Tuple[str, str, str]):
+        self._adjust(key, -1)
+        if key in self._refcounts:
+            return
+        if not any(other[0] == key[0] for other in self._refcounts):
+            # Unwatched pairs stop being polled, so their payloads go stale
+            self._latest.pop(key[0], None)
@@ -1,12 +1,38 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-from backend.utils.support_detector import SupportDetector
+from typing import List, Dict, Iterable, Optional, Tuple
+import pandas as pd
+from backend.utils.binance_client import BinanceClient
+from backend.utils.metrics import COMPUTE_BUCKETS, registry
+from backend.utils.support_detector import SupportDetector, confluence_zones
+from backend.services.detection_pool import DetectionPool
+from backend.services.order_book_service import OrderBookService
+
+# Latest candles fetched for an incremental refresh: the candle that just
+# closed, the forming one, and a few closes that may have been missed
+INCREMENTAL_CANDLES = 5
+
+DETECTION_SECONDS = registry.histogram(
+    'support_detection_seconds', 'Support detection time per symbol/interval',
+    ('symbol', 'interval', 'mode'), COMPUTE_BUCKETS
+)
 
 class SupportService:
-    def __init__(self, support_detector: SupportDetector):
+    def __init__(self, support_detector: SupportDetector,
+                 binance_client: Optional[BinanceClient] = None,
+                 max_workers: Optional[int] = None,
+                 order_book_service: Optional[OrderBookService] = None,
+                 wall_merge_percent: float = 0.25, wall_weight: float = 0.2):
         self.support_detector = support_detector
+        self.binance_client = binance_client
+        self.order_book_service = order_book_service
+        self.wall_merge_percent = wall_merge_percent
+        self.wall_weight = wall_weight
         self._update_interval = timedelta(minutes=15)
         self._last_update = {}
+        self._interval_levels = {}  # (symbol, interval) -> levels from batch refreshes
+        self._detection_pool = DetectionPool(support_detector, max_workers)
 
     def get_support_levels(self, symbol: str, force_update: bool = False) -> List[Dict]:
         """Get support levels for a symbol"""
@@ -16,14 +42,186 @@ class SupportService:
         if not force_update and symbol in self._last_update:
             time_since_update = now - self._last_update[symbol]
             if time_since_update < self._update_interval:
-                return self.support_detector.get_cached_levels(symbol)
+                return self._with_walls(symbol, self.support_detector.get_cached_levels(symbol))
 
         # Get new support levels - we're not providing a DataFrame here
         # In a real implementation, we would fetch data first
         levels = self.support_detector.detect_support_levels(symbol)
         self._last_update[symbol] = now
+        return self._with_walls(symbol, levels)
+
+    def update_support_levels(self, symbol: str, interval: str,
+                              candles: pd.DataFrame) -> List[Dict]:
+        """Incrementally refresh support levels from newly closed candles"""
+        started = time.perf_counter()
+        levels = self.support_detector.update_support_levels(symbol, interval, candles)
+        DETECTION_SECONDS.observe(time.perf_counter() - started,
+                                  symbol=symbol, interval=interval, mode='incremental')
+        self._interval_levels[(symbol, interval)] = levels
+        self._last_update[symbol] = datetime.now()
+        return levels
+
+    def refresh_many(self, symbols: Iterable[str], intervals: Iterable[str],
+                     limit: int = 500,
+                     candles: Optional[Dict[Tuple[str, str], pd.DataFrame]] = None
+                     ) -> Dict[Tuple[str, str], Dict]:
+        """
+        Refresh support levels for every symbol/interval pair in one batch
+
+        Candles are fetched concurrently (unless `candles` already provides
+        them), then detection fans out over the process pool. The detector
+        adopts each pair's incremental state, so later candle closes can be
+        applied with `update_support_levels`. Returns the per-task result
+        from `DetectionPool.run` with an added 'fetch_time'.
+        """
+        keys = [(symbol, interval) for symbol in symbols for interval in intervals]
+        fetch_times = {}
+        if candles is None:
+            candles, fetch_times = self._fetch_candles(keys, limit)
+        else:
+            candles = {key: candles.get(key) for key in keys}
+
+        results = self._detection_pool.run(candles)
+
+        now = datetime.now()
+        for key, result in results.items():
+            result['fetch_time'] = fetch_times.get(key, 0.0)
+            DETECTION_SECONDS.observe(result['detect_time'],
+                                      symbol=key[0], interval=key[1], mode='batch')
+            self.support_detector.load_state(key[0], key[1], result.pop('state'))
+            self._interval_levels[key] = result['levels']
+            self._last_update[key[0]] = now
+        return results
+
+    def refresh_supports(self, symbols: Iterable[str], interval: str = '1h',
+                         limit: int = 500) -> Dict[str, List[Dict]]:
+        """Bring the levels `get_support_levels` serves up to date
+
+        Symbols with incremental state get only their latest candles
+        applied to it. The others (and states grown past `2 * limit`
+        candles, which are re-cut to `limit`) are detected from scratch in
+        the process pool. Returns the new levels of every refreshed symbol.
+        """
+        symbols = list(symbols)
+        incremental = [symbol for symbol in symbols
+                       if 0 < self.support_detector.state_length(symbol, interval) <= 2 * limit]
+        full = [symbol for symbol in symbols if symbol not in incremental]
+
+        levels = {}
+        if incremental:
+            keys = [(symbol, interval) for symbol in incremental]
+            candles, _ = self._fetch_candles(keys, INCREMENTAL_CANDLES)
+            for (symbol, _), df in candles.items():
+                if df is None or not len(df):
+                    continue
+                if df['timestamp'].values[0] > self.support_detector.state_end(symbol, interval):
+                    # More closes were missed than fetched: the state has a gap
+                    full.append(symbol)
+                    continue
+                try:
+                    levels[symbol] = self.update_support_levels(symbol, interval, df)
+                except Exception as e:
+                    print(f"Error updating supports for {symbol}: {str(e)}")
+        if full:
+            for (symbol, _), result in self.refresh_many(full, [interval], limit).items():
+                levels[symbol] = result['levels']
+
+        for symbol, symbol_levels in levels.items():
+            self.support_detector.cache_levels(symbol, symbol_levels)
+            levels[symbol] = self._with_walls(symbol, symbol_levels)
         return levels
 
+    def _fetch_candles(self, keys: List[Tuple[str, str]], limit: int):
+        """Fetch candles for many symbol/intervals concurrently
+
+        Returns ({key: DataFrame or None}, {key: fetch seconds}).
+        """
+        if self.binance_client is None:
+            raise ValueError("Refreshing supports needs a BinanceClient or preloaded candles")
+
+        if hasattr(self.binance_client, 'get_historical_data_many'):
+            # Async client: one batch of concurrent requests
+            started = time.perf_counter()
+            candles = self.binance_client.get_historical_data_many(keys, limit)
+            elapsed = time.perf_counter() - started
+            return candles, {key: elapsed for key in keys}
+
+        def fetch(key):
+            started = time.perf_counter()
+            df = self.binance_client.get_historical_data(key[0], key[1], limit)
+            return key, df, time.perf_counter() - started
+
+        candles = {}
+        fetch_times = {}
+        with ThreadPoolExecutor(max_workers=min(16, len(keys) or 1)) as executor:
+            for key, df, elapsed in executor.map(fetch, keys):
+                candles[key] = df
+                fetch_times[key] = elapsed
+        return candles, fetch_times
+
+    def is_refreshed(self, symbol: str, interval: str) -> bool:
+        """Whether a batch refresh has detected levels for this symbol/interval"""
+        return (symbol, interval) in self._interval_levels
+
+    def get_interval_levels(self, symbol: str, interval: str) -> List[Dict]:
+        """Get levels from the latest batch refresh of a symbol/interval"""
+        return self._with_walls(symbol, self._interval_levels.get((symbol, interval), []))
+
+    def get_confluence(self, symbol: str, intervals: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Price zones scored by how many of the symbol's intervals support them
+
+        Uses the levels of the latest batch refresh of each interval (all
+        refreshed intervals of the symbol by default).
+        """
+        if intervals is None:
+            intervals = [interval for key_symbol, interval in self._interval_levels
+                         if key_symbol == symbol]
+        levels = {interval: self._interval_levels[(symbol, interval)] for interval in intervals
+                  if (symbol, interval) in self._interval_levels}
+        return confluence_zones(levels, self.support_detector.min_distance_percent)
+
+    def _with_walls(self, symbol: str, levels: List[Dict]) -> List[Dict]:
+        """Boost levels backed by a bid-side liquidity wall in the order book
+
+        A wall within `wall_merge_percent` of a level is attached as `wall`
+        and adds up to `wall_weight * 100` to its strength, scaled by how far
+        it exceeds the typical liquidity. Levels are returned as new dicts,
+        re-sorted by strength.
+        """
+        if self.order_book_service is None or not levels:
+            return levels
+        walls = self.order_book_service.get_walls(symbol, 'bids')
+        if not walls:
+            return levels
+
+        merged = []
+        for level in levels:
+            wall = min(walls, key=lambda w: abs(w['price'] - level['price']))
+            if abs(wall['price'] - level['price']) / level['price'] * 100 > self.wall_merge_percent:
+                merged.append(level)
+                continue
+            score = min(1.0, wall['ratio'] / (2 * self.order_book_service.wall_multiple))
+            strength = min(100.0, level['strength'] + self.wall_weight * 100 * score)
+            merged.append(dict(level, strength=round(strength, 2), wall=wall))
+        merged.sort(key=lambda x: x['strength'], reverse=True)
+        return merged
+
+    def export_state(self) -> Dict:
+        """Refresh times and batch levels for a snapshot"""
+        return {
+            'last_update': dict(self._last_update),
+            'interval_levels': dict(self._interval_levels)
+        }
+
+    def restore_state(self, state: Dict, age: float = 0.0):
+        """Reload a snapshot; refresh times keep their wall-clock age"""
+        self._last_update.update(state.get('last_update', {}))
+        self._interval_levels.update(state.get('interval_levels', {}))
+
+    def shutdown(self):
+        """Release the detection process pool"""
+        self._detection_pool.shutdown()
+
     def should_update_supports(self, symbol: str) -> bool:
         """Check if support levels should be updated"""
         if symbol not in self._last_update:
@@ -34,11 +232,12 @@ class SupportService:
 
     def calculate_distance_to_supports(self, current_price: float, 
                                     support_levels: List[Dict]) -> List[Dict]:
-        """Calculate distance from current price to each support level"""
-        for level in support_levels:
-            distance = ((current_price - level['price']) / current_price) * 100
-            level['distance'] = round(distance, 2)
-        return support_levels
+        """Calculate distance from current price to each support level
+
+        Returns copies, so cached levels are never modified.
+        """
+        return [dict(level, distance=round(((current_price - level['price']) / current_price) * 100, 2))
+                for level in support_levels]
 
     def get_active_supports(self, symbol: str, 
                           max_distance: float = 5.0) -> List[Dict]:
@@ -56,9 +255,20 @@ class SupportService:
         return [level for level in levels_with_distance 
                 if abs(level['distance']) <= max_distance]
 
+    def _get_current_price(self, symbol: str) -> Optional[float]:
+        """Latest price from the Binance client, if one is configured"""
+        if self.binance_client is None:
+            return None
+        price_data = self.binance_client.get_current_price(symbol)
+        return price_data['price'] if price_data else None
+
     def invalidate_cache(self, symbol: Optional[str] = None):
         """Invalidate cache for a symbol or all symbols"""
         if symbol:
             self._last_update.pop(symbol, None)
+            for key in [k for k in self._interval_levels if k[0] == symbol]:
+                self._interval_levels.pop(key, None)
         else:
-            self._last_update.clear()
\ No newline at end of file
+            self._last_update.clear()
+            self._interval_levels.clear()
+        self.support_detector.reset_incremental_state(symbol)
\ No newline at end of file
@@ -0,0 +1,286 @@
+import asyncio
+import json
+import random
+import time
+from threading import Thread
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+import aiohttp
+import numpy as np
+import pandas as pd
+from backend.utils.binance_client import (
+    EXCHANGE_INFO_WEIGHT, REQUEST_RETRIES, REQUEST_SECONDS, SYMBOLS_RETRY_SECONDS,
+    SYMBOLS_TTL, BinanceAPIError, RequestWeightTracker, depth_weight, format_ticker,
+    klines_to_columns, klines_to_frame, ticker_weight, trading_symbols
+)
+from backend.utils.cache import Cache
+
+
+class AsyncBinanceClient:
+    """asyncio counterpart of BinanceClient
+
+    Same methods as BinanceClient, as coroutines. At most `max_concurrency`
+    requests are in flight at once, over one keep-alive connection pool.
+    Request weight is accounted in a RequestWeightTracker that can be shared
+    with synchronous clients on the same IP.
+    """
+
+    def __init__(self, base_url: str = "https://api.binance.com/api/v3",
+                 ws_url: str = "wss://stream.binance.com:9443/ws",
+                 max_concurrency: int = 50, timeout: float = 10.0,
+                 max_retries: int = 3, backoff_base: float = 0.5,
+                 weight_tracker: Optional[RequestWeightTracker] = None):
+        self.base_url = base_url
+        self.ws_url = ws_url
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.weight_tracker = weight_tracker or RequestWeightTracker()
+        # symbol -> formatted ticker, fresh for one second
+        self._price_cache = Cache(max_bytes=4 * 1024 * 1024, ttl=1.0)
+        self._price_requests = {}  # symbol -> in-flight ticker request
+        self._symbols_cache = Cache(max_entries=1, ttl=SYMBOLS_TTL)
+        self._symbols_retry_at = 0.0  # monotonic time before which a failed fetch is not retried
+        self._session = None
+        self._semaphore = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily so they bind to the running loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def _request(self, path: str, params: Optional[Dict] = None, weight: int = 1):
+        """GET a REST endpoint; same throttling and retry policy as BinanceClient"""
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            result = await self._request_with_retries(path, params, weight)
+            outcome = 'ok'
+            return result
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=path, outcome=outcome)
+
+    async def _request_with_retries(self, path: str, params: Optional[Dict], weight: int):
+        session = await self._get_session()
+        attempt = 0
+        while True:
+            while True:
+                delay = self.weight_tracker.reserve(weight)
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            try:
+                async with self._semaphore:
+                    async with session.get(f"{self.base_url}/{path}", params=params) as response:
+                        self.weight_tracker.update_from_headers(response.headers)
+                        if response.status < 400:
+                            return await response.json(content_type=None)
+                        error = BinanceAPIError(response.status, (await response.text())[:200])
+                        retry_after = response.headers.get('Retry-After')
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = e
+            else:
+                if error.status_code in (418, 429):
+                    self.weight_tracker.block_for(float(retry_after or 60))
+                    if error.status_code == 418:
+                        # IP ban: retrying only extends it
+                        raise error
+                elif error.status_code < 500:
+                    raise error
+
+            attempt += 1
+            if attempt > self.max_retries:
+                raise error
+            REQUEST_RETRIES.inc(endpoint=path)
+            await asyncio.sleep(random.uniform(0, self.backoff_base * 2 ** attempt))
+
+    async def get_current_price(self, symbol: str) -> Optional[Dict]:
+        """Get current price and 24h stats for a symbol
+
+        Cached for a second; concurrent callers missing the cache share one
+        request.
+        """
+        price_data = self._price_cache.get(symbol)
+        if price_data is not None:
+            return price_data
+        request = self._price_requests.get(symbol)
+        if request is None:
+            request = self._price_requests[symbol] = asyncio.ensure_future(self._fetch_price(symbol))
+            request.add_done_callback(lambda _: self._price_requests.pop(symbol, None))
+        try:
+            return await asyncio.shield(request)
+        except Exception as e:
+            print(f"Error fetching price for {symbol}: {str(e)}")
+            return None
+
+    async def _fetch_price(self, symbol: str) -> Dict:
+        price_data = format_ticker(await self._request(
+            "ticker/24hr", {"symbol": symbol}, weight=ticker_weight(1)
+        ))
+        self._price_cache.set(symbol, price_data)
+        return price_data
+
+    async def get_current_prices(self, symbols: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Get current prices for many symbols (or all, if None) in one request"""
+        params = None
+        if symbols is not None:
+            if not symbols:
+                return {}
+            params = {"symbols": json.dumps(list(symbols), separators=(',', ':'))}
+        try:
+            tickers = await self._request("ticker/24hr", params,
+                                          weight=ticker_weight(len(symbols) if symbols else None))
+        except Exception as e:
+            print(f"Error fetching prices for {len(symbols) if symbols else 'all'} symbols: {str(e)}")
+            return {}
+        prices = {}
+        for ticker_data in tickers:
+            price_data = format_ticker(ticker_data)
+            prices[price_data["symbol"]] = price_data
+            self._price_cache.set(price_data["symbol"], price_data)
+        return prices
+
+    async def get_symbols(self) -> Optional[FrozenSet[str]]:
+        """Symbols currently trading, or None if the list could not be fetched"""
+        symbols = self._symbols_cache.get('symbols')
+        if symbols is not None or time.monotonic() < self._symbols_retry_at:
+            return symbols
+        try:
+            symbols = trading_symbols(await self._request("exchangeInfo",
+                                                          weight=EXCHANGE_INFO_WEIGHT))
+        except Exception as e:
+            self._symbols_retry_at = time.monotonic() + SYMBOLS_RETRY_SECONDS
+            print(f"Error fetching exchange symbols: {str(e)}")
+            return None
+        self._symbols_cache.set('symbols', symbols)
+        return symbols
+
+    async def get_historical_data(self, symbol: str, interval: str, limit: int = 500,
+                                  start_time: Optional[int] = None,
+                                  end_time: Optional[int] = None) -> Optional[pd.DataFrame]:
+        """Get historical kline data, optionally bounded by epoch-ms open times"""
+        params = {"symbol": symbol, "interval": interval, "limit": limit}
+        if start_time is not None:
+            params["startTime"] = start_time
+        if end_time is not None:
+            params["endTime"] = end_time
+        try:
+            return klines_to_frame(await self._request("klines", params, weight=2))
+        except Exception as e:
+            print(f"Error fetching historical data for {symbol}: {str(e)}")
+            return None
+
+    async def get_candles(self, symbol: str, interval: str, limit: int = 500,
+                          start_time: Optional[int] = None,
+                          end_time: Optional[int] = None) -> Optional[Dict[str, np.ndarray]]:
+        """Like `get_historical_data`, but as OHLCV arrays instead of a DataFrame"""
+        params = {"symbol": symbol, "interval": interval, "limit": limit}
+        if start_time is not None:
+            params["startTime"] = start_time
+        if end_time is not None:
+            params["endTime"] = end_time
+        try:
+            return klines_to_columns(await self._request("klines", params, weight=2))
+        except Exception as e:
+            print(f"Error fetching candles for {symbol}: {str(e)}")
+            return None
+
+    async def get_depth(self, symbol: str, limit: int = 100) -> Optional[Dict]:
+        """Get order book depth"""
+        try:
+            return await self._request("depth", {"symbol": symbol, "limit": limit},
+                                       weight=depth_weight(limit))
+        except Exception as e:
+            print(f"Error fetching depth for {symbol}: {str(e)}")
+            return None
+
+    async def get_historical_data_many(self, keys: Iterable[Tuple[str, str]],
+                                       limit: int = 500) -> Dict[Tuple[str, str], Optional[pd.DataFrame]]:
+        """Fetch klines for many (symbol, interval) pairs concurrently"""
+        keys = list(keys)
+        frames = await asyncio.gather(*[
+            self.get_historical_data(symbol, interval, limit) for symbol, interval in keys
+        ])
+        return dict(zip(keys, frames))
+
+    def get_cache_stats(self) -> Dict[str, Dict]:
+        """Hit/miss statistics of the ticker cache"""
+        return {'prices': self._price_cache.stats()}
+
+    async def close(self):
+        """Close pooled connections"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class SyncBinanceClient:
+    """Blocking facade over AsyncBinanceClient
+
+    Drop-in replacement for BinanceClient: each call runs on a private event
+    loop thread, so concurrent callers (and the *_many batch methods) share
+    one bounded connection pool instead of issuing serial round trips.
+    """
+
+    def __init__(self, **kwargs):
+        self._client = AsyncBinanceClient(**kwargs)
+        self._loop = asyncio.new_event_loop()
+        self._thread = Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def base_url(self) -> str:
+        return self._client.base_url
+
+    @property
+    def ws_url(self) -> str:
+        return self._client.ws_url
+
+    @property
+    def weight_tracker(self) -> RequestWeightTracker:
+        return self._client.weight_tracker
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def get_current_price(self, symbol: str) -> Optional[Dict]:
+        return self._run(self._client.get_current_price(symbol))
+
+    def get_current_prices(self, symbols: Optional[List[str]] = None) -> Dict[str, Dict]:
+        return self._run(self._client.get_current_prices(symbols))
+
+    def get_symbols(self) -> Optional[FrozenSet[str]]:
+        return self._run(self._client.get_symbols())
+
+    def get_historical_data(self, symbol: str, interval: str, limit: int = 500,
+                            start_time: Optional[int] = None,
+                            end_time: Optional[int] = None) -> Optional[pd.DataFrame]:
+        return self._run(self._client.get_historical_data(symbol, interval, limit,
+                                                          start_time, end_time))
+
+    def get_candles(self, symbol: str, interval: str, limit: int = 500,
+                    start_time: Optional[int] = None,
+                    end_time: Optional[int] = None) -> Optional[Dict[str, np.ndarray]]:
+        return self._run(self._client.get_candles(symbol, interval, limit,
+                                                  start_time, end_time))
+
+    def get_depth(self, symbol: str, limit: int = 100) -> Optional[Dict]:
+        return self._run(self._client.get_depth(symbol, limit))
+
+    def get_historical_data_many(self, keys: Iterable[Tuple[str, str]],
+                                 limit: int = 500) -> Dict[Tuple[str, str], Optional[pd.DataFrame]]:
+        return self._run(self._client.get_historical_data_many(keys, limit))
+
+    def get_cache_stats(self) -> Dict[str, Dict]:
+        return self._client.get_cache_stats()
+
+    def close(self):
+        """Close connections and stop the loop thread"""
+        self._run(self._client.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
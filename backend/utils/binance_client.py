@@ -1,96 +1,372 @@
+import json
+import random
 import requests
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from threading import Lock
 import time
-from typing import Dict, List, Optional
+from typing import Dict, FrozenSet, List, Optional
+from backend.utils.cache import Cache
+from backend.utils.metrics import registry
+
+# Binance spot REQUEST_WEIGHT budget per minute
+DEFAULT_WEIGHT_LIMIT = 6000
+
+# Request weight of /exchangeInfo for all symbols
+EXCHANGE_INFO_WEIGHT = 20
+
+# The traded symbol list is refreshed hourly; a failed fetch is retried after a minute
+SYMBOLS_TTL = 3600.0
+SYMBOLS_RETRY_SECONDS = 60.0
+
+# Shared with AsyncBinanceClient
+REQUEST_SECONDS = registry.histogram(
+    'binance_request_seconds',
+    'Binance REST call latency including throttling and retries',
+    ('endpoint', 'outcome')
+)
+REQUEST_RETRIES = registry.counter(
+    'binance_request_retries_total', 'Binance REST attempts retried', ('endpoint',)
+)
+
+
+class BinanceAPIError(Exception):
+    """Non-retryable error response from the Binance REST API"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"HTTP {status_code}: {message}")
+        self.status_code = status_code
+
+
+class RequestWeightTracker:
+    """Client-side accounting of Binance request weight
+
+    Tracks weight used in the current one-minute window, corrected by the
+    `X-MBX-USED-WEIGHT-1M` header of every response, and keeps requests
+    below `limit * safety_margin` so the server never has to reject them.
+    A 429/418 `Retry-After` blocks all requests until it expires. Thread
+    safe, and shareable between clients using the same IP.
+    """
+
+    def __init__(self, limit: int = DEFAULT_WEIGHT_LIMIT, safety_margin: float = 0.9):
+        self.limit = limit
+        self.safety_margin = safety_margin
+        self._used = 0
+        self._window = None
+        self._blocked_until = 0.0
+        self._lock = Lock()
+
+    @property
+    def used_weight(self) -> int:
+        with self._lock:
+            self._roll_window(time.time())
+            return self._used
+
+    def reserve(self, weight: int) -> float:
+        """Reserve weight for a request; returns seconds to wait first (0 = go)
+
+        Nothing is reserved when the returned delay is positive.
+        """
+        with self._lock:
+            now = time.time()
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            self._roll_window(now)
+            if self._used + weight > self.limit * self.safety_margin and self._used > 0:
+                # Wait for the next minute window
+                return 60 - (now % 60) + 0.05
+            self._used += weight
+            return 0.0
+
+    def acquire(self, weight: int):
+        """Block until `weight` can be spent without exceeding the budget"""
+        while True:
+            delay = self.reserve(weight)
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def update_from_headers(self, headers):
+        """Sync usage with the server's view of the current window"""
+        used = headers.get('X-MBX-USED-WEIGHT-1M') or headers.get('x-mbx-used-weight-1m')
+        if used is None:
+            return
+        with self._lock:
+            self._roll_window(time.time())
+            self._used = int(used)
+
+    def block_for(self, seconds: float):
+        """Stop all requests for `seconds` (from a Retry-After header)"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.time() + seconds)
+
+    def _roll_window(self, now: float):
+        window = int(now // 60)
+        if window != self._window:
+            self._window = window
+            self._used = 0
+
+
+def ticker_weight(num_symbols: Optional[int]) -> int:
+    """Request weight of /ticker/24hr for one, several or all symbols"""
+    if num_symbols is None:
+        return 80
+    if num_symbols <= 20:
+        return 2
+    if num_symbols <= 100:
+        return 40
+    return 80
+
+
+def depth_weight(limit: int) -> int:
+    """Request weight of /depth for a given limit"""
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 25
+    if limit <= 1000:
+        return 50
+    return 250
+
+
+def format_ticker(ticker_data: Dict) -> Dict:
+    """Convert a REST 24hr ticker to the price data format used by the app"""
+    return {
+        "symbol": ticker_data["symbol"],
+        "price": float(ticker_data["lastPrice"]),
+        "change_24h": float(ticker_data["priceChangePercent"]),
+        "volume_24h": float(ticker_data["volume"]),
+        "high_24h": float(ticker_data["highPrice"]),
+        "low_24h": float(ticker_data["lowPrice"]),
+        "timestamp": int(ticker_data["closeTime"])
+    }
+
+
+def trading_symbols(exchange_info: Dict) -> FrozenSet[str]:
+    """Symbols currently trading, from an /exchangeInfo response"""
+    return frozenset(symbol['symbol'] for symbol in exchange_info.get('symbols', [])
+                     if symbol.get('status') == 'TRADING')
+
+
+def klines_to_columns(data: List[List]) -> Dict[str, np.ndarray]:
+    """Convert a REST klines response to OHLCV arrays with epoch-ms open times
+
+    Skips the DataFrame entirely; the arrays fit `CandleBuffer` directly.
+    """
+    if not data:
+        return {'timestamp': np.empty(0, dtype=np.int64),
+                **{col: np.empty(0) for col in ('open', 'high', 'low', 'close', 'volume')}}
+    rows = np.array([row[:6] for row in data], dtype=np.float64)
+    return {
+        'timestamp': rows[:, 0].astype(np.int64),
+        'open': rows[:, 1].copy(),
+        'high': rows[:, 2].copy(),
+        'low': rows[:, 3].copy(),
+        'close': rows[:, 4].copy(),
+        'volume': rows[:, 5].copy()
+    }
+
+
+def klines_to_frame(data: List[List]) -> pd.DataFrame:
+    """Convert a REST klines response to a DataFrame"""
+    df = pd.DataFrame(data, columns=[
+        'timestamp', 'open', 'high', 'low', 'close', 'volume',
+        'close_time', 'quote_volume', 'trades', 'taker_buy_volume',
+        'taker_buy_quote_volume', 'ignore'
+    ])
+
+    # Convert timestamp to datetime
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    
+    # Convert price columns to float
+    for col in ['open', 'high', 'low', 'close', 'volume']:
+        df[col] = df[col].astype(float)
+
+    return df
+
 
 class BinanceClient:
-    def __init__(self):
-        self.base_url = "https://api.binance.com/api/v3"
-        self.ws_url = "wss://stream.binance.com:9443/ws"
-        self._price_cache = {}
-        self._last_update = {}
+    def __init__(self, base_url: str = "https://api.binance.com/api/v3",
+                 ws_url: str = "wss://stream.binance.com:9443/ws",
+                 timeout: float = 10.0, max_retries: int = 3,
+                 backoff_base: float = 0.5, pool_size: int = 20,
+                 weight_tracker: Optional[RequestWeightTracker] = None):
+        self.base_url = base_url
+        self.ws_url = ws_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.weight_tracker = weight_tracker or RequestWeightTracker()
+        # symbol -> formatted ticker, fresh for one second
+        self._price_cache = Cache(max_bytes=4 * 1024 * 1024, ttl=1.0)
+        self._symbols_cache = Cache(max_entries=1, ttl=SYMBOLS_TTL)
+        self._symbols_retry_at = 0.0  # monotonic time before which a failed fetch is not retried
+
+        # Keep-alive connection pool shared by all requests
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+    def _request(self, path: str, params: Optional[Dict] = None, weight: int = 1):
+        """GET a REST endpoint with throttling, timeouts and jittered retries
+
+        Connection errors, timeouts, 5xx and 429 responses are retried with
+        full-jitter exponential backoff; other 4xx responses raise
+        BinanceAPIError immediately.
+        """
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            result = self._request_with_retries(path, params, weight)
+            outcome = 'ok'
+            return result
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=path, outcome=outcome)
+
+    def _request_with_retries(self, path: str, params: Optional[Dict], weight: int):
+        attempt = 0
+        while True:
+            self.weight_tracker.acquire(weight)
+            try:
+                response = self._session.get(f"{self.base_url}/{path}", params=params,
+                                             timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            else:
+                self.weight_tracker.update_from_headers(response.headers)
+                if response.status_code < 400:
+                    return response.json()
+                error = BinanceAPIError(response.status_code, response.text[:200])
+                if response.status_code in (418, 429):
+                    retry_after = float(response.headers.get('Retry-After', 60))
+                    self.weight_tracker.block_for(retry_after)
+                    if response.status_code == 418:
+                        # IP ban: retrying only extends it
+                        raise error
+                elif response.status_code < 500:
+                    raise error
+
+            attempt += 1
+            if attempt > self.max_retries:
+                raise error
+            REQUEST_RETRIES.inc(endpoint=path)
+            time.sleep(random.uniform(0, self.backoff_base * 2 ** attempt))
 
     def get_current_price(self, symbol: str) -> Dict:
-        """Get current price and 24h stats for a symbol"""
-        now = time.time()
-        
-        # Return cached data if it's less than 1 second old
-        if symbol in self._last_update:
-            if now - self._last_update[symbol] < 1:
-                return self._price_cache[symbol]
+        """Get current price and 24h stats for a symbol
 
+        Cached for a second; concurrent callers missing the cache share one
+        request.
+        """
         try:
-            # Get ticker price
-            ticker_response = requests.get(
-                f"{self.base_url}/ticker/24hr",
-                params={"symbol": symbol}
-            )
-            ticker_data = ticker_response.json()
-
-            # Format response
-            price_data = {
-                "symbol": symbol,
-                "price": float(ticker_data["lastPrice"]),
-                "change_24h": float(ticker_data["priceChangePercent"]),
-                "volume_24h": float(ticker_data["volume"]),
-                "high_24h": float(ticker_data["highPrice"]),
-                "low_24h": float(ticker_data["lowPrice"]),
-                "timestamp": int(ticker_data["closeTime"])
-            }
-
-            # Update cache
-            self._price_cache[symbol] = price_data
-            self._last_update[symbol] = now
-
-            return price_data
+            return self._price_cache.get_or_load(symbol, lambda: format_ticker(
+                self._request("ticker/24hr", {"symbol": symbol}, weight=ticker_weight(1))
+            ))
         except Exception as e:
             print(f"Error fetching price for {symbol}: {str(e)}")
             return None
 
-    def get_historical_data(self, symbol: str, interval: str, limit: int = 500) -> Optional[pd.DataFrame]:
-        """Get historical kline data"""
+    def get_current_prices(self, symbols: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Get current prices for many symbols (or all, if None) in one request"""
+        params = None
+        if symbols is not None:
+            if not symbols:
+                return {}
+            params = {"symbols": json.dumps(list(symbols), separators=(',', ':'))}
+
         try:
-            response = requests.get(
-                f"{self.base_url}/klines",
-                params={
-                    "symbol": symbol,
-                    "interval": interval,
-                    "limit": limit
-                }
-            )
-            data = response.json()
-
-            # Convert to DataFrame
-            df = pd.DataFrame(data, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_volume', 'trades', 'taker_buy_volume',
-                'taker_buy_quote_volume', 'ignore'
-            ])
-
-            # Convert timestamp to datetime
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            
-            # Convert price columns to float
-            for col in ['open', 'high', 'low', 'close', 'volume']:
-                df[col] = df[col].astype(float)
-
-            return df
+            tickers = self._request("ticker/24hr", params,
+                                    weight=ticker_weight(len(symbols) if symbols else None))
+        except Exception as e:
+            print(f"Error fetching prices for {len(symbols) if symbols else 'all'} symbols: {str(e)}")
+            return {}
+
+        prices = {}
+        for ticker_data in tickers:
+            price_data = format_ticker(ticker_data)
+            prices[price_data["symbol"]] = price_data
+            self._price_cache.set(price_data["symbol"], price_data)
+        return prices
+
+    def get_symbols(self) -> Optional[FrozenSet[str]]:
+        """Symbols currently trading, or None if the list could not be fetched
+
+        Cached for an hour; concurrent callers missing the cache share one
+        request. After a failure, None is returned without a request for
+        a minute.
+        """
+        if time.monotonic() < self._symbols_retry_at:
+            return None
+        try:
+            return self._symbols_cache.get_or_load('symbols', lambda: trading_symbols(
+                self._request("exchangeInfo", weight=EXCHANGE_INFO_WEIGHT)
+            ))
+        except Exception as e:
+            self._symbols_retry_at = time.monotonic() + SYMBOLS_RETRY_SECONDS
+            print(f"Error fetching exchange symbols: {str(e)}")
+            return None
+
+    def get_historical_data(self, symbol: str, interval: str, limit: int = 500,
+                            start_time: Optional[int] = None,
+                            end_time: Optional[int] = None) -> Optional[pd.DataFrame]:
+        """Get historical kline data, optionally bounded by epoch-ms open times"""
+        params = {
+            "symbol": symbol,
+            "interval": interval,
+            "limit": limit
+        }
+        if start_time is not None:
+            params["startTime"] = start_time
+        if end_time is not None:
+            params["endTime"] = end_time
+        try:
+            data = self._request("klines", params, weight=2)
+            return klines_to_frame(data)
         except Exception as e:
             print(f"Error fetching historical data for {symbol}: {str(e)}")
             return None
 
+    def get_candles(self, symbol: str, interval: str, limit: int = 500,
+                    start_time: Optional[int] = None,
+                    end_time: Optional[int] = None) -> Optional[Dict[str, np.ndarray]]:
+        """Like `get_historical_data`, but as OHLCV arrays instead of a DataFrame"""
+        params = {
+            "symbol": symbol,
+            "interval": interval,
+            "limit": limit
+        }
+        if start_time is not None:
+            params["startTime"] = start_time
+        if end_time is not None:
+            params["endTime"] = end_time
+        try:
+            return klines_to_columns(self._request("klines", params, weight=2))
+        except Exception as e:
+            print(f"Error fetching candles for {symbol}: {str(e)}")
+            return None
+
     def get_depth(self, symbol: str, limit: int = 100) -> Optional[Dict]:
         """Get order book depth"""
         try:
-            response = requests.get(
-                f"{self.base_url}/depth",
-                params={
+            return self._request(
+                "depth",
+                {
                     "symbol": symbol,
                     "limit": limit
-                }
+                },
+                weight=depth_weight(limit)
             )
-            return response.json()
         except Exception as e:
             print(f"Error fetching depth for {symbol}: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+
+    def get_cache_stats(self) -> Dict[str, Dict]:
+        """Hit/miss statistics of the ticker cache"""
+        return {'prices': self._price_cache.stats()}
+
+    def close(self):
+        """Close pooled connections"""
+        self._session.close()
\ No newline at end of file
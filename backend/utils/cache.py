@@ -0,0 +1,221 @@
+import sys
+import time
+from collections import OrderedDict
+from threading import Event, Lock
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import numpy as np
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory footprint of a cached value in bytes"""
+    # A DataFrame implies pandas is loaded; importing it here would slow every importer
+    pd = sys.modules.get('pandas')
+    if pd is not None and isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v)
+                                          for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class _Flight:
+    """An upstream load that concurrent callers of the same key wait on"""
+
+    def __init__(self):
+        self.done = Event()
+        self.value = None
+        self.error = None
+        self.stale = False  # invalidated while loading: share, but do not store
+
+
+class Cache:
+    """Thread-safe LRU cache with per-entry TTL and single-flight loading
+
+    Entries are evicted least recently used first once their estimated total
+    size exceeds `max_bytes` (or their count exceeds `max_entries`). Keys
+    are any hashables; composite tuples like `(symbol, interval, limit)`
+    keep distinct requests apart. `get_or_load` runs the loader once per
+    key however many threads miss it at the same time; the others wait for
+    and share its result.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024,
+                 max_entries: Optional[int] = None,
+                 ttl: Optional[float] = None,
+                 sizeof: Callable[[Any], int] = estimate_size):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (value, expires at, size)
+        self._flights = {}  # key -> _Flight
+        self._bytes = 0
+        self._lock = Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'loads': 0, 'coalesced': 0,
+                       'evictions': 0, 'expirations': 0}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Cached value, or `default` if missing or expired"""
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return default
+            self._stats['hits'] += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value; `ttl` overrides the cache default for this entry"""
+        size = self.sizeof(value)
+        expires = self._expiry(ttl)
+        with self._lock:
+            self._store(key, value, expires, size)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any],
+                    ttl: Optional[float] = None) -> Any:
+        """Cached value, loading it once on a miss
+
+        Concurrent misses on the same key wait for the first caller's load.
+        A loader result of None is returned but not cached; an exception
+        propagates to every waiting caller.
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self._stats['hits'] += 1
+                return entry[0]
+            self._stats['misses'] += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._stats['loads'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            if flight.value is not None:
+                self._store_loaded(key, flight, ttl)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+        return flight.value
+
+    def invalidate(self, key: Hashable):
+        """Drop one entry"""
+        with self._lock:
+            self._discard(key)
+            if key in self._flights:
+                self._flights[key].stale = True
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches; returns how many were dropped"""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._discard(key)
+            for key, flight in self._flights.items():
+                if predicate(key):
+                    flight.stale = True
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            for flight in self._flights.values():
+                flight.stale = True
+
+    def export(self) -> List[Tuple[Hashable, Any, Optional[float]]]:
+        """Live entries as (key, value, seconds left to live), oldest use first"""
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value, None if expires is None else expires - now)
+                    for key, (value, expires, _) in self._entries.items()
+                    if expires is None or expires > now]
+
+    def restore(self, entries: List[Tuple[Hashable, Any, Optional[float]]], age: float = 0.0) -> int:
+        """Load exported entries, minus `age` seconds spent on disk; returns how many"""
+        restored = 0
+        for key, value, ttl in entries:
+            if ttl is not None:
+                ttl -= age
+                if ttl <= 0:
+                    continue
+            self.set(key, value, ttl)
+            restored += 1
+        return restored
+
+    def stats(self) -> Dict:
+        """Hit/miss/load counters plus current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+            stats['max_bytes'] = self.max_bytes
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._lookup(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key: Hashable):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            self._discard(key)
+            self._stats['expirations'] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store_loaded(self, key: Hashable, flight: _Flight, ttl: Optional[float]):
+        size = self.sizeof(flight.value)
+        expires = self._expiry(ttl)
+        with self._lock:
+            if not flight.stale:
+                self._store(key, flight.value, expires, size)
+
+    def _expiry(self, ttl: Optional[float]) -> Optional[float]:
+        ttl = self.ttl if ttl is None else ttl
+        return time.monotonic() + ttl if ttl is not None else None
+
+    def _store(self, key: Hashable, value: Any, expires: Optional[float], size: int):
+        self._discard(key)
+        self._entries[key] = (value, expires, size)
+        self._bytes += size
+        while self._entries and (
+                self._bytes > self.max_bytes
+                or (self.max_entries is not None and len(self._entries) > self.max_entries)):
+            oldest = next(iter(self._entries))
+            if oldest == key and len(self._entries) == 1:
+                # A single value larger than the budget is still kept
+                break
+            self._discard(oldest)
+            self._stats['evictions'] += 1
+
+    def _discard(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
@@ -0,0 +1,150 @@
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+
+# OHLCV columns shared with KlineStore; timestamps are candle open times in epoch ms
+COLUMNS = {
+    'timestamp': np.int64,
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.float64
+}
+
+
+class CandleBuffer:
+    """Fixed-capacity OHLCV columns for one symbol/interval
+
+    Each column is one array holding up to `capacity` candles plus some
+    slack; arrays grow geometrically until they reach that size. Candles
+    are appended at the end; when the slack runs out, the newest `capacity`
+    candles are moved back to the front, so appends cost amortized O(1)
+    and memory never grows past `nbytes_for(capacity)`. Unlike a wrapping
+    ring, the stored candles are always contiguous, so `column`/`columns`
+    return zero-copy views.
+    Views share memory with the buffer and are only valid until the next
+    write; copy them to keep them.
+    """
+
+    def __init__(self, capacity: int, slack: Optional[int] = None):
+        if capacity <= 0:
+            raise ValueError("CandleBuffer capacity must be positive")
+        self.capacity = capacity
+        self.slack = slack if slack is not None else max(capacity // 8, 64)
+        self._data = {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._start = 0
+        self._end = 0
+        self.version = 0  # bumped by every write
+
+    @staticmethod
+    def nbytes_for(capacity: int, slack: Optional[int] = None) -> int:
+        """Most memory a buffer of `capacity` candles uses"""
+        slack = slack if slack is not None else max(capacity // 8, 64)
+        return (capacity + slack) * sum(np.dtype(dtype).itemsize for dtype in COLUMNS.values())
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray], capacity: int) -> 'CandleBuffer':
+        buffer = cls(capacity)
+        buffer.replace(columns)
+        return buffer
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def nbytes(self) -> int:
+        return sum(values.nbytes for values in self._data.values())
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return int(self._data['timestamp'][self._end - 1]) if len(self) else None
+
+    def column(self, name: str, count: Optional[int] = None) -> np.ndarray:
+        """View of the latest `count` (default: all) values of one column"""
+        start = self._start if count is None else max(self._end - count, self._start)
+        return self._data[name][start:self._end]
+
+    def columns(self, count: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Views of the latest `count` (default: all) candles, column by column"""
+        return {name: self.column(name, count) for name in COLUMNS}
+
+    def replace(self, columns: Dict[str, np.ndarray]):
+        """Load time-sorted columns, keeping the newest `capacity` candles"""
+        count = min(len(columns['timestamp']), self.capacity)
+        self._start, self._end = 0, 0
+        self._make_room(count)
+        for name in COLUMNS:
+            self._data[name][:count] = columns[name][len(columns[name]) - count:]
+        self._start, self._end = 0, count
+        self.version += 1
+
+    def append(self, columns: Dict[str, np.ndarray]):
+        """Append time-sorted candles newer than the stored ones"""
+        count = len(columns['timestamp'])
+        if count == 0:
+            return
+        if count >= self.capacity:
+            self.replace(columns)
+            return
+        self._make_room(count)
+        for name in COLUMNS:
+            self._data[name][self._end:self._end + count] = columns[name]
+        self._end += count
+        if len(self) > self.capacity:
+            self._start = self._end - self.capacity
+        self.version += 1
+
+    def upsert(self, candle: Dict) -> bool:
+        """Append or update one candle dict; False if it is older than the latest"""
+        last = self.last_timestamp
+        timestamp = candle['timestamp']
+        if last is not None and timestamp < last:
+            return False
+        if timestamp == last:
+            index = self._end - 1
+        else:
+            self._make_room(1)
+            index = self._end
+            self._end += 1
+            if len(self) > self.capacity:
+                self._start += 1
+        for name, values in self._data.items():
+            values[index] = candle[name]
+        self.version += 1
+        return True
+
+    def to_frame(self, count: Optional[int] = None) -> pd.DataFrame:
+        """The latest `count` candles as a DataFrame with datetime timestamps (a copy)"""
+        columns = self.columns(count)
+        df = pd.DataFrame({name: columns[name].copy() for name in COLUMNS})
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
+
+    def _make_room(self, count: int):
+        """Ensure `count` more candles fit after the stored ones"""
+        size = len(self._data['timestamp'])
+        if self._end + count <= size:
+            return
+        full_size = self.capacity + self.slack
+        if size < full_size:
+            self._resize(min(max(2 * size, len(self) + count), full_size))
+            if self._end + count <= full_size:
+                return
+        self._compact(self.capacity - count)
+
+    def _resize(self, size: int):
+        """Reallocate the arrays, moving the stored candles to the front"""
+        for name, values in self._data.items():
+            resized = np.empty(size, dtype=values.dtype)
+            resized[:len(self)] = values[self._start:self._end]
+            self._data[name] = resized
+        self._start, self._end = 0, len(self)
+
+    def _compact(self, keep: int):
+        """Move the newest `keep` candles to the front of the arrays"""
+        keep = max(min(keep, len(self)), 0)
+        start = self._end - keep
+        for values in self._data.values():
+            values[:keep] = values[start:self._end]
+        self._start, self._end = 0, keep
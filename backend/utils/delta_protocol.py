@@ -0,0 +1,159 @@
+from threading import Lock
+from typing import Dict, List, Optional
+import numpy as np
+
+# Chart candle fields, in packed-column order
+CANDLE_FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+# Wire encodings for chart columns: JSON arrays, or one packed float64 block
+ENCODINGS = ('json', 'binary')
+
+
+def encode_columns(columns: Dict[str, np.ndarray], encoding: str = 'json'):
+    """Candle columns for the wire
+
+    'binary' packs every field into one little-endian float64 block of
+    `len(CANDLE_FIELDS)` rows (epoch-ms timestamps are exact in float64),
+    which Socket.IO sends as a binary attachment.
+    """
+    if encoding == 'binary':
+        return np.stack([np.asarray(columns[name], dtype=np.float64)
+                         for name in CANDLE_FIELDS]).astype('<f8').tobytes()
+    return {name: columns[name].tolist() for name in CANDLE_FIELDS}
+
+
+class TickerChannel:
+    """Sequenced ticker updates that carry only the changed fields"""
+
+    def __init__(self):
+        self.seq = 0
+        self._ticker = None
+        self._lock = Lock()
+
+    def update(self, ticker: Dict) -> Optional[Dict]:
+        """Delta against the last ticker, or None if nothing changed"""
+        with self._lock:
+            if self._ticker is None:
+                changes = dict(ticker)
+            else:
+                changes = {field: value for field, value in ticker.items()
+                           if self._ticker.get(field) != value}
+            if not changes:
+                return None
+            self._ticker = dict(ticker)
+            self.seq += 1
+            return {'symbol': ticker.get('symbol'), 'seq': self.seq, 'changes': changes}
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {'seq': self.seq, 'ticker': self._ticker}
+
+
+class ChartChannel:
+    """Sequenced chart updates that carry only appended or modified candles
+
+    A delta holds the candles from the first one that differs from the
+    previous state. Clients drop their candles opened at or after `from`,
+    append the delta's candles and then drop candles opened before `first`,
+    which keeps the window length fixed as candles close.
+    """
+
+    def __init__(self, symbol: str, interval: str):
+        self.symbol = symbol
+        self.interval = interval
+        self.seq = 0
+        self._columns = None  # field -> np.ndarray
+        self._volume_profile = None
+        self._source = None
+        self._lock = Lock()
+
+    def update(self, payload: Dict) -> Optional[Dict]:
+        """Delta against a full columnar chart payload, or None if unchanged"""
+        with self._lock:
+            if payload is self._source:
+                return None
+            self._source = payload
+            price = payload['price']
+            columns = {name: np.asarray(price[name], dtype=np.int64 if name == 'timestamp'
+                                        else np.float64)
+                       for name in CANDLE_FIELDS}
+            start = self._first_change(columns)
+            volume_profile = payload.get('volume_profile')
+            profile_changed = volume_profile != self._volume_profile
+            if start == len(columns['timestamp']) and not profile_changed and \
+                    self._columns is not None and \
+                    len(self._columns['timestamp']) == len(columns['timestamp']):
+                return None
+            self._columns = columns
+            self._volume_profile = volume_profile
+            return self._delta(start, volume_profile if profile_changed else None)
+
+    def apply_candle(self, candle: Dict, max_length: Optional[int] = None) -> Optional[Dict]:
+        """Delta for one streamed candle: the forming one changed, or one was appended"""
+        with self._lock:
+            if self._columns is None:
+                return None
+            timestamps = self._columns['timestamp']
+            last = int(timestamps[-1]) if len(timestamps) else None
+            if last is not None and candle['timestamp'] < last:
+                return None
+            row = {name: candle[name] for name in CANDLE_FIELDS}
+            if candle['timestamp'] == last:
+                if all(self._columns[name][-1] == row[name] for name in CANDLE_FIELDS):
+                    return None
+                for name in CANDLE_FIELDS:
+                    self._columns[name][-1] = row[name]
+            else:
+                keep = slice(1, None) if max_length and len(timestamps) >= max_length else slice(None)
+                self._columns = {name: np.append(values[keep], row[name]).astype(values.dtype)
+                                 for name, values in self._columns.items()}
+            return self._delta(len(self._columns['timestamp']) - 1, None)
+
+    def snapshot(self, encoding: str = 'json') -> Optional[Dict]:
+        """Full chart state to (re)start a client's stream"""
+        with self._lock:
+            if self._columns is None:
+                return None
+            return {
+                'symbol': self.symbol,
+                'interval': self.interval,
+                'seq': self.seq,
+                'format': 'columnar',
+                'encoding': encoding,
+                'price': encode_columns(self._columns, encoding),
+                'volume_profile': self._volume_profile
+            }
+
+    def encode(self, delta: Dict, encoding: str) -> Dict:
+        """Wire form of a delta from `update` or `apply_candle`"""
+        message = dict(delta)
+        message['encoding'] = encoding
+        message['candles'] = encode_columns(delta['candles'], encoding)
+        return message
+
+    def _first_change(self, columns: Dict[str, np.ndarray]) -> int:
+        """Index of the first new candle that is not identical in the current state"""
+        timestamps = columns['timestamp']
+        if self._columns is None or len(self._columns['timestamp']) == 0:
+            return 0
+        previous = self._columns['timestamp']
+        index = np.minimum(np.searchsorted(previous, timestamps), len(previous) - 1)
+        same = previous[index] == timestamps
+        for name in CANDLE_FIELDS[1:]:
+            same &= self._columns[name][index] == columns[name]
+        return int(np.argmin(same)) if not same.all() else len(timestamps)
+
+    def _delta(self, start: int, volume_profile: Optional[List[Dict]]) -> Dict:
+        self.seq += 1
+        timestamps = self._columns['timestamp']
+        delta = {
+            'symbol': self.symbol,
+            'interval': self.interval,
+            'seq': self.seq,
+            'from': int(timestamps[start]) if start < len(timestamps) else None,
+            'first': int(timestamps[0]) if len(timestamps) else None,
+            'candles': {name: values[start:].copy() for name, values in self._columns.items()}
+        }
+        if volume_profile is not None:
+            delta['volume_profile'] = volume_profile
+        return delta
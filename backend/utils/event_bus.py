@@ -0,0 +1,37 @@
+from threading import Lock
+from typing import Callable, Dict, List
+
+
+class EventBus:
+    """In-process publish/subscribe hub for market data events
+
+    Callbacks run synchronously in the publisher's thread, so they should be
+    quick; a failing callback is reported and does not affect the others.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Callable]] = {}
+        self._lock = Lock()
+
+    def subscribe(self, topic: str, callback: Callable):
+        """Register a callback for a topic"""
+        with self._lock:
+            # Copy on write so publish can iterate without holding the lock
+            self._subscribers[topic] = self._subscribers.get(topic, []) + [callback]
+
+    def unsubscribe(self, topic: str, callback: Callable):
+        """Remove a previously registered callback"""
+        with self._lock:
+            callbacks = [cb for cb in self._subscribers.get(topic, []) if cb != callback]
+            if callbacks:
+                self._subscribers[topic] = callbacks
+            else:
+                self._subscribers.pop(topic, None)
+
+    def publish(self, topic: str, data):
+        """Deliver an event to every subscriber of the topic"""
+        for callback in self._subscribers.get(topic, []):
+            try:
+                callback(data)
+            except Exception as e:
+                print(f"Error in {topic} subscriber: {str(e)}")
@@ -0,0 +1,268 @@
+import asyncio
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Lock, Thread
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+import websockets
+from backend.utils.binance_client import BinanceClient
+from backend.utils.intervals import INTERVAL_MS
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 drops bursts of concurrent connections
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class FakeExchange:
+    """Local stand-in for the Binance REST and combined-stream endpoints
+
+    Serves `/api/v3/klines`, `/api/v3/ticker/24hr`, `/api/v3/depth` and
+    `/api/v3/exchangeInfo` over HTTP and a `/stream` WebSocket that honours SUBSCRIBE requests. Candles,
+    tickers and depth are fed in by the caller, and `drop_connections` simulates a
+    network failure, which makes it usable for exercising streaming ingest
+    and gap backfill without touching the real exchange.
+    """
+
+    def __init__(self, host: str = '127.0.0.1'):
+        self.host = host
+        self.rest_url = None
+        self.ws_url = None
+        self._candles = {}  # (symbol, interval) -> {open time: candle}
+        self._tickers = {}
+        self._depths = {}  # symbol -> REST depth snapshot
+        self._lock = Lock()
+        self._clients = {}  # websocket -> subscribed streams
+        self._errors = []  # status codes to answer the next REST requests with
+        self.request_count = 0
+        self.used_weight = 0  # reported in X-MBX-USED-WEIGHT-1M
+        self.latency = 0.0  # seconds added to every REST response
+        self._http = None
+        self._loop = None
+        self._ws_server = None
+        self._threads = []
+
+    def start(self) -> 'FakeExchange':
+        """Start both servers on free ports"""
+        self._http = _HTTPServer((self.host, 0), self._make_handler())
+        self.rest_url = f"http://{self.host}:{self._http.server_port}/api/v3"
+        self._threads.append(Thread(target=self._http.serve_forever, daemon=True))
+
+        ready = Event()
+        self._threads.append(Thread(target=self._run_ws, args=(ready,), daemon=True))
+        for thread in self._threads:
+            thread.start()
+        ready.wait(5)
+        return self
+
+    def stop(self):
+        """Shut both servers down"""
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._close_ws(), self._loop).result(5)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        for thread in self._threads:
+            thread.join(5)
+        self._threads = []
+
+    def client(self) -> BinanceClient:
+        """A BinanceClient pointed at this fake exchange"""
+        return BinanceClient(base_url=self.rest_url, ws_url=self.ws_url)
+
+    def add_candle(self, symbol: str, interval: str, open_time: int, open_: float,
+                   high: float, low: float, close: float, volume: float,
+                   closed: bool = True, broadcast: bool = True):
+        """Store a candle (replacing one with the same open time) and stream it"""
+        candle = {
+            "t": open_time, "T": open_time + INTERVAL_MS[interval] - 1,
+            "s": symbol, "i": interval,
+            "o": str(open_), "h": str(high), "l": str(low), "c": str(close),
+            "v": str(volume), "x": closed
+        }
+        with self._lock:
+            self._candles.setdefault((symbol, interval), {})[open_time] = candle
+        if broadcast:
+            self._broadcast(f"{symbol.lower()}@kline_{interval}",
+                            {"e": "kline", "E": open_time, "s": symbol, "k": candle})
+
+    def push_ticker(self, symbol: str, price: float, change_percent: float = 0.0,
+                    volume: float = 0.0, high: Optional[float] = None,
+                    low: Optional[float] = None, close_time: int = 0):
+        """Update the 24h ticker for a symbol and stream it"""
+        ticker = {
+            "e": "24hrTicker", "E": close_time, "s": symbol,
+            "c": str(price), "P": str(change_percent), "v": str(volume),
+            "h": str(high if high is not None else price),
+            "l": str(low if low is not None else price), "C": close_time
+        }
+        with self._lock:
+            self._tickers[symbol] = ticker
+        self._broadcast(f"{symbol.lower()}@ticker", ticker)
+
+    def set_depth(self, symbol: str, bids: List[List], asks: List[List],
+                  last_update_id: int):
+        """Set the snapshot served by REST `depth`"""
+        with self._lock:
+            self._depths[symbol] = {
+                "lastUpdateId": last_update_id,
+                "bids": [[str(price), str(qty)] for price, qty in bids],
+                "asks": [[str(price), str(qty)] for price, qty in asks]
+            }
+
+    def push_depth(self, symbol: str, first_update_id: int, final_update_id: int,
+                   bids: List[List], asks: List[List]):
+        """Stream a diff depth event"""
+        self._broadcast(f"{symbol.lower()}@depth@100ms", {
+            "e": "depthUpdate", "E": final_update_id, "s": symbol,
+            "U": first_update_id, "u": final_update_id,
+            "b": [[str(price), str(qty)] for price, qty in bids],
+            "a": [[str(price), str(qty)] for price, qty in asks]
+        })
+
+    def inject_errors(self, *statuses: int):
+        """Answer the next REST requests with these HTTP status codes"""
+        with self._lock:
+            self._errors.extend(statuses)
+
+    def rest_ticker(self, symbol: str) -> Dict:
+        """Stored ticker in the REST `ticker/24hr` layout"""
+        ticker = self._tickers.get(symbol, {})
+        return {
+            "symbol": symbol, "lastPrice": ticker.get("c"),
+            "priceChangePercent": ticker.get("P"), "volume": ticker.get("v"),
+            "highPrice": ticker.get("h"), "lowPrice": ticker.get("l"),
+            "closeTime": ticker.get("C")
+        }
+
+    def exchange_info(self) -> Dict:
+        """Every symbol with candles or a ticker, as trading, in the REST layout"""
+        with self._lock:
+            symbols = {symbol for symbol, _ in self._candles} | set(self._tickers)
+        return {"symbols": [{"symbol": symbol, "status": "TRADING"} for symbol in sorted(symbols)]}
+
+    def drop_connections(self):
+        """Close every WebSocket connection, as a network failure would"""
+        if self._loop is None:
+            return
+        for ws in list(self._clients):
+            asyncio.run_coroutine_threadsafe(ws.close(), self._loop)
+
+    @property
+    def connection_count(self) -> int:
+        return len(self._clients)
+
+    def klines(self, symbol: str, interval: str, limit: int = 500,
+               start_time: Optional[int] = None, end_time: Optional[int] = None) -> List[List]:
+        """Stored candles in the REST `klines` array layout"""
+        with self._lock:
+            candles = sorted(self._candles.get((symbol, interval), {}).values(),
+                             key=lambda c: c["t"])
+        if start_time is not None:
+            candles = [c for c in candles if c["t"] >= start_time]
+        if end_time is not None:
+            candles = [c for c in candles if c["t"] <= end_time]
+        candles = candles[:limit] if start_time is not None else candles[-limit:]
+        return [[c["t"], c["o"], c["h"], c["l"], c["c"], c["v"], c["T"],
+                 "0", 0, "0", "0", "0"] for c in candles]
+
+    async def _close_ws(self):
+        self._ws_server.close()
+        await self._ws_server.wait_closed()
+
+    def _broadcast(self, stream: str, data: Dict):
+        if self._loop is None:
+            return
+        message = json.dumps({"stream": stream, "data": data})
+        for ws, streams in list(self._clients.items()):
+            if stream in streams:
+                asyncio.run_coroutine_threadsafe(self._send(ws, message), self._loop)
+
+    async def _send(self, ws, message: str):
+        try:
+            await ws.send(message)
+        except websockets.ConnectionClosed:
+            pass
+
+    def _run_ws(self, ready: Event):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._ws_server = self._loop.run_until_complete(
+            websockets.serve(self._handle_ws, self.host, 0)
+        )
+        port = self._ws_server.sockets[0].getsockname()[1]
+        self.ws_url = f"ws://{self.host}:{port}/ws"
+        ready.set()
+        self._loop.run_forever()
+
+    async def _handle_ws(self, ws):
+        self._clients[ws] = set()
+        try:
+            async for message in ws:
+                request = json.loads(message)
+                if request.get("method") == "SUBSCRIBE":
+                    self._clients[ws].update(request.get("params", []))
+                elif request.get("method") == "UNSUBSCRIBE":
+                    self._clients[ws].difference_update(request.get("params", []))
+                await ws.send(json.dumps({"result": None, "id": request.get("id")}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._clients.pop(ws, None)
+
+    def _make_handler(self):
+        exchange = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                exchange.request_count += 1
+                if exchange.latency:
+                    time.sleep(exchange.latency)
+                with exchange._lock:
+                    status = exchange._errors.pop(0) if exchange._errors else None
+                if status is not None:
+                    self.send_response(status)
+                    if status in (418, 429):
+                        self.send_header('Retry-After', '1')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path.endswith('/klines'):
+                    body = exchange.klines(
+                        query.get('symbol'), query.get('interval'),
+                        int(query.get('limit', 500)),
+                        int(query['startTime']) if 'startTime' in query else None,
+                        int(query['endTime']) if 'endTime' in query else None
+                    )
+                elif url.path.endswith('/ticker/24hr'):
+                    if 'symbol' in query:
+                        body = exchange.rest_ticker(query['symbol'])
+                    else:
+                        symbols = json.loads(query['symbols']) if 'symbols' in query \
+                            else list(exchange._tickers)
+                        body = [exchange.rest_ticker(symbol) for symbol in symbols]
+                elif url.path.endswith('/exchangeInfo'):
+                    body = exchange.exchange_info()
+                elif url.path.endswith('/depth'):
+                    body = exchange._depths.get(query.get('symbol'),
+                                                {"lastUpdateId": 0, "bids": [], "asks": []})
+                else:
+                    self.send_error(404)
+                    return
+                payload = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.send_header('X-MBX-USED-WEIGHT-1M', str(exchange.used_weight))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,118 @@
+import gzip
+import hashlib
+import json
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional
+from backend.utils.cache import Cache
+
+
+class CachedResponse:
+    """Serialized JSON body, pre-compressed, with its validators"""
+
+    __slots__ = ('source', 'body', 'gzipped', 'etag', 'last_modified', 'checked_at')
+
+    def __init__(self, source: Any, body: bytes, last_modified: float, checked_at: float):
+        self.source = source  # payload the body was serialized from
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=6)
+        # Weak: the same tag stands for the plain and gzip representations
+        self.etag = f'W/"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+        self.last_modified = last_modified
+        self.checked_at = checked_at
+
+    @property
+    def last_modified_header(self) -> str:
+        return formatdate(self.last_modified, usegmt=True)
+
+    def not_modified(self, headers: Dict[str, str]) -> bool:
+        """Whether conditional request headers match this version"""
+        if_none_match = headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in tags or any(tag.removeprefix('W/') == self.etag.removeprefix('W/')
+                                      for tag in tags)
+        if_modified_since = headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(self.last_modified) <= since
+        return False
+
+
+class _Miss:
+    """A load that found no data, remembered like a response"""
+
+    __slots__ = ('checked_at',)
+    source = None
+    body = gzipped = b''
+
+    def __init__(self, checked_at: float):
+        self.checked_at = checked_at
+
+
+class ResponseCache:
+    """Pre-serialized, pre-compressed JSON responses, one version per key
+
+    `get` calls the loader at most once per `max_age` seconds per key, and
+    only in one thread at a time: concurrent polls of an expired key wait
+    for that load and share its result. Polls in between get the stored
+    bytes without touching the services. When the loader returns the same
+    payload object as before, the stored bytes are kept. A new payload is
+    serialized and compressed once, and keeps its Last-Modified if its body
+    did not change. Loads that find no data are remembered for `max_age`
+    too.
+    """
+
+    def __init__(self, max_age: float = 1.0, max_bytes: int = 32 * 1024 * 1024,
+                 lock_stripes: int = 64):
+        self.max_age = max_age
+        self._responses = Cache(max_bytes=max_bytes,
+                                sizeof=lambda response: len(response.body) + len(response.gzipped))
+        # Keys hash onto a fixed set of load locks, so there is nothing to clean up
+        self._locks = [Lock() for _ in range(lock_stripes)]
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Optional[CachedResponse]:
+        """Current response for a key, or None if the loader found no data"""
+        response = self._fresh(key)
+        if response is not None:
+            return response if response.source is not None else None
+
+        with self._locks[hash(key) % len(self._locks)]:
+            # Another thread may have loaded it while this one waited
+            response = self._fresh(key)
+            if response is not None:
+                return response if response.source is not None else None
+            response = self._responses.get(key)
+
+            now = time.monotonic()
+            source = loader()
+            if source is None:
+                self._responses.set(key, _Miss(now))
+                return None
+            if response is not None and source is response.source:
+                response.checked_at = now
+                return response
+
+            body = json.dumps(source, separators=(',', ':')).encode()
+            fresh = CachedResponse(source, body, time.time(), now)
+            if response is not None and getattr(response, 'etag', None) == fresh.etag:
+                fresh.last_modified = response.last_modified
+            self._responses.set(key, fresh)
+            return fresh
+
+    def _fresh(self, key: Hashable):
+        """Stored response or miss checked within `max_age`, else None"""
+        response = self._responses.get(key)
+        if response is not None and time.monotonic() - response.checked_at < self.max_age:
+            return response
+        return None
+
+    def clear(self):
+        self._responses.clear()
+
+    def stats(self) -> Dict:
+        return self._responses.stats()
@@ -0,0 +1,271 @@
+import json
+import os
+import time
+from threading import Lock
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from backend.utils.binance_client import BinanceClient
+from backend.utils.candle_buffer import COLUMNS
+from backend.utils.event_bus import EventBus
+from backend.utils.intervals import INTERVAL_MS
+
+# Binance returns at most this many klines per request
+MAX_KLINES_PER_REQUEST = 1000
+
+
+class KlineStore:
+    """On-disk columnar store of closed candles per symbol/interval
+
+    Each column lives in its own append-only file under
+    `<root>/<SYMBOL>/<interval>/` and is read through `np.memmap`, so
+    requests of any length are served from the mapped arrays. Only ranges
+    missing from the store are fetched, using paginated REST `klines`
+    calls; closed candles never change, so nothing is downloaded twice.
+    """
+
+    def __init__(self, root: str, binance_client: Optional[BinanceClient] = None):
+        self.root = root
+        self.binance_client = binance_client
+        self._maps = {}  # (symbol, interval) -> {column: memmap}
+        self._meta = {}
+        self._locks = {}
+        self._locks_lock = Lock()
+
+    def get_historical_data(self, symbol: str, interval: str,
+                            limit: int = 500) -> Optional[pd.DataFrame]:
+        """Latest `limit` candles, like BinanceClient.get_historical_data
+
+        Backfills the gaps before the stored range (if more history is
+        needed) and after it (up to now) first. The still-forming candle is
+        included as the last row but never stored.
+        """
+        now = int(time.time() * 1000)
+        with self._lock(symbol, interval):
+            forming = self._sync_tail(symbol, interval, now)
+            needed = limit - (1 if forming is not None else 0)
+            if self._count(symbol, interval) < needed:
+                self._extend_head(symbol, interval, needed)
+
+            columns = self._columns(symbol, interval)
+            count = self._count(symbol, interval)
+            start = max(count - needed, 0)
+            data = {name: np.array(column[start:count]) for name, column in columns.items()}
+
+        if forming is not None:
+            for name in COLUMNS:
+                data[name] = np.append(data[name], forming[name])
+        if len(data['timestamp']) == 0:
+            return None
+        return self._to_frame(data)
+
+    def get_range(self, symbol: str, interval: str, start_time: int,
+                  end_time: int) -> Dict[str, np.ndarray]:
+        """Stored candles opened in [start_time, end_time] as memory-mapped views
+
+        Missing candles inside the range are fetched first.
+        """
+        now = int(time.time() * 1000)
+        with self._lock(symbol, interval):
+            self._sync_tail(symbol, interval, now)
+            first = self._first_timestamp(symbol, interval)
+            if first is not None and first > start_time:
+                self._fetch_before(symbol, interval, first, start_time)
+            columns = self._columns(symbol, interval)
+            if not columns:
+                return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+            timestamps = columns['timestamp'][:self._count(symbol, interval)]
+            lo = int(np.searchsorted(timestamps, start_time, side='left'))
+            hi = int(np.searchsorted(timestamps, end_time, side='right'))
+            return {name: column[lo:hi] for name, column in columns.items()}
+
+    def append_closed(self, candle: Dict):
+        """Store a closed candle from a stream event if it extends the range"""
+        if not candle.get('closed'):
+            return
+        symbol, interval = candle['symbol'], candle['interval']
+        with self._lock(symbol, interval):
+            last = self._last_timestamp(symbol, interval)
+            if last is not None and candle['timestamp'] != last + INTERVAL_MS[interval]:
+                # Not contiguous; the next sync fetches the gap through REST
+                return
+            self._append(symbol, interval, {name: np.array([candle[name]], dtype=dtype)
+                                            for name, dtype in COLUMNS.items()})
+
+    def attach_event_bus(self, event_bus: EventBus):
+        """Persist closed candles delivered by the market stream"""
+        event_bus.subscribe('kline', self.append_closed)
+
+    def _sync_tail(self, symbol: str, interval: str, now: int) -> Optional[Dict]:
+        """Fetch and store closed candles after the stored range
+
+        Returns the forming candle, if the exchange returned one.
+        """
+        if self.binance_client is None:
+            return None
+        interval_ms = INTERVAL_MS[interval]
+        last = self._last_timestamp(symbol, interval)
+        start = last + interval_ms if last is not None else None
+
+        forming = None
+        while True:
+            if start is None:
+                # Empty store: seed with the latest page
+                df = self.binance_client.get_historical_data(symbol, interval, MAX_KLINES_PER_REQUEST)
+            else:
+                df = self.binance_client.get_historical_data(symbol, interval, MAX_KLINES_PER_REQUEST,
+                                                             start_time=start)
+            if df is None or df.empty:
+                break
+            data = self._from_frame(df)
+            closed = data['timestamp'] + interval_ms <= now
+            if not closed[-1]:
+                forming = {name: values[-1] for name, values in data.items()}
+            self._append(symbol, interval, {name: values[closed] for name, values in data.items()})
+            if start is None or len(df) < MAX_KLINES_PER_REQUEST or not closed.all():
+                break
+            start = int(data['timestamp'][-1]) + interval_ms
+        return forming
+
+    def _extend_head(self, symbol: str, interval: str, needed: int):
+        """Fetch older candles until `needed` are stored or history runs out"""
+        first = self._first_timestamp(symbol, interval)
+        if first is None:
+            return
+        missing = needed - self._count(symbol, interval)
+        self._fetch_before(symbol, interval, first, first - missing * INTERVAL_MS[interval])
+
+    def _fetch_before(self, symbol: str, interval: str, first: int, start_time: int):
+        """Page backwards from `first` down to `start_time` and prepend the result"""
+        if self.binance_client is None or self._meta_for(symbol, interval).get('head_complete'):
+            return
+        pages = []
+        end = first - 1
+        while end >= start_time:
+            df = self.binance_client.get_historical_data(symbol, interval, MAX_KLINES_PER_REQUEST,
+                                                         end_time=end)
+            if df is None:
+                break
+            data = self._from_frame(df)
+            data = {name: values[data['timestamp'] < first] for name, values in data.items()}
+            if len(data['timestamp']):
+                pages.append(data)
+            if len(df) < MAX_KLINES_PER_REQUEST:
+                # Reached the symbol's listing date
+                self._meta_for(symbol, interval)['head_complete'] = True
+                self._save_meta(symbol, interval)
+                break
+            end = int(data['timestamp'][0]) - 1
+        if pages:
+            pages.reverse()
+            self._prepend(symbol, interval, {name: np.concatenate([page[name] for page in pages])
+                                             for name in COLUMNS})
+
+    def _append(self, symbol: str, interval: str, data: Dict[str, np.ndarray]):
+        if len(data['timestamp']) == 0:
+            return
+        last = self._last_timestamp(symbol, interval)
+        if last is not None:
+            newer = data['timestamp'] > last
+            data = {name: values[newer] for name, values in data.items()}
+            if len(data['timestamp']) == 0:
+                return
+        # Cut every column back to the complete rows first, so a crash
+        # mid-append cannot leave the columns misaligned
+        count = self._count(symbol, interval)
+        directory = self._directory(symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+        for name, dtype in COLUMNS.items():
+            path = os.path.join(directory, name)
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                f.truncate(count * np.dtype(dtype).itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(np.ascontiguousarray(data[name], dtype=dtype).tobytes())
+        self._maps.pop((symbol, interval), None)
+
+    def _prepend(self, symbol: str, interval: str, data: Dict[str, np.ndarray]):
+        """Rewrite the column files with older candles in front"""
+        columns = self._columns(symbol, interval)
+        count = self._count(symbol, interval)
+        directory = self._directory(symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+        for name, dtype in COLUMNS.items():
+            path = os.path.join(directory, name)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(np.ascontiguousarray(data[name], dtype=dtype).tobytes())
+                if name in columns:
+                    f.write(np.ascontiguousarray(columns[name][:count]).tobytes())
+            # Existing maps keep the old inode, so readers stay valid
+            os.replace(path + '.tmp', path)
+        self._maps.pop((symbol, interval), None)
+
+    def _columns(self, symbol: str, interval: str) -> Dict[str, np.ndarray]:
+        key = (symbol, interval)
+        if key not in self._maps:
+            directory = self._directory(symbol, interval)
+            maps = {}
+            for name, dtype in COLUMNS.items():
+                path = os.path.join(directory, name)
+                # Only whole values: a torn write can leave a partial one
+                rows = os.path.getsize(path) // np.dtype(dtype).itemsize \
+                    if os.path.exists(path) else 0
+                if rows > 0:
+                    maps[name] = np.memmap(path, dtype=dtype, mode='r', shape=(rows,))
+            self._maps[key] = maps
+        return self._maps[key]
+
+    def _count(self, symbol: str, interval: str) -> int:
+        """Complete rows: a crash mid-append can leave columns of unequal length"""
+        columns = self._columns(symbol, interval)
+        if len(columns) < len(COLUMNS):
+            return 0
+        return min(len(column) for column in columns.values())
+
+    def _first_timestamp(self, symbol: str, interval: str) -> Optional[int]:
+        if self._count(symbol, interval) == 0:
+            return None
+        return int(self._columns(symbol, interval)['timestamp'][0])
+
+    def _last_timestamp(self, symbol: str, interval: str) -> Optional[int]:
+        count = self._count(symbol, interval)
+        if count == 0:
+            return None
+        return int(self._columns(symbol, interval)['timestamp'][count - 1])
+
+    def _directory(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, symbol.upper(), interval)
+
+    def _meta_for(self, symbol: str, interval: str) -> Dict:
+        key = (symbol, interval)
+        if key not in self._meta:
+            path = os.path.join(self._directory(symbol, interval), 'meta.json')
+            try:
+                with open(path) as f:
+                    self._meta[key] = json.load(f)
+            except (OSError, ValueError):
+                self._meta[key] = {}
+        return self._meta[key]
+
+    def _save_meta(self, symbol: str, interval: str):
+        directory = self._directory(symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(self._meta_for(symbol, interval), f)
+
+    def _lock(self, symbol: str, interval: str) -> Lock:
+        with self._locks_lock:
+            return self._locks.setdefault((symbol, interval), Lock())
+
+    @staticmethod
+    def _from_frame(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Column arrays from a BinanceClient klines DataFrame"""
+        data = {name: df[name].to_numpy(dtype=dtype) for name, dtype in COLUMNS.items()
+                if name != 'timestamp'}
+        data['timestamp'] = df['timestamp'].to_numpy().astype('datetime64[ms]').astype(np.int64)
+        return data
+
+    @staticmethod
+    def _to_frame(data: Dict[str, np.ndarray]) -> pd.DataFrame:
+        df = pd.DataFrame({name: data[name] for name in COLUMNS})
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
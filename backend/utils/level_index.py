@@ -0,0 +1,84 @@
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, Tuple
+
+
+class LevelIndex:
+    """Price levels of one symbol kept sorted for range queries
+
+    Prices and level ids are parallel lists in price order, so every query
+    is a pair of binary searches plus the matching slice: O(log n + hits)
+    whatever the number of levels.
+    """
+
+    def __init__(self):
+        self.prices: List[float] = []
+        self.ids: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def add(self, level_id: str, price: float):
+        index = bisect_right(self.prices, price)
+        self.prices.insert(index, price)
+        self.ids.insert(index, level_id)
+
+    def add_many(self, levels: Iterable[Tuple[str, float]]):
+        """Add many (id, price) pairs with one sort instead of one insert each"""
+        merged = sorted(list(zip(self.ids, self.prices)) + list(levels), key=lambda x: x[1])
+        self.ids = [level_id for level_id, _ in merged]
+        self.prices = [price for _, price in merged]
+
+    def remove(self, level_id: str, price: float) -> bool:
+        index = bisect_left(self.prices, price)
+        while index < len(self.prices) and self.prices[index] == price:
+            if self.ids[index] == level_id:
+                del self.prices[index]
+                del self.ids[index]
+                return True
+            index += 1
+        return False
+
+    def remove_where(self, predicate) -> List[str]:
+        """Drop every level whose id matches; returns the dropped ids"""
+        dropped = [level_id for level_id in self.ids if predicate(level_id)]
+        if dropped:
+            kept = [(level_id, price) for level_id, price in zip(self.ids, self.prices)
+                    if not predicate(level_id)]
+            self.ids = [level_id for level_id, _ in kept]
+            self.prices = [price for _, price in kept]
+        return dropped
+
+    def between(self, low: float, high: float) -> List[str]:
+        """Ids of levels priced in [low, high]"""
+        return self.ids[bisect_left(self.prices, low):bisect_right(self.prices, high)]
+
+    def crossed(self, previous: float, price: float) -> Tuple[List[str], List[str]]:
+        """Levels price moved through: (broken from above, reclaimed from below)
+
+        Price is above a level when at or over it, so a fall from
+        `previous` breaks levels in (price, previous] and a rise reclaims
+        levels in (previous, price].
+        """
+        start = bisect_right(self.prices, min(previous, price))
+        end = bisect_right(self.prices, max(previous, price))
+        if price < previous:
+            return self.ids[start:end], []
+        return [], self.ids[start:end]
+
+    def approached(self, previous: float, price: float, percent: float) -> List[str]:
+        """Levels at or below price that a fall brought within `percent` of it
+
+        Only levels outside the band around `previous` count, so a level is
+        reported once as price closes in, not again on every tick inside
+        the band.
+        """
+        if price >= previous:
+            return []
+        low = price * (1 - percent / 100)
+        previous_low = previous * (1 - percent / 100)
+        start = bisect_left(self.prices, low)
+        if price < previous_low:
+            end = bisect_right(self.prices, price)
+        else:
+            end = bisect_left(self.prices, previous_low)
+        return self.ids[start:end]
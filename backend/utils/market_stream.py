@@ -0,0 +1,236 @@
+import asyncio
+import json
+import time
+from threading import Thread
+from typing import Dict, Iterable, List, Optional
+import websockets
+from backend.utils.binance_client import BinanceClient
+from backend.utils.event_bus import EventBus
+from backend.utils.intervals import INTERVAL_MS
+from backend.utils.order_book import parse_levels
+
+# Binance accepts at most 1024 streams per connection
+MAX_STREAMS_PER_CONNECTION = 1024
+
+
+def parse_ticker(data: Dict) -> Dict:
+    """Convert a 24hrTicker stream event to the `get_current_price` format"""
+    return {
+        "symbol": data["s"],
+        "price": float(data["c"]),
+        "change_24h": float(data["P"]),
+        "volume_24h": float(data["v"]),
+        "high_24h": float(data["h"]),
+        "low_24h": float(data["l"]),
+        "timestamp": int(data["C"])
+    }
+
+
+def parse_kline(data: Dict) -> Dict:
+    """Convert a kline stream event to a flat candle dict"""
+    kline = data["k"]
+    return {
+        "symbol": kline["s"],
+        "interval": kline["i"],
+        "timestamp": int(kline["t"]),
+        "open": float(kline["o"]),
+        "high": float(kline["h"]),
+        "low": float(kline["l"]),
+        "close": float(kline["c"]),
+        "volume": float(kline["v"]),
+        "closed": bool(kline["x"])
+    }
+
+
+def parse_depth(data: Dict) -> Dict:
+    """Convert a depthUpdate stream event to price/quantity arrays per side"""
+    bid_prices, bid_quantities = parse_levels(data["b"])
+    ask_prices, ask_quantities = parse_levels(data["a"])
+    return {
+        "symbol": data["s"],
+        "first_update_id": int(data["U"]),
+        "final_update_id": int(data["u"]),
+        "bid_prices": bid_prices,
+        "bid_quantities": bid_quantities,
+        "ask_prices": ask_prices,
+        "ask_quantities": ask_quantities
+    }
+
+
+class MarketStream:
+    """Streams klines and tickers for many symbols into an EventBus
+
+    Subscribes to the combined `<symbol>@kline_<interval>` and
+    `<symbol>@ticker` streams, publishing 'kline', 'ticker' and
+    'stream_status' events; with `depth`, also `<symbol>@depth@100ms` diffs
+    as 'depth' events. After a reconnect, closed candles missed while
+    disconnected are backfilled from the REST `klines` endpoint and
+    published with `backfill: True` before live events resume.
+    """
+
+    def __init__(self, binance_client: BinanceClient, event_bus: EventBus,
+                 symbols: Iterable[str], intervals: Iterable[str] = ('1h',),
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0,
+                 depth: bool = False):
+        self.binance_client = binance_client
+        self.event_bus = event_bus
+        self.symbols = [symbol.upper() for symbol in symbols]
+        self.intervals = list(intervals)
+        self.depth = depth
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._last_closed = {}  # (symbol, interval) -> open time of last closed candle
+        self._connections = {}  # chunk index -> open websocket
+        self._loop = None
+        self._thread = None
+        self._running = False
+
+    @property
+    def stream_url(self) -> str:
+        """Combined-stream endpoint derived from the client's raw-stream URL"""
+        base = self.binance_client.ws_url
+        if base.endswith('/ws'):
+            base = base[:-len('/ws')]
+        return f"{base}/stream"
+
+    @property
+    def connected(self) -> bool:
+        """Whether every stream connection is currently open"""
+        chunks = len(self._stream_chunks())
+        return self._running and len(self._connections) == chunks
+
+    def start(self):
+        """Start streaming on a background thread"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = Thread(target=self._run_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Close the connections and stop the background thread"""
+        self._running = False
+        if self._loop is not None:
+            for ws in list(self._connections.values()):
+                asyncio.run_coroutine_threadsafe(ws.close(), self._loop)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _stream_chunks(self) -> List[List[str]]:
+        streams = []
+        for symbol in self.symbols:
+            lower = symbol.lower()
+            streams.append(f"{lower}@ticker")
+            if self.depth:
+                streams.append(f"{lower}@depth@100ms")
+            streams.extend(f"{lower}@kline_{interval}" for interval in self.intervals)
+        return [streams[i:i + MAX_STREAMS_PER_CONNECTION]
+                for i in range(0, len(streams), MAX_STREAMS_PER_CONNECTION)]
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._consume_all())
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    async def _consume_all(self):
+        await asyncio.gather(*[
+            self._consume_forever(index, chunk)
+            for index, chunk in enumerate(self._stream_chunks())
+        ])
+
+    async def _consume_forever(self, index: int, streams: List[str]):
+        """Keep one combined-stream connection alive, reconnecting with backoff"""
+        delay = self.reconnect_delay
+        connected_before = False
+        while self._running:
+            try:
+                async with websockets.connect(self.stream_url, ping_interval=20) as ws:
+                    await ws.send(json.dumps({"method": "SUBSCRIBE", "params": streams, "id": index + 1}))
+                    if connected_before:
+                        await self._loop.run_in_executor(None, self._backfill, streams)
+                    connected_before = True
+                    self._connections[index] = ws
+                    self.event_bus.publish('stream_status', {'connected': self.connected,
+                                                              'symbols': self.symbols})
+                    delay = self.reconnect_delay
+                    async for message in ws:
+                        self._handle_message(message)
+            except Exception as e:
+                if self._running:
+                    print(f"Market stream connection lost: {str(e)}")
+            finally:
+                if self._connections.pop(index, None) is not None:
+                    self.event_bus.publish('stream_status', {'connected': False,
+                                                              'symbols': self.symbols})
+            if self._running:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _handle_message(self, message: str):
+        payload = json.loads(message)
+        data = payload.get('data')
+        if not data:
+            # Subscription acknowledgements and other control replies
+            return
+        event_type = data.get('e')
+        if event_type == '24hrTicker':
+            self.event_bus.publish('ticker', parse_ticker(data))
+        elif event_type == 'kline':
+            candle = parse_kline(data)
+            if candle['closed']:
+                self._last_closed[(candle['symbol'], candle['interval'])] = candle['timestamp']
+            self.event_bus.publish('kline', candle)
+        elif event_type == 'depthUpdate':
+            self.event_bus.publish('depth', parse_depth(data))
+
+    def _backfill(self, streams: List[str]):
+        """Publish closed candles missed while disconnected"""
+        now = int(time.time() * 1000)
+        for stream in streams:
+            if '@kline_' not in stream:
+                continue
+            symbol, interval = stream.split('@kline_')
+            key = (symbol.upper(), interval)
+            last_closed = self._last_closed.get(key)
+            if last_closed is None:
+                continue
+            for candle in self._fetch_closed_since(key[0], interval, last_closed, now):
+                self._last_closed[key] = candle['timestamp']
+                self.event_bus.publish('kline', candle)
+
+    def _fetch_closed_since(self, symbol: str, interval: str, last_closed: int,
+                            now: int, limit: int = 1000) -> List[Dict]:
+        """Closed candles opened after `last_closed`, paging through REST klines"""
+        candles = []
+        start = last_closed + 1
+        interval_ms = INTERVAL_MS.get(interval, 0)
+        while True:
+            df = self.binance_client.get_historical_data(symbol, interval, limit, start_time=start)
+            if df is None or df.empty:
+                break
+            for row in df.itertuples(index=False):
+                open_time = int(row.timestamp.value // 1_000_000)
+                if open_time + interval_ms > now:
+                    # Still forming; the live stream will deliver it
+                    return candles
+                candles.append({
+                    "symbol": symbol,
+                    "interval": interval,
+                    "timestamp": open_time,
+                    "open": float(row.open),
+                    "high": float(row.high),
+                    "low": float(row.low),
+                    "close": float(row.close),
+                    "volume": float(row.volume),
+                    "closed": True,
+                    "backfill": True
+                })
+            if len(df) < limit:
+                break
+            start = candles[-1]['timestamp'] + 1
+        return candles
@@ -0,0 +1,314 @@
+import pickle
+import queue
+import socket
+import socketserver
+import struct
+import time
+from threading import Lock, Thread
+from typing import Iterator
+from urllib.parse import urlparse
+import socketio
+
+# Every frame on a broker connection is a 4-byte big-endian length plus a pickle
+_LENGTH = struct.Struct('>I')
+
+
+def _send_frame(sock: socket.socket, body: bytes):
+    sock.sendall(_LENGTH.pack(len(body)) + body)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Broker connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _recv_frame(sock: socket.socket) -> bytes:
+    size, = _LENGTH.unpack(_recv_exactly(sock, _LENGTH.size))
+    return _recv_exactly(sock, size)
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class LocalBroker:
+    """Local stand-in for a pub/sub message queue with leases
+
+    A TCP server speaking a minimal protocol: publishers send pickled
+    commands, subscribers get every message published on their channel,
+    and named leases (acquired with a TTL and renewed by their owner)
+    provide leader election. Enough to run several processes on one host,
+    or to exercise cluster mode offline; use Redis across hosts. Messages
+    are pickles, so bind it to a trusted interface only.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.host = host
+        self.port = port
+        self.url = None
+        self._subscribers = {}  # channel -> set of subscriber queues
+        self._leases = {}  # name -> (owner, expiry)
+        self._lock = Lock()
+        self._server = None
+        self._thread = None
+
+    def start(self) -> 'LocalBroker':
+        """Start serving (on a free port if none was given)"""
+        self._server = _TCPServer((self.host, self.port), self._make_handler())
+        self.port = self._server.server_address[1]
+        self.url = f"broker://{self.host}:{self.port}"
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        with self._lock:
+            for subscribers in self._subscribers.values():
+                for subscriber in subscribers:
+                    subscriber.put(None)
+            self._subscribers.clear()
+
+    def serve_forever(self):
+        """Run in the foreground until interrupted"""
+        self.start()
+        try:
+            self._thread.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def subscriber_count(self, channel: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+    def _publish(self, channel: str, body: bytes):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            subscriber.put(body)
+
+    def _acquire(self, name: str, owner: str, ttl: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            holder = self._leases.get(name)
+            if holder is None or holder[0] == owner or holder[1] <= now:
+                self._leases[name] = (owner, now + ttl)
+                return True
+            return False
+
+    def _release(self, name: str, owner: str) -> bool:
+        with self._lock:
+            holder = self._leases.get(name)
+            if holder is not None and holder[0] == owner:
+                del self._leases[name]
+                return True
+            return False
+
+    def _subscribe(self, channel: str, sock: socket.socket):
+        """Forward a channel's messages to a subscriber until it goes away"""
+        messages = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(messages)
+        try:
+            while True:
+                body = messages.get()
+                if body is None:
+                    return
+                _send_frame(sock, body)
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._subscribers.get(channel, set()).discard(messages)
+
+    def _make_handler(self):
+        broker = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                sock = self.request
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                try:
+                    while True:
+                        command = pickle.loads(_recv_frame(sock))
+                        if command[0] == 'publish':
+                            broker._publish(command[1], command[2])
+                        elif command[0] == 'subscribe':
+                            broker._subscribe(command[1], sock)
+                            return
+                        elif command[0] == 'acquire':
+                            _send_frame(sock, pickle.dumps(broker._acquire(*command[1:])))
+                        elif command[0] == 'release':
+                            _send_frame(sock, pickle.dumps(broker._release(*command[1:])))
+                except (OSError, EOFError):
+                    pass
+
+        return Handler
+
+
+class BrokerQueue:
+    """Client of a `LocalBroker` at a broker://host:port URL"""
+
+    def __init__(self, url: str, reconnect_delay: float = 1.0):
+        parsed = urlparse(url)
+        self.address = (parsed.hostname or '127.0.0.1', parsed.port or 6390)
+        self.reconnect_delay = reconnect_delay
+        self._sock = None
+        self._lock = Lock()
+        self._closed = False
+
+    def publish(self, channel: str, message) -> bool:
+        """Send a message to every subscriber of the channel; False if the broker is down"""
+        body = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+        return self._command(('publish', channel, body), reply=False) is not None
+
+    def listen(self, channel: str) -> Iterator:
+        """Messages published on a channel, reconnecting whenever the broker drops"""
+        while not self._closed:
+            try:
+                with socket.create_connection(self.address) as sock:
+                    _send_frame(sock, pickle.dumps(('subscribe', channel)))
+                    while True:
+                        yield pickle.loads(_recv_frame(sock))
+            except OSError as e:
+                if self._closed:
+                    return
+                print(f"Error listening to {channel}: {str(e)}")
+                time.sleep(self.reconnect_delay)
+
+    def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        """Take or renew a lease; False while someone else holds it"""
+        return bool(self._command(('acquire', name, owner, ttl)))
+
+    def release(self, name: str, owner: str) -> bool:
+        return bool(self._command(('release', name, owner)))
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+
+    def _command(self, command, reply: bool = True):
+        """Send a command over the shared connection; None if the broker is unreachable"""
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._sock = socket.create_connection(self.address, timeout=5)
+                    self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                _send_frame(self._sock, pickle.dumps(command))
+                return pickle.loads(_recv_frame(self._sock)) if reply else True
+            except OSError as e:
+                print(f"Error sending {command[0]} to broker: {str(e)}")
+                if self._sock is not None:
+                    self._sock.close()
+                    self._sock = None
+                return None
+
+
+class RedisQueue:
+    """The same interface on Redis pub/sub, with leases as expiring keys"""
+
+    # Renew only our own lease, or take a free one
+    _ACQUIRE = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('pexpire', KEYS[1], ARGV[2])
+    end
+    return redis.call('set', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) and 1 or 0
+    """
+    _RELEASE = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('del', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, url: str, reconnect_delay: float = 1.0):
+        # Optional dependency, only needed for redis:// queues
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self.reconnect_delay = reconnect_delay
+        self._closed = False
+
+    def publish(self, channel: str, message) -> bool:
+        try:
+            self._redis.publish(channel, pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL))
+            return True
+        except Exception as e:
+            print(f"Error publishing to {channel}: {str(e)}")
+            return False
+
+    def listen(self, channel: str) -> Iterator:
+        while not self._closed:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(channel)
+                for item in pubsub.listen():
+                    if item['type'] == 'message':
+                        yield pickle.loads(item['data'])
+            except Exception as e:
+                if self._closed:
+                    return
+                print(f"Error listening to {channel}: {str(e)}")
+                time.sleep(self.reconnect_delay)
+
+    def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        try:
+            return bool(self._redis.eval(self._ACQUIRE, 1, name, owner, int(ttl * 1000)))
+        except Exception as e:
+            print(f"Error acquiring {name}: {str(e)}")
+            return False
+
+    def release(self, name: str, owner: str) -> bool:
+        try:
+            return bool(self._redis.eval(self._RELEASE, 1, name, owner))
+        except Exception as e:
+            print(f"Error releasing {name}: {str(e)}")
+            return False
+
+    def close(self):
+        self._closed = True
+        self._redis.close()
+
+
+def connect_queue(url: str):
+    """Message queue client for a broker:// or redis:// URL"""
+    if url.startswith(('redis://', 'rediss://')):
+        return RedisQueue(url)
+    if url.startswith('broker://'):
+        return BrokerQueue(url)
+    raise ValueError(f"Unsupported message queue URL: {url}")
+
+
+class QueueManager(socketio.PubSubManager):
+    """Socket.IO client manager relaying emits between processes over a message queue
+
+    Every process sharing the queue and channel delivers an emit to the
+    clients it holds, so any of them can emit to any room or client.
+    """
+
+    name = 'queue'
+
+    def __init__(self, message_queue, channel: str = 'flask-socketio', write_only: bool = False):
+        super().__init__(channel=channel, write_only=write_only)
+        self.message_queue = message_queue
+
+    def _publish(self, data):
+        self.message_queue.publish(self.channel, data)
+
+    def _listen(self):
+        yield from self.message_queue.listen(self.channel)
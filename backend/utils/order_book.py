@@ -0,0 +1,192 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+def parse_levels(levels: Sequence[Sequence]) -> Tuple[np.ndarray, np.ndarray]:
+    """Prices and quantities from REST/stream `[["price", "qty"], ...]` pairs"""
+    if not len(levels):
+        return np.empty(0), np.empty(0)
+    array = np.array(levels, dtype=np.float64)
+    return array[:, 0], array[:, 1]
+
+
+class BookSide:
+    """One side of an order book as parallel price-sorted arrays
+
+    Prices are kept ascending whichever the side; `top` reads them from the
+    best end. A batch of updates is merged in one vectorized pass (a zero
+    quantity removes a level), and range sums use a prefix sum rebuilt only
+    when a query follows a change.
+    """
+
+    def __init__(self, descending: bool, max_levels: int = 5000):
+        self.descending = descending  # bids: best price is the highest
+        self.max_levels = max_levels
+        self.prices = np.empty(0)
+        self.quantities = np.empty(0)
+        self._cumulative = None
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def replace(self, prices: np.ndarray, quantities: np.ndarray):
+        """Load a snapshot"""
+        order = np.argsort(prices, kind='stable')
+        keep = quantities[order] > 0
+        self.prices = prices[order][keep]
+        self.quantities = quantities[order][keep]
+        self._cumulative = None
+
+    def update(self, prices: np.ndarray, quantities: np.ndarray):
+        """Set the quantity at each price, inserting or removing levels"""
+        if not len(prices):
+            return
+        if len(prices) > 1:
+            # Sorted, and the last update wins for a price repeated in the batch
+            order = np.argsort(prices, kind='stable')
+            prices, quantities = prices[order], quantities[order]
+            last = np.append(prices[1:] != prices[:-1], True)
+            prices, quantities = prices[last], quantities[last]
+
+        index = np.searchsorted(self.prices, prices)
+        exists = np.zeros(len(prices), dtype=bool)
+        if len(self.prices):
+            found = np.minimum(index, len(self.prices) - 1)
+            exists = self.prices[found] == prices
+        self.quantities[index[exists]] = quantities[exists]
+
+        new = ~exists & (quantities > 0)
+        if new.any():
+            self.prices = np.insert(self.prices, index[new], prices[new])
+            self.quantities = np.insert(self.quantities, index[new], quantities[new])
+        if (quantities[exists] == 0).any():
+            keep = self.quantities > 0
+            self.prices = self.prices[keep]
+            self.quantities = self.quantities[keep]
+        if len(self.prices) > 2 * self.max_levels:
+            self._trim()
+        self._cumulative = None
+
+    def best(self) -> Optional[float]:
+        if not len(self.prices):
+            return None
+        return float(self.prices[-1] if self.descending else self.prices[0])
+
+    def top(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """The `n` best levels, best first"""
+        if self.descending:
+            return self.prices[::-1][:n], self.quantities[::-1][:n]
+        return self.prices[:n], self.quantities[:n]
+
+    def quantity_between(self, low: float, high: float) -> float:
+        """Total quantity resting at prices in [low, high]"""
+        if self._cumulative is None:
+            self._cumulative = np.concatenate([[0.0], np.cumsum(self.quantities)])
+        start = np.searchsorted(self.prices, low, side='left')
+        end = np.searchsorted(self.prices, high, side='right')
+        return float(self._cumulative[end] - self._cumulative[start]) if end > start else 0.0
+
+    def _trim(self):
+        """Drop the levels furthest from the best price beyond `max_levels`"""
+        if self.descending:
+            self.prices = self.prices[-self.max_levels:]
+            self.quantities = self.quantities[-self.max_levels:]
+        else:
+            self.prices = self.prices[:self.max_levels]
+            self.quantities = self.quantities[:self.max_levels]
+
+
+class OrderBook:
+    """Local order book kept from a REST depth snapshot plus diff events
+
+    Follows Binance's sync rules: diffs whose final update id is not past
+    the snapshot's `lastUpdateId` are stale, the first applied diff must
+    straddle it, and each later diff must start right after the previous
+    one. A gap makes `apply_diff` return False, and the book then needs a
+    fresh snapshot.
+    """
+
+    def __init__(self, symbol: str, max_levels: int = 5000):
+        self.symbol = symbol
+        self.bids = BookSide(descending=True, max_levels=max_levels)
+        self.asks = BookSide(descending=False, max_levels=max_levels)
+        self.last_update_id = None  # None until a snapshot is loaded
+        self._first_diff = True
+
+    @property
+    def synced(self) -> bool:
+        return self.last_update_id is not None
+
+    def apply_snapshot(self, snapshot: Dict):
+        """Load a REST `depth` response"""
+        self.bids.replace(*parse_levels(snapshot['bids']))
+        self.asks.replace(*parse_levels(snapshot['asks']))
+        self.last_update_id = int(snapshot['lastUpdateId'])
+        self._first_diff = True
+
+    def apply_diff(self, diff: Dict) -> bool:
+        """Apply a parsed depth event; False if it leaves a gap"""
+        if not self.synced:
+            return False
+        if diff['final_update_id'] <= self.last_update_id:
+            return True
+        if self._first_diff:
+            in_sequence = diff['first_update_id'] <= self.last_update_id + 1
+        else:
+            in_sequence = diff['first_update_id'] == self.last_update_id + 1
+        if not in_sequence:
+            self.last_update_id = None
+            return False
+        self.bids.update(diff['bid_prices'], diff['bid_quantities'])
+        self.asks.update(diff['ask_prices'], diff['ask_quantities'])
+        self.last_update_id = diff['final_update_id']
+        self._first_diff = False
+        return True
+
+    def mid_price(self) -> Optional[float]:
+        best_bid, best_ask = self.bids.best(), self.asks.best()
+        if best_bid is None or best_ask is None:
+            return best_bid or best_ask
+        return (best_bid + best_ask) / 2
+
+    def walls(self, side: str = 'bids', max_distance_percent: float = 5.0,
+              bucket_percent: float = 0.05, min_multiple: float = 5.0) -> List[Dict]:
+        """Clusters of resting liquidity well above the typical level
+
+        Levels within `max_distance_percent` of the mid price are grouped
+        into buckets `bucket_percent` of the mid wide. Buckets holding at
+        least `min_multiple` times the median bucket quantity are walls,
+        reported at their quantity-weighted price, best first.
+        """
+        mid = self.mid_price()
+        book_side = self.bids if side == 'bids' else self.asks
+        if mid is None or not len(book_side):
+            return []
+        span = mid * max_distance_percent / 100
+        low, high = (mid - span, mid) if side == 'bids' else (mid, mid + span)
+        start = np.searchsorted(book_side.prices, low, side='left')
+        end = np.searchsorted(book_side.prices, high, side='right')
+        prices = book_side.prices[start:end]
+        quantities = book_side.quantities[start:end]
+        if not len(prices):
+            return []
+
+        width = mid * bucket_percent / 100
+        buckets = np.floor(np.abs(prices - mid) / width).astype(np.int64)
+        # Prices are sorted, so equal buckets are contiguous
+        starts = np.flatnonzero(np.append(True, buckets[1:] != buckets[:-1]))
+        totals = np.add.reduceat(quantities, starts)
+        weighted = np.add.reduceat(prices * quantities, starts) / totals
+        typical = float(np.median(totals))
+        if typical <= 0:
+            return []
+        ratios = totals / typical
+        found = np.flatnonzero(ratios >= min_multiple)
+        order = found[np.argsort(np.abs(weighted[found] - mid), kind='stable')]
+        return [{
+            'price': float(weighted[i]),
+            'quantity': float(totals[i]),
+            'notional': float(weighted[i] * totals[i]),
+            'distance': round(float(abs(mid - weighted[i]) / mid * 100), 4),
+            'ratio': round(float(ratios[i]), 2)
+        } for i in order]
@@ -0,0 +1,71 @@
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional
+from backend.utils.metrics import registry
+
+BACKED_UP = registry.gauge('socketio_backed_up_clients',
+                           'Clients whose send queue is over the high-water mark')
+COALESCED = registry.counter('socketio_coalesced_total',
+                             'Updates held back for a backed-up client, latest kept per event',
+                             ('event',))
+
+
+class Outbox:
+    """Per-client backpressure for broadcast state updates
+
+    A client whose send queue reaches `high_water` packets is backed up:
+    broadcasts skip it, and only the latest payload of each event is kept
+    for it. Once its queue drains to `low_water`, `refresh` hands back the
+    held payloads, so a slow client gets the current state instead of a
+    backlog while fast clients are unaffected.
+    """
+
+    def __init__(self, queue_size: Callable[[str], Optional[int]],
+                 rooms_of: Callable[[str], Iterable[str]],
+                 high_water: int = 64, low_water: int = 8):
+        self.queue_size = queue_size
+        self.rooms_of = rooms_of
+        self.high_water = high_water
+        self.low_water = low_water
+        self._held = {}  # backed-up sid -> {event: latest payload}
+        self._rooms = {}  # room -> backed-up sids in it
+        self._lock = Lock()
+
+    def backed_up(self, room: str) -> List[str]:
+        """Backed-up clients in a room (or the client itself, for a sid)"""
+        return self._rooms.get(room, [])
+
+    def hold(self, sids: Iterable[str], event: str, payload):
+        with self._lock:
+            for sid in sids:
+                held = self._held.get(sid)
+                if held is not None:
+                    held[event] = payload
+                    COALESCED.inc(event=event)
+
+    def refresh(self, sids: Iterable[str]) -> Dict[str, Dict]:
+        """Re-check the queues of connected clients
+
+        Returns the held payloads of clients that drained, which are no
+        longer backed up; clients missing from `sids` are forgotten.
+        """
+        drained = {}
+        with self._lock:
+            connected = set(sids)
+            for sid in [sid for sid in self._held if sid not in connected]:
+                del self._held[sid]
+            for sid in connected:
+                size = self.queue_size(sid)
+                if size is None:
+                    continue
+                if sid in self._held:
+                    if size <= self.low_water:
+                        drained[sid] = self._held.pop(sid)
+                elif size >= self.high_water:
+                    self._held[sid] = {}
+            rooms = {}
+            for sid in self._held:
+                for room in self.rooms_of(sid):
+                    rooms.setdefault(room, []).append(sid)
+            self._rooms = rooms
+        BACKED_UP.set(len(self._held))
+        return drained
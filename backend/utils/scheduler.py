@@ -0,0 +1,187 @@
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition, Thread
+from typing import Callable, Dict, Optional
+import numpy as np
+from backend.utils.metrics import registry
+
+TASK_LAG = registry.histogram('scheduler_task_lag_seconds',
+                              'How late each task run started after it was due', ('task',))
+TASK_SECONDS = registry.histogram('scheduler_task_seconds', 'Time spent in each task run', ('task',))
+TASK_SKIPPED = registry.counter('scheduler_task_skipped_total',
+                                'Due runs skipped because the previous run was still going',
+                                ('task',))
+TASK_ERRORS = registry.counter('scheduler_task_errors_total', 'Task runs that raised', ('task',))
+
+
+class _Task:
+    def __init__(self, name: str, fn: Callable, interval: Optional[float], align: bool,
+                 offset: float, paused: bool, history: int):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.align = align
+        self.offset = offset
+        self.paused = paused
+        self.next_run = None  # monotonic time of the next periodic run
+        self.triggered_at = None  # monotonic time of a pending trigger
+        self.running = False
+        self.runs = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_seconds = None
+        self.lags = deque(maxlen=history)
+
+    def schedule(self, now: float):
+        """Set `next_run` to the next slot after `now`"""
+        if self.interval is None:
+            self.next_run = None
+        elif self.align:
+            # Wall-clock multiples of the interval, e.g. candle closes
+            wall = time.time()
+            slot = (wall - self.offset) // self.interval * self.interval + self.interval + self.offset
+            self.next_run = now + (slot - wall)
+        else:
+            self.next_run = now + self.interval
+
+
+class Scheduler:
+    """Runs background tasks, each at its own cadence, on a thread pool
+
+    A dispatcher thread starts each task when it is due or triggered. The
+    pool has a thread per task, so a slow task delays only its own next
+    run. A task never overlaps itself: a periodic run that falls due
+    while the previous one is still going is skipped and counted, and
+    triggers during a run are coalesced into a single rerun. Aligned
+    tasks run on wall-clock multiples of their interval plus `offset`,
+    e.g. just after candles close. Lag (how late each run started) and
+    duration are kept per task.
+    """
+
+    def __init__(self, history: int = 512):
+        self.history = history
+        self._tasks: Dict[str, _Task] = {}
+        self._condition = Condition()
+        self._executor = None
+        self._thread = None
+        self._running = False
+
+    def add(self, name: str, fn: Callable, interval: Optional[float] = None,
+            align: bool = False, offset: float = 0.0, paused: bool = False):
+        """Register a task; without an interval it only runs when triggered"""
+        with self._condition:
+            task = _Task(name, fn, interval, align, offset, paused, self.history)
+            task.schedule(time.monotonic())
+            self._tasks[name] = task
+            self._condition.notify()
+
+    def trigger(self, name: str):
+        """Run a task as soon as possible"""
+        with self._condition:
+            task = self._tasks[name]
+            if task.triggered_at is None:
+                task.triggered_at = time.monotonic()
+            self._condition.notify()
+
+    def pause(self, *names: str):
+        with self._condition:
+            for name in names:
+                self._tasks[name].paused = True
+
+    def resume(self, *names: str):
+        with self._condition:
+            now = time.monotonic()
+            for name in names:
+                task = self._tasks[name]
+                if task.paused:
+                    task.paused = False
+                    task.schedule(now)
+            self._condition.notify()
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._executor = ThreadPoolExecutor(max_workers=max(len(self._tasks), 1),
+                                            thread_name_prefix='scheduler')
+        self._thread = Thread(target=self._dispatch, daemon=True)
+        self._thread.start()
+
+    def stop(self, wait: bool = True):
+        """Stop dispatching; with `wait`, let running tasks finish"""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-task runs, skips, errors, last duration and lag percentiles (seconds)"""
+        with self._condition:
+            stats = {}
+            for name, task in self._tasks.items():
+                lags = np.array(task.lags) if task.lags else None
+                stats[name] = {
+                    'interval': task.interval,
+                    'paused': task.paused,
+                    'running': task.running,
+                    'runs': task.runs,
+                    'skipped': task.skipped,
+                    'errors': task.errors,
+                    'last_seconds': task.last_seconds,
+                    'lag_p50': float(np.percentile(lags, 50)) if lags is not None else None,
+                    'lag_p99': float(np.percentile(lags, 99)) if lags is not None else None,
+                    'lag_max': float(lags.max()) if lags is not None else None
+                }
+            return stats
+
+    def _dispatch(self):
+        with self._condition:
+            while self._running:
+                now = time.monotonic()
+                wake = now + 1.0
+                for task in self._tasks.values():
+                    if task.paused:
+                        continue
+                    if task.next_run is not None and task.next_run <= now:
+                        if task.running:
+                            task.skipped += 1
+                            TASK_SKIPPED.inc(task=task.name)
+                        else:
+                            self._submit(task, task.next_run)
+                        task.schedule(now)
+                    if task.triggered_at is not None and not task.running:
+                        self._submit(task, task.triggered_at)
+                        task.triggered_at = None
+                    if task.next_run is not None:
+                        wake = min(wake, task.next_run)
+                self._condition.wait(max(0.0, wake - time.monotonic()))
+
+    def _submit(self, task: _Task, due: float):
+        task.running = True
+        self._executor.submit(self._run, task, due)
+
+    def _run(self, task: _Task, due: float):
+        started = time.monotonic()
+        lag = max(0.0, started - due)
+        TASK_LAG.observe(lag, task=task.name)
+        try:
+            task.fn()
+        except Exception as e:
+            task.errors += 1
+            TASK_ERRORS.inc(task=task.name)
+            print(f"Error in scheduled task {task.name}: {str(e)}")
+        elapsed = time.monotonic() - started
+        TASK_SECONDS.observe(elapsed, task=task.name)
+        with self._condition:
+            task.running = False
+            task.runs += 1
+            task.last_seconds = elapsed
+            task.lags.append(lag)
+            # Let the dispatcher start a rerun that was triggered meanwhile
+            self._condition.notify()
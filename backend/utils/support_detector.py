@@ -1,18 +1,208 @@
+from bisect import bisect_right
 import pandas as pd
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple, Union
 from datetime import datetime, timedelta
+from backend.utils.candle_buffer import CandleBuffer
+from backend.utils.intervals import INTERVAL_MS
+
+# Available detection engines. 'reference' is the original per-candle loop and
+# is kept as the ground truth the vectorized engine is checked against.
+ENGINES = ('vectorized', 'reference')
+
+
+def _sliding_min(values: np.ndarray, window: int) -> np.ndarray:
+    """Minimum of every full window of `values` (van Herk/Gil-Werman, O(n))"""
+    n = len(values)
+    if n < window:
+        return np.empty(0, dtype=values.dtype)
+    num_blocks = -(-n // window)
+    padded = np.full(num_blocks * window, np.inf)
+    padded[:n] = values
+    blocks = padded.reshape(num_blocks, window)
+    prefix = np.minimum.accumulate(blocks, axis=1).ravel()
+    suffix = np.minimum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    starts = np.arange(n - window + 1)
+    return np.minimum(suffix[starts], prefix[starts + window - 1])
+
+
+def _range_max(values: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Maximum of values[start:end] for each (start, end) pair using a sparse table"""
+    table = [values]
+    span = 1
+    while span * 2 <= len(values):
+        prev = table[-1]
+        table.append(np.maximum(prev[:-span], prev[span:]))
+        span *= 2
+    lengths = ends - starts
+    levels = np.floor(np.log2(lengths)).astype(np.int64)
+    result = np.empty(len(starts), dtype=values.dtype)
+    for level in np.unique(levels):
+        mask = levels == level
+        row = table[level]
+        s = starts[mask]
+        e = ends[mask] - (1 << level)
+        result[mask] = np.maximum(row[s], row[e])
+    return result
+
+
+class _DetectionState:
+    """Incremental detection state for one symbol/interval"""
+
+    def __init__(self, lows: np.ndarray, volumes: np.ndarray, timestamps: np.ndarray):
+        self.lows = lows
+        self.volumes = volumes
+        self.timestamps = timestamps
+        # First candle index whose local-minimum status is not decided yet
+        self.next_index = 0
+        # Local minimums in candle order with their touch counts and the
+        # index of the latest candle inside their tolerance band
+        self.minima = np.empty(0, dtype=np.int64)
+        self.touches = np.empty(0, dtype=np.int64)
+        self.last_test = np.empty(0, dtype=np.int64)
+
+
+def _zone_bounds(sorted_prices: List[float], zone_percent: float):
+    """Yield (start, end) runs of sorted prices within `zone_percent` of each run's lowest
+
+    One binary search per zone, so the whole pass is O(zones log k).
+    """
+    start = 0
+    while start < len(sorted_prices):
+        limit = sorted_prices[start] * (1 + zone_percent / 100)
+        end = max(bisect_right(sorted_prices, limit, start), start + 1)
+        yield start, end
+        start = end
+
+
+def cluster_levels(supports: List[Dict], zone_percent: float,
+                   lows: Optional[np.ndarray] = None, tolerance: float = 0.001) -> List[Dict]:
+    """Merge candidate supports into price zones, in price order
+
+    Candidates are sorted once, and each zone spans `zone_percent` of its
+    lowest price, so the threshold does not depend on the overall price
+    range. A zone takes the price, strength (which already combines
+    volume and recency) and other fields of its strongest member, the
+    latest `last_test` of any member, and its touch count: the lows inside
+    the zone's tolerance band when `lows` are given, without counting a
+    candle twice, else the highest member count. It also carries
+    `zone_low`, `zone_high` and `members`.
+    """
+    if not supports:
+        return []
+    ordered = sorted(supports, key=lambda support: support['price'])
+    sorted_prices = [support['price'] for support in ordered]
+
+    bounds = list(_zone_bounds(sorted_prices, zone_percent))
+    lows_in_zone = None
+    if lows is not None and len(lows):
+        # Touches of every zone from two batched binary searches over the sorted lows
+        sorted_lows = np.sort(lows)
+        zone_lows = np.array([sorted_prices[start] for start, _ in bounds])
+        zone_highs = np.array([sorted_prices[end - 1] for _, end in bounds])
+        lows_in_zone = (np.searchsorted(sorted_lows, zone_highs * (1 + tolerance), side='right') -
+                        np.searchsorted(sorted_lows, zone_lows * (1 - tolerance), side='left')).tolist()
+
+    zones = []
+    for zone, (start, end) in enumerate(bounds):
+        members = ordered[start:end]
+        strongest = max(members, key=lambda support: support['strength'])
+        if lows_in_zone is not None:
+            touches = lows_in_zone[zone]
+        else:
+            touches = max(member['touches'] for member in members)
+        last_tests = [member['last_test'] for member in members if member.get('last_test')]
+        zones.append(dict(
+            strongest,
+            touches=touches,
+            last_test=max(last_tests) if last_tests else strongest.get('last_test'),
+            zone_low=sorted_prices[start],
+            zone_high=sorted_prices[end - 1],
+            members=len(members)
+        ))
+    return zones
+
+
+def confluence_zones(levels_by_interval: Dict[str, List[Dict]],
+                     zone_percent: float) -> List[Dict]:
+    """Score the price zones that supports on several intervals agree on
+
+    Levels of every interval are clustered together like `cluster_levels`.
+    A zone's `confluence` (0-100) sums, over the intervals with a level in
+    it, the interval's weight times its strongest level there, divided by
+    the total weight of all intervals. Longer intervals weigh more: 1 plus
+    log2 of their length over the shortest one. Zones come strongest
+    confluence first.
+    """
+    lengths = {interval: INTERVAL_MS.get(interval, 60_000) for interval in levels_by_interval}
+    if not lengths:
+        return []
+    shortest = min(lengths.values())
+    weights = {interval: 1 + np.log2(length / shortest) for interval, length in lengths.items()}
+    total_weight = sum(weights.values())
+
+    entries = sorted(((level['price'], level['strength'], interval)
+                      for interval, levels in levels_by_interval.items() for level in levels),
+                     key=lambda entry: entry[0])
+    if not entries:
+        return []
+    sorted_prices = [entry[0] for entry in entries]
+
+    zones = []
+    for start, end in _zone_bounds(sorted_prices, zone_percent):
+        best = {}  # interval -> (strength, price) of its strongest level in the zone
+        for price, strength, interval in entries[start:end]:
+            if interval not in best or strength > best[interval][0]:
+                best[interval] = (strength, price)
+        score = sum(weights[interval] * strength for interval, (strength, _) in best.items())
+        anchor = max(best, key=lambda interval: weights[interval] * best[interval][0])
+        zones.append({
+            'price': float(best[anchor][1]),
+            'zone_low': float(sorted_prices[start]),
+            'zone_high': float(sorted_prices[end - 1]),
+            'strength': float(max(strength for strength, _ in best.values())),
+            'confluence': round(float(score / total_weight), 2),
+            'intervals': sorted(best, key=lambda interval: lengths[interval])
+        })
+    zones.sort(key=lambda zone: zone['confluence'], reverse=True)
+    return zones
+
+
+def _candle_arrays(candles: Union[pd.DataFrame, CandleBuffer]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Lows, volumes and datetime64 timestamps of a DataFrame or (zero-copy) a CandleBuffer"""
+    if isinstance(candles, CandleBuffer):
+        return (candles.column('low'), candles.column('volume'),
+                candles.column('timestamp').view('datetime64[ms]'))
+    return (np.asarray(candles['low'].values, dtype=np.float64),
+            np.asarray(candles['volume'].values, dtype=np.float64),
+            candles['timestamp'].values)
+
 
 class SupportDetector:
-    def __init__(self, min_touches: int = 3, min_distance_percent: float = 0.5):
+    def __init__(self, min_touches: int = 3, min_distance_percent: float = 0.5,
+                 engine: str = 'vectorized'):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown detection engine: {engine}")
         self.min_touches = min_touches
         self.min_distance_percent = min_distance_percent
+        self.engine = engine
+        self.window_size = 20  # Look for local minimums in 20-candle windows
+        self.tolerance = 0.001
         self._support_levels = {}
         self._last_update = {}
+        self._states = {}  # (symbol, interval) -> _DetectionState
+        # Seconds a snapshot's incremental state stays usable, matching the
+        # 15-minute refresh interval of SupportService
+        self.state_max_age = 900.0
 
-    def detect_support_levels(self, symbol: str, df: pd.DataFrame = None) -> List[Dict]:
+    def detect_support_levels(self, symbol: str,
+                              df: Union[pd.DataFrame, CandleBuffer, None] = None,
+                              engine: Optional[str] = None) -> List[Dict]:
         """
         Detect support levels using price action and volume analysis
+
+        `df` may also be a CandleBuffer, which is read without copying.
+        `engine` overrides the detector's default engine for this call.
         """
         # If no DataFrame is provided, use cached levels or return empty list
         if df is None:
@@ -44,40 +234,337 @@ class SupportDetector:
             
         # If DataFrame is provided, process it
         # Convert price columns to numpy arrays for faster processing
-        lows = df['low'].values
-        volumes = df['volume'].values
-        timestamps = df['timestamp'].values
+        lows, volumes, timestamps = _candle_arrays(df)
+        return self.detect_from_arrays(symbol, lows, volumes, timestamps, engine)
+
+    def detect_from_arrays(self, symbol: str, lows: np.ndarray, volumes: np.ndarray,
+                           timestamps: np.ndarray,
+                           engine: Optional[str] = None) -> List[Dict]:
+        """Detect support levels from raw low/volume/timestamp arrays"""
+        engine = engine or self.engine
+        if engine == 'reference':
+            potential_supports = self._detect_reference(lows, volumes, timestamps)
+        elif engine == 'vectorized':
+            potential_supports = self._detect_vectorized(lows, volumes, timestamps)
+        else:
+            raise ValueError(f"Unknown detection engine: {engine}")
+
+        return self._finalize_levels(symbol, potential_supports, lows)
+
+    def update_support_levels(self, symbol: str, interval: str,
+                              df: Union[pd.DataFrame, CandleBuffer]) -> List[Dict]:
+        """
+        Incrementally update support levels for a symbol/interval
+
+        `df` may be the full history or only its latest candles. Rows newer
+        than the stored history are appended, and rows that overlap it replace
+        any candles that changed (e.g. the still-forming candle). The result
+        equals `detect_support_levels` over the accumulated history.
+        """
+        lows, volumes, timestamps = _candle_arrays(df)
+        return self.update_from_arrays(symbol, interval, lows, volumes, timestamps)
+
+    def update_from_arrays(self, symbol: str, interval: str, lows: np.ndarray,
+                           volumes: np.ndarray, timestamps: np.ndarray) -> List[Dict]:
+        """`update_support_levels` from raw low/volume/timestamp arrays"""
+        key = (symbol, interval)
+        state = self._states.get(key)
+        if state is None or len(lows) == 0:
+            state = self._rebuild_state(lows, volumes, timestamps)
+        else:
+            state = self._merge_candles(state, lows, volumes, timestamps,
+                                        INTERVAL_MS.get(interval))
+        self._states[key] = state
+
+        keep = state.touches >= self.min_touches
+        potential_supports = self._build_supports(
+            state.lows, state.volumes, state.timestamps,
+            state.minima[keep], state.touches[keep], state.last_test[keep]
+        )
+        return self._finalize_levels(symbol, potential_supports, state.lows)
+
+    def state_length(self, symbol: str, interval: str) -> int:
+        """Candles held in a symbol/interval's incremental state (0 if none)"""
+        state = self._states.get((symbol, interval))
+        return len(state.lows) if state is not None else 0
+
+    def state_end(self, symbol: str, interval: str) -> Optional[np.datetime64]:
+        """Timestamp of the latest candle in a symbol/interval's incremental state"""
+        state = self._states.get((symbol, interval))
+        return state.timestamps[-1] if state is not None and len(state.timestamps) else None
+
+    def pop_state(self, symbol: str, interval: str) -> Optional['_DetectionState']:
+        """Remove and return a symbol/interval's incremental state"""
+        return self._states.pop((symbol, interval), None)
+
+    def load_state(self, symbol: str, interval: str, state: '_DetectionState'):
+        """Adopt incremental state built elsewhere, e.g. by a pool worker"""
+        self._states[(symbol, interval)] = state
+
+    def reset_incremental_state(self, symbol: Optional[str] = None,
+                                interval: Optional[str] = None):
+        """Drop incremental state for a symbol/interval, a symbol, or everything"""
+        if symbol is None:
+            self._states.clear()
+            return
+        for key in [k for k in self._states if k[0] == symbol and
+                    (interval is None or k[1] == interval)]:
+            self._states.pop(key, None)
+
+    def export_state(self) -> Dict:
+        """Cached levels and incremental state for a snapshot"""
+        return {
+            'support_levels': dict(self._support_levels),
+            'last_update': dict(self._last_update),
+            'states': dict(self._states)
+        }
+
+    def restore_state(self, state: Dict, age: float = 0.0):
+        """Reload a snapshot taken `age` seconds ago
+
+        Levels keep their detection times. Incremental state is dropped once
+        `age` exceeds `state_max_age`, so candles that closed meanwhile are
+        never missing from it; those symbols are detected from scratch.
+        """
+        self._support_levels.update(state.get('support_levels', {}))
+        self._last_update.update(state.get('last_update', {}))
+        if age <= self.state_max_age:
+            self._states.update(state.get('states', {}))
+
+    def _finalize_levels(self, symbol: str, potential_supports: List[Dict],
+                         lows: Optional[np.ndarray] = None) -> List[Dict]:
+        """Cluster, rank and cache candidate supports"""
+        # Merge supports that are too close to each other into zones
+        filtered_supports = cluster_levels(potential_supports, self.min_distance_percent,
+                                           lows, self.tolerance)
+        
+        # Sort by strength
+        filtered_supports.sort(key=lambda x: x['strength'], reverse=True)
+        
+        # Update cache
+        self._support_levels[symbol] = filtered_supports
+        self._last_update[symbol] = datetime.now()
+        
+        return filtered_supports
+
+    def _rebuild_state(self, lows: np.ndarray, volumes: np.ndarray,
+                       timestamps: np.ndarray) -> '_DetectionState':
+        """Build incremental state from scratch"""
+        # The state owns copies: inputs may be views of a CandleBuffer
+        state = _DetectionState(np.array(lows), np.array(volumes), np.array(timestamps))
+        state.minima = self._scan_local_minima(lows, 0, len(lows))
+        state.touches, state.last_test = self._band_stats(lows, lows[state.minima])
+        state.next_index = max(self.window_size, len(lows) - self.window_size)
+        return state
+
+    def _merge_candles(self, state: '_DetectionState', lows: np.ndarray,
+                       volumes: np.ndarray, timestamps: np.ndarray,
+                       interval_ms: Optional[int] = None) -> '_DetectionState':
+        """Merge a candle batch into existing state
+
+        With `interval_ms`, a batch starting more than one interval after
+        the stored candles replaces them, since the candles in between are
+        unknown.
+        """
+        n = len(state.lows)
+        start = int(np.searchsorted(state.timestamps, timestamps[0]))
+        if start < n and state.timestamps[start] != timestamps[0]:
+            # The batch does not line up with the stored candles
+            return self._rebuild_state(lows, volumes, timestamps)
+        if start == n and n and interval_ms is not None and \
+                timestamps[0] - state.timestamps[-1] > np.timedelta64(interval_ms, 'ms'):
+            # Candles are missing between the stored ones and the batch
+            return self._rebuild_state(lows, volumes, timestamps)
+
+        # Find the first overlapping candle that changed
+        overlap = min(n - start, len(lows))
+        changed = np.flatnonzero(
+            (state.timestamps[start:start + overlap] != timestamps[:overlap]) |
+            (state.lows[start:start + overlap] != lows[:overlap]) |
+            (state.volumes[start:start + overlap] != volumes[:overlap])
+        )
+        first_new = int(changed[0]) if len(changed) else overlap
+        if first_new < overlap:
+            self._truncate_state(state, start + first_new)
+
+        if first_new < len(lows):
+            if len(lows) - first_new >= len(state.lows):
+                # Appending more than the stored history: recompute instead
+                return self._rebuild_state(
+                    np.concatenate([state.lows, lows[first_new:]]),
+                    np.concatenate([state.volumes, volumes[first_new:]]),
+                    np.concatenate([state.timestamps, timestamps[first_new:]])
+                )
+            self._append_candles(state, lows[first_new:], volumes[first_new:],
+                                 timestamps[first_new:])
+        return state
+
+    def _append_candles(self, state: '_DetectionState', lows: np.ndarray,
+                        volumes: np.ndarray, timestamps: np.ndarray):
+        """Append candles, touching only the levels whose bands they fall in"""
+        old_len = len(state.lows)
+        state.lows = np.concatenate([state.lows, lows])
+        state.volumes = np.concatenate([state.volumes, volumes])
+        state.timestamps = np.concatenate([state.timestamps, timestamps])
+
+        # New lows add touches to existing minima and become their last test
+        for position, index in self._band_hits(state, lows):
+            state.touches[index] += 1
+            state.last_test[index] = old_len + position
+
+        # Candles whose windows are now complete may be new local minimums
+        new_minima = self._scan_local_minima(state.lows, state.next_index,
+                                             len(state.lows))
+        state.next_index = max(self.window_size, len(state.lows) - self.window_size)
+        if len(new_minima) == 0:
+            return
+        touches = np.empty(len(new_minima), dtype=np.int64)
+        last_test = np.empty(len(new_minima), dtype=np.int64)
+        for i, level in enumerate(state.lows[new_minima]):
+            hits = np.flatnonzero(self._in_band(state.lows, level))
+            touches[i] = len(hits)
+            last_test[i] = hits[-1]
+        state.minima = np.concatenate([state.minima, new_minima])
+        state.touches = np.concatenate([state.touches, touches])
+        state.last_test = np.concatenate([state.last_test, last_test])
 
+    def _truncate_state(self, state: '_DetectionState', length: int):
+        """Drop candles from `length` onwards, undoing their contributions"""
+        # Minima whose windows reach past the new end are no longer decided
+        keep = state.minima < length - self.window_size
+        state.minima = state.minima[keep]
+        state.touches = state.touches[keep]
+        state.last_test = state.last_test[keep]
+
+        for _, index in self._band_hits(state, state.lows[length:]):
+            state.touches[index] -= 1
+
+        state.lows = state.lows[:length]
+        state.volumes = state.volumes[:length]
+        state.timestamps = state.timestamps[:length]
+        state.next_index = min(state.next_index,
+                               max(self.window_size, length - self.window_size))
+
+        # Levels last tested by a dropped candle fall back to an earlier test
+        for i in np.flatnonzero(state.last_test >= length):
+            hits = np.flatnonzero(self._in_band(state.lows, state.lows[state.minima[i]]))
+            state.last_test[i] = hits[-1]
+
+    def _band_hits(self, state: '_DetectionState', lows: np.ndarray):
+        """Yield (position in `lows`, minimum index) for every band a low falls in"""
+        if len(state.minima) == 0 or len(lows) == 0:
+            return
+        levels = state.lows[state.minima]
+        order = np.argsort(levels, kind='stable')
+        lower_bounds = levels[order] * (1 - self.tolerance)
+        upper_bounds = levels[order] * (1 + self.tolerance)
+        # Both bounds grow with the level, so each low hits a contiguous run
+        ends = np.searchsorted(lower_bounds, lows, side='right')
+        starts = np.searchsorted(upper_bounds, lows, side='left')
+        for position in np.flatnonzero(starts < ends):
+            for index in order[starts[position]:ends[position]]:
+                yield position, index
+
+    def _in_band(self, prices: np.ndarray, level: float) -> np.ndarray:
+        """Mask of prices inside a level's tolerance band"""
+        return (prices >= level * (1 - self.tolerance)) & (prices <= level * (1 + self.tolerance))
+
+    def _detect_reference(self, lows: np.ndarray, volumes: np.ndarray,
+                          timestamps: np.ndarray) -> List[Dict]:
+        """Find candidate supports with the original per-candle loop"""
         potential_supports = []
-        window_size = 20  # Look for local minimums in 20-candle windows
+        window_size = self.window_size
 
         # Find local minimums
         for i in range(window_size, len(lows) - window_size):
             if self._is_local_minimum(lows, i, window_size):
                 price_level = lows[i]
-                touches = self._count_touches(lows, price_level)
+                touches = self._count_touches(lows, price_level, self.tolerance)
                 if touches >= self.min_touches:
                     strength = self._calculate_strength(lows, volumes, price_level, i)
-                    last_test = self._find_last_test(lows, timestamps, price_level)
-                    
+                    last_test = self._find_last_test(lows, timestamps, price_level,
+                                                     self.tolerance)
+
                     potential_supports.append({
                         'price': float(price_level),
                         'strength': strength,
                         'touches': touches,
-                        'last_test': last_test.isoformat() if last_test else None
+                        'last_test': pd.Timestamp(last_test).isoformat() if last_test is not None else None
                     })
 
-        # Filter out supports that are too close to each other
-        filtered_supports = self._filter_close_levels(potential_supports)
-        
-        # Sort by strength
-        filtered_supports.sort(key=lambda x: x['strength'], reverse=True)
-        
-        # Update cache
-        self._support_levels[symbol] = filtered_supports
-        self._last_update[symbol] = datetime.now()
-        
-        return filtered_supports
+        return potential_supports
+
+    def _detect_vectorized(self, lows: np.ndarray, volumes: np.ndarray,
+                           timestamps: np.ndarray) -> List[Dict]:
+        """Find candidate supports for all candles at once
+
+        Produces the same candidates as `_detect_reference` in O(n log n):
+        local minimums come from sliding-window minima, and touch counts and
+        last tests come from binary searches over the sorted lows.
+        """
+        lows = np.asarray(lows, dtype=np.float64)
+        volumes = np.asarray(volumes, dtype=np.float64)
+
+        candidates = self._scan_local_minima(lows, 0, len(lows))
+        touches, last_indices = self._band_stats(lows, lows[candidates])
+
+        keep = touches >= self.min_touches
+        return self._build_supports(lows, volumes, timestamps, candidates[keep],
+                                    touches[keep], last_indices[keep])
+
+    def _scan_local_minima(self, lows: np.ndarray, start: int, stop: int) -> np.ndarray:
+        """Indices in [start, stop) that are local minimums of their window"""
+        window_size = self.window_size
+        start = max(start, window_size)
+        stop = min(stop, len(lows) - window_size)
+        if stop <= start:
+            return np.empty(0, dtype=np.int64)
+
+        # Candle i is a local minimum when it is <= every low in [i - w, i + w)
+        window_mins = _sliding_min(lows[start - window_size:stop + window_size - 1],
+                                   2 * window_size)
+        indices = np.arange(start, stop)
+        return indices[lows[indices] <= window_mins]
+
+    def _band_stats(self, lows: np.ndarray, levels: np.ndarray):
+        """Touch counts and last touching index for every level at once"""
+        if len(levels) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        order = np.argsort(lows, kind='stable')
+        sorted_lows = lows[order]
+        starts = np.searchsorted(sorted_lows, levels * (1 - self.tolerance), side='left')
+        ends = np.searchsorted(sorted_lows, levels * (1 + self.tolerance), side='right')
+
+        # Last test: latest original index among the lows inside the band
+        return ends - starts, _range_max(order, starts, ends)
+
+    def _build_supports(self, lows: np.ndarray, volumes: np.ndarray,
+                        timestamps: np.ndarray, candidates: np.ndarray,
+                        touches: np.ndarray, last_indices: np.ndarray) -> List[Dict]:
+        """Build support dicts for qualifying candidates in candle order"""
+        if len(candidates) == 0:
+            return []
+        levels = lows[candidates]
+
+        # Strength, combined in the same order as `_calculate_strength`
+        touch_score = np.minimum(touches / self.min_touches, 1.0)
+        volume_score = np.minimum(volumes[candidates] / np.mean(volumes), 2.0) / 2.0
+        # The candidate candle is part of its own recent window, so the
+        # distance from recent prices to the level is always zero
+        recency_score = np.ones(len(levels))
+        strengths = np.round((0.4 * touch_score + 0.3 * volume_score +
+                              0.3 * recency_score) * 100, 2)
+
+        last_tests = pd.DatetimeIndex(timestamps[last_indices])
+
+        return [{
+            'price': float(level),
+            'strength': float(strength),
+            'touches': int(touch_count),
+            'last_test': last_test.isoformat()
+        } for level, strength, touch_count, last_test
+            in zip(levels, strengths, touches, last_tests)]
 
     def _is_local_minimum(self, prices: np.ndarray, index: int, window: int) -> bool:
         """Check if price is a local minimum in the given window"""
@@ -96,7 +583,7 @@ class SupportDetector:
                           level: float, index: int) -> float:
         """Calculate support level strength based on multiple factors"""
         # Factor 1: Number of touches
-        touches = self._count_touches(prices, level)
+        touches = self._count_touches(prices, level, self.tolerance)
         
         # Factor 2: Volume confirmation
         volume_score = self._calculate_volume_score(volumes, index)
@@ -126,22 +613,6 @@ class SupportDetector:
         min_distance = np.min(distance_to_level)
         return 1.0 - (min_distance / level)
 
-    def _filter_close_levels(self, supports: List[Dict]) -> List[Dict]:
-        """Filter out support levels that are too close to each other"""
-        if not supports:
-            return []
-
-        filtered = [supports[0]]
-        min_price = min([s['price'] for s in supports])
-        max_price = max([s['price'] for s in supports])
-        min_distance = (max_price - min_price) * (self.min_distance_percent / 100)
-
-        for support in supports[1:]:
-            if all(abs(support['price'] - f['price']) >= min_distance for f in filtered):
-                filtered.append(support)
-
-        return filtered
-
     def _find_last_test(self, prices: np.ndarray, timestamps: np.ndarray, 
                         level: float, tolerance: float = 0.001) -> datetime:
         """Find the last time price tested this level"""
@@ -155,4 +626,9 @@ class SupportDetector:
 
     def get_cached_levels(self, symbol: str) -> List[Dict]:
         """Get cached support levels for a symbol"""
-        return self._support_levels.get(symbol, [])
\ No newline at end of file
+        return self._support_levels.get(symbol, [])
+
+    def cache_levels(self, symbol: str, levels: List[Dict]):
+        """Cache levels detected elsewhere, e.g. in a worker process"""
+        self._support_levels[symbol] = levels
+        self._last_update[symbol] = datetime.now()
\ No newline at end of file
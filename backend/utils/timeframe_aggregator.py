@@ -0,0 +1,295 @@
+import time
+from threading import Lock
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+import pandas as pd
+from backend.utils.candle_buffer import CandleBuffer
+from backend.utils.event_bus import EventBus
+from backend.utils.intervals import INTERVAL_MS
+from backend.utils.kline_store import COLUMNS, MAX_KLINES_PER_REQUEST, KlineStore
+
+# Weekly candles open on Monday 00:00 UTC; the epoch was a Thursday
+BUCKET_OFFSET_MS = {'1w': 4 * 24 * 60 * 60_000}
+
+# Intervals whose open times are not fixed-width buckets from the epoch
+UNALIGNED_INTERVALS = ('3d',)
+
+
+def resample_ohlcv(columns: Dict[str, np.ndarray], interval_ms: int,
+                   offset_ms: int = 0) -> Dict[str, np.ndarray]:
+    """Aggregate time-sorted OHLCV columns into `interval_ms` buckets
+
+    One vectorized pass: bucket boundaries come from the floored open times,
+    highs/lows/volumes are reduced per bucket with `reduceat`. Bucket open
+    times are `offset_ms` plus a multiple of `interval_ms`.
+    """
+    timestamps = columns['timestamp']
+    if len(timestamps) == 0:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+    buckets = (timestamps - offset_ms) // interval_ms * interval_ms + offset_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(timestamps)] - 1
+    return {
+        'timestamp': buckets[starts],
+        'open': columns['open'][starts],
+        'high': np.maximum.reduceat(columns['high'], starts),
+        'low': np.minimum.reduceat(columns['low'], starts),
+        'close': columns['close'][ends],
+        'volume': np.add.reduceat(columns['volume'], starts)
+    }
+
+
+class TimeframeAggregator:
+    """Serves every timeframe of a symbol from one base-interval series
+
+    Closed base candles are kept per symbol in a fixed-capacity
+    `CandleBuffer` of `max_base_candles`, and higher timeframes
+    are resampled from them, so switching timeframes costs no upstream
+    request and every timeframe agrees with the others. Aggregates are
+    updated incrementally: when base candles close, only the last bucket is
+    rebuilt. The still-forming base candle is folded into the last bucket
+    on read. Intervals that are not a multiple of the base interval are
+    passed through to the source.
+    """
+
+    def __init__(self, source, base_interval: str = '1m',
+                 max_base_candles: int = 200_000, refresh_interval: float = 5.0):
+        self.source = source  # KlineStore or BinanceClient
+        self.base_interval = base_interval
+        self.max_base_candles = max_base_candles
+        self.refresh_interval = refresh_interval
+        self._base = {}  # symbol -> CandleBuffer of closed base candles
+        self._forming = {}  # symbol -> forming base candle
+        self._versions = {}  # symbol -> bumped whenever the base series changes
+        self._head_complete = set()  # symbols whose full history is loaded
+        self._aggregates = {}  # (symbol, interval) -> (base version, {column: np.ndarray})
+        self._synced = {}  # symbol -> monotonic time of the last upstream sync
+        self._locks = {}
+        self._locks_lock = Lock()
+
+    def supports(self, interval: str) -> bool:
+        """Whether an interval can be derived from the base series"""
+        interval_ms = INTERVAL_MS.get(interval)
+        return (interval_ms is not None and interval not in UNALIGNED_INTERVALS
+                and interval_ms % INTERVAL_MS[self.base_interval] == 0)
+
+    def get_historical_data(self, symbol: str, interval: str,
+                            limit: int = 500) -> Optional[pd.DataFrame]:
+        """Latest `limit` candles, like BinanceClient.get_historical_data"""
+        if not self.supports(interval):
+            return self.source.get_historical_data(symbol, interval, limit)
+        factor = INTERVAL_MS[interval] // INTERVAL_MS[self.base_interval]
+        with self._lock(symbol):
+            # One extra bucket covers a partial first bucket
+            self._ensure_history(symbol, (limit + 1) * factor)
+            self._sync_tail(symbol)
+            aggregate = self._aggregate(symbol, interval)
+            columns = {name: values[-limit:] for name, values in aggregate.items()}
+            columns = self._with_forming(symbol, interval, columns)
+        if len(columns['timestamp']) == 0:
+            return None
+        return self._to_frame({name: values[-limit:] for name, values in columns.items()})
+
+    def get_many(self, symbol: str, intervals: Iterable[str],
+                 limit: int = 500) -> Dict[str, Optional[pd.DataFrame]]:
+        """Several timeframes of a symbol, all cut from the same base series"""
+        return {interval: self.get_historical_data(symbol, interval, limit)
+                for interval in intervals}
+
+    def get_buffer(self, symbol: str) -> Optional[CandleBuffer]:
+        """The symbol's closed base candles, if loaded; views of it are zero-copy"""
+        return self._base.get(symbol)
+
+    def add_base_candle(self, candle: Dict):
+        """Apply a streamed base-interval candle"""
+        if candle['interval'] != self.base_interval:
+            return
+        symbol = candle['symbol']
+        with self._lock(symbol):
+            if symbol not in self._base:
+                # Nothing loaded yet; the first request fetches it
+                return
+            if candle['closed']:
+                self._merge(symbol, {name: np.array([candle[name]], dtype=dtype)
+                                     for name, dtype in COLUMNS.items()})
+            else:
+                self._forming[symbol] = {name: candle[name] for name in COLUMNS}
+            self._synced[symbol] = time.monotonic()
+
+    def attach_event_bus(self, event_bus: EventBus):
+        """Keep base series current from streamed klines"""
+        event_bus.subscribe('kline', self.add_base_candle)
+
+    def _ensure_history(self, symbol: str, count: int):
+        count = min(count, self.max_base_candles)
+        base = self._base.get(symbol)
+        if base is not None and (len(base) >= count or symbol in self._head_complete):
+            return
+        if base is None or len(base) == 0 or isinstance(self.source, KlineStore):
+            # The store itself fetches only the candles it lacks
+            closed, forming = self._fetch_latest(symbol, count + 1)
+            exhausted = len(closed['timestamp']) < count
+        else:
+            # Page in only the older candles
+            missing = count - len(base)
+            stored = base.columns()
+            older = self._fetch_pages(symbol, missing, end=int(stored['timestamp'][0]) - 1)
+            closed = {name: np.concatenate([older[name], stored[name]]) for name in COLUMNS}
+            forming = self._forming.get(symbol)
+            exhausted = len(older['timestamp']) < missing
+        if exhausted:
+            self._head_complete.add(symbol)
+        if base is None:
+            base = self._base[symbol] = CandleBuffer(self.max_base_candles)
+        base.replace(closed)
+        self._forming[symbol] = forming
+        self._versions[symbol] = self._versions.get(symbol, 0) + 1
+        self._synced.setdefault(symbol, time.monotonic())
+        for key in [key for key in self._aggregates if key[0] == symbol]:
+            self._aggregates.pop(key, None)
+
+    def _sync_tail(self, symbol: str):
+        """Fetch base candles closed since the last sync, unless recently synced"""
+        now = time.monotonic()
+        if now - self._synced.get(symbol, 0) < self.refresh_interval:
+            return
+        last = self._base[symbol].last_timestamp
+        if last is not None:
+            elapsed = int(time.time() * 1000) - last
+            missing = max(elapsed // INTERVAL_MS[self.base_interval], 1)
+        else:
+            missing = MAX_KLINES_PER_REQUEST
+        closed, forming = self._fetch_latest(symbol, missing + 1)
+        self._merge(symbol, closed)
+        self._forming[symbol] = forming
+        self._synced[symbol] = now
+
+    def _fetch_latest(self, symbol: str, count: int) -> Tuple[Dict[str, np.ndarray], Optional[Dict]]:
+        """Latest `count` base candles, split into closed columns and the forming candle"""
+        if isinstance(self.source, KlineStore):
+            df = self.source.get_historical_data(symbol, self.base_interval, count)
+            data = self._from_frame(df) if df is not None else self._empty()
+        else:
+            data = self._fetch_pages(symbol, count)
+        now = int(time.time() * 1000)
+        closed = data['timestamp'] + INTERVAL_MS[self.base_interval] <= now
+        forming = None
+        if len(closed) and not closed[-1]:
+            forming = {name: values[-1] for name, values in data.items()}
+        return {name: values[closed] for name, values in data.items()}, forming
+
+    def _fetch_pages(self, symbol: str, count: int, end: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Up to `count` REST klines opened at or before `end` (default: now), paging backwards"""
+        pages = []
+        while count > 0:
+            limit = min(count, MAX_KLINES_PER_REQUEST)
+            page = self._fetch_page(symbol, limit, end)
+            if page is None or len(page['timestamp']) == 0:
+                break
+            pages.append(page)
+            count -= len(page['timestamp'])
+            if len(page['timestamp']) < limit:
+                break
+            end = int(page['timestamp'][0]) - 1
+        if not pages:
+            return self._empty()
+        pages.reverse()
+        return {name: np.concatenate([page[name] for page in pages]) for name in COLUMNS}
+
+    def _fetch_page(self, symbol: str, limit: int, end: Optional[int]) -> Optional[Dict[str, np.ndarray]]:
+        """One klines request as columns, skipping the DataFrame when the client can"""
+        kwargs = {} if end is None else {'end_time': end}
+        if hasattr(self.source, 'get_candles'):
+            return self.source.get_candles(symbol, self.base_interval, limit, **kwargs)
+        df = self.source.get_historical_data(symbol, self.base_interval, limit, **kwargs)
+        return self._from_frame(df) if df is not None else None
+
+    def _merge(self, symbol: str, data: Dict[str, np.ndarray]):
+        """Append closed base candles newer than the stored ones"""
+        base = self._base[symbol]
+        last = base.last_timestamp
+        if last is not None:
+            newer = data['timestamp'] > last
+            data = {name: values[newer] for name, values in data.items()}
+        count = len(data['timestamp'])
+        if count == 0:
+            return
+        if len(base) + count > base.capacity:
+            self._head_complete.discard(symbol)
+            # The oldest buckets changed: rebuild aggregates from scratch
+            for key in [key for key in self._aggregates if key[0] == symbol]:
+                self._aggregates.pop(key, None)
+        base.append(data)
+        self._versions[symbol] += 1
+        forming = self._forming.get(symbol)
+        if forming is not None and forming['timestamp'] <= base.last_timestamp:
+            self._forming[symbol] = None
+
+    def _aggregate(self, symbol: str, interval: str) -> Dict[str, np.ndarray]:
+        """Resampled closed base candles, rebuilding only the buckets that changed"""
+        key = (symbol, interval)
+        base = self._base[symbol].columns()
+        version = self._versions[symbol]
+        cached = self._aggregates.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        interval_ms = INTERVAL_MS[interval]
+        offset = BUCKET_OFFSET_MS.get(interval, 0)
+        if cached is None or len(cached[1]['timestamp']) == 0:
+            aggregate = resample_ohlcv(base, interval_ms, offset)
+            if len(aggregate['timestamp']) and aggregate['timestamp'][0] != base['timestamp'][0]:
+                # The series starts mid-bucket: its first bucket is incomplete
+                aggregate = {name: values[1:] for name, values in aggregate.items()}
+        else:
+            previous = cached[1]
+            start = int(np.searchsorted(base['timestamp'], previous['timestamp'][-1]))
+            tail = resample_ohlcv({name: values[start:] for name, values in base.items()},
+                                  interval_ms, offset)
+            aggregate = {name: np.concatenate([previous[name][:-1], tail[name]])
+                         for name in COLUMNS}
+        self._aggregates[key] = (version, aggregate)
+        return aggregate
+
+    def _with_forming(self, symbol: str, interval: str,
+                      columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Fold the forming base candle into the last (or a new) bucket"""
+        forming = self._forming.get(symbol)
+        if forming is None:
+            return columns
+        interval_ms = INTERVAL_MS[interval]
+        offset = BUCKET_OFFSET_MS.get(interval, 0)
+        bucket = (int(forming['timestamp']) - offset) // interval_ms * interval_ms + offset
+        timestamps = columns['timestamp']
+        if len(timestamps) and timestamps[-1] == bucket:
+            columns = {name: values.copy() for name, values in columns.items()}
+            columns['high'][-1] = max(columns['high'][-1], forming['high'])
+            columns['low'][-1] = min(columns['low'][-1], forming['low'])
+            columns['close'][-1] = forming['close']
+            columns['volume'][-1] += forming['volume']
+        elif not len(timestamps) or timestamps[-1] < bucket:
+            row = dict(forming, timestamp=bucket)
+            columns = {name: np.append(values, row[name]).astype(values.dtype)
+                       for name, values in columns.items()}
+        return columns
+
+    def _lock(self, symbol: str) -> Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(symbol, Lock())
+
+    @staticmethod
+    def _empty() -> Dict[str, np.ndarray]:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+    @staticmethod
+    def _from_frame(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        data = {name: df[name].to_numpy(dtype=dtype) for name, dtype in COLUMNS.items()
+                if name != 'timestamp'}
+        data['timestamp'] = df['timestamp'].to_numpy().astype('datetime64[ms]').astype(np.int64)
+        return data
+
+    @staticmethod
+    def _to_frame(data: Dict[str, np.ndarray]) -> pd.DataFrame:
+        df = pd.DataFrame({name: data[name] for name in COLUMNS})
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        return df
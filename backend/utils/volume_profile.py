@@ -0,0 +1,134 @@
+import math
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+
+class VolumeProfile:
+    """Volume-at-price histogram with fixed-width bins
+
+    Each candle's volume is spread evenly across its low-high range, so a bin
+    receives the share of the volume proportional to its overlap with the
+    candle. Bins are anchored at `origin` and grow on either side as candles
+    outside the current range are added, which makes appending a candle an
+    O(bins it covers) update instead of a full recompute.
+    """
+
+    def __init__(self, bin_size: float, origin: float, tick_size: Optional[float] = None):
+        if bin_size <= 0:
+            raise ValueError("bin_size must be positive")
+        self.bin_size = bin_size
+        self.origin = origin
+        self.tick_size = tick_size
+        self.volumes = np.zeros(0)
+        self._offset = 0  # array index of the bin starting at `origin`
+
+    @classmethod
+    def from_candles(cls, lows: np.ndarray, highs: np.ndarray, volumes: np.ndarray,
+                     num_bins: int = 50, tick_size: Optional[float] = None) -> 'VolumeProfile':
+        """Build a profile with about `num_bins` bins over the candles' range
+
+        With `tick_size`, bin edges sit on multiples of the tick and the bin
+        width is rounded up to a whole number of ticks.
+        """
+        lows = np.asarray(lows, dtype=np.float64)
+        highs = np.asarray(highs, dtype=np.float64)
+        low, high = float(lows.min()), float(highs.max())
+
+        bin_size = (high - low) / num_bins
+        origin = low
+        if tick_size:
+            bin_size = max(math.ceil(bin_size / tick_size), 1) * tick_size
+            origin = math.floor(low / tick_size) * tick_size
+        elif bin_size <= 0:
+            # Flat range: one bin holding all the volume
+            bin_size = abs(low) or 1.0
+
+        profile = cls(bin_size, origin, tick_size)
+        profile.add(lows, highs, volumes)
+        return profile
+
+    def add(self, lows: np.ndarray, highs: np.ndarray, volumes: np.ndarray):
+        """Add candles to the profile; pass negative volumes to remove them"""
+        lows = np.atleast_1d(np.asarray(lows, dtype=np.float64))
+        highs = np.atleast_1d(np.asarray(highs, dtype=np.float64))
+        volumes = np.atleast_1d(np.asarray(volumes, dtype=np.float64))
+        if len(lows) == 0:
+            return
+
+        # Candle range in bin units relative to the origin
+        start = (lows - self.origin) / self.bin_size
+        end = (highs - self.origin) / self.bin_size
+        first = np.floor(start).astype(np.int64)
+        last = np.floor(end).astype(np.int64)
+        # A high that sits exactly on a bin edge belongs to the bin below
+        on_edge = (last > first) & (end == last)
+        last[on_edge] -= 1
+
+        self._ensure_range(int(first.min()), int(last.max()))
+        first_bin = first + self._offset
+        last_bin = last + self._offset
+        size = len(self.volumes)
+
+        width = end - start
+        single = (first == last) | (width <= 0)
+        rate = np.where(single, 0.0, volumes / np.where(width > 0, width, 1.0))
+
+        contributions = np.zeros(size + 1)
+        # Candles inside one bin put all their volume there
+        contributions += np.bincount(first_bin[single], weights=volumes[single],
+                                     minlength=size + 1)
+
+        spread = ~single
+        if spread.any():
+            # Partial first and last bins
+            contributions += np.bincount(first_bin[spread],
+                                         weights=rate[spread] * (first[spread] + 1 - start[spread]),
+                                         minlength=size + 1)
+            contributions += np.bincount(last_bin[spread],
+                                         weights=rate[spread] * (end[spread] - last[spread]),
+                                         minlength=size + 1)
+            # Whole bins in between via a difference array
+            diff = np.bincount(first_bin[spread] + 1, weights=rate[spread], minlength=size + 1)
+            diff -= np.bincount(last_bin[spread], weights=rate[spread], minlength=size + 1)
+            contributions += np.cumsum(diff)
+
+        self.volumes += contributions[:size]
+
+    def _ensure_range(self, first: int, last: int):
+        """Grow the bin array so bins `first..last` (origin-relative) exist"""
+        if len(self.volumes) == 0:
+            self._offset = -first
+            self.volumes = np.zeros(last - first + 1)
+            return
+        if first + self._offset < 0:
+            grow = -(first + self._offset)
+            self.volumes = np.concatenate([np.zeros(grow), self.volumes])
+            self._offset += grow
+        if last + self._offset >= len(self.volumes):
+            grow = last + self._offset - len(self.volumes) + 1
+            self.volumes = np.concatenate([self.volumes, np.zeros(grow)])
+
+    def levels(self) -> List[Dict]:
+        """Non-empty bins as `{'price_level', 'volume'}` dicts, lowest first"""
+        if len(self.volumes) == 0:
+            return []
+        # Ignore rounding residue left behind by removed candles
+        filled = np.flatnonzero(self.volumes > self.volumes.max() * 1e-12)
+        prices = self.origin + (filled - self._offset) * self.bin_size
+        if self.tick_size:
+            # Snap edges back onto the tick grid to drop float noise
+            decimals = max(-Decimal(str(self.tick_size)).as_tuple().exponent, 0)
+            prices = np.round(prices, decimals)
+        return [{
+            'price_level': price,
+            'volume': volume
+        } for price, volume in zip(prices.tolist(), self.volumes[filled].tolist())]
+
+
+def volume_profile_from_frame(df: pd.DataFrame, num_bins: int = 50,
+                              tick_size: Optional[float] = None) -> VolumeProfile:
+    """Build a VolumeProfile from a candle DataFrame"""
+    return VolumeProfile.from_candles(df['low'].values, df['high'].values,
+                                      df['volume'].values, num_bins, tick_size)
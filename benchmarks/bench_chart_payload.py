@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Chart payload benchmark
+Compares the legacy iterrows serialization with the row and columnar layouts
+built by PriceService._process_historical_data.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.price_service import PriceService
+from fixtures import synthetic_candles
+
+
+def legacy_rows(df: pd.DataFrame):
+    """The original per-row serialization"""
+    return [{
+        'timestamp': row['timestamp'].isoformat(),
+        'open': float(row['open']),
+        'high': float(row['high']),
+        'low': float(row['low']),
+        'close': float(row['close']),
+        'volume': float(row['volume'])
+    } for _, row in df.iterrows()]
+
+
+def best_of(func, repeat: int) -> float:
+    """Best wall time of `repeat` runs, in milliseconds"""
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chart payload benchmark')
+    parser.add_argument('--limits', type=int, nargs='+', default=[500, 1000, 5000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    service = PriceService(binance_client=None)
+    print(f"{'limit':>6} {'iterrows ms':>12} {'rows ms':>9} {'columnar ms':>12} "
+          f"{'speedup':>8} {'rows KB':>8} {'columnar KB':>12}")
+    for limit in args.limits:
+        df = synthetic_candles(limit)
+        assert service._row_candles(df) == legacy_rows(df)
+
+        legacy_ms = best_of(lambda: legacy_rows(df), args.repeat)
+        rows_ms = best_of(lambda: service._row_candles(df), args.repeat)
+        columnar_ms = best_of(lambda: service._columnar_candles(df), args.repeat)
+        rows_kb = len(json.dumps(service._row_candles(df))) / 1024
+        columnar_kb = len(json.dumps(service._columnar_candles(df))) / 1024
+        print(f"{limit:>6} {legacy_ms:>12.2f} {rows_ms:>9.2f} {columnar_ms:>12.2f} "
+              f"{legacy_ms / columnar_ms:>7.1f}x {rows_kb:>8.1f} {columnar_kb:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Benchmark fixtures
+Deterministic synthetic candles and recorded Binance klines, loaded offline.
+"""
+import glob
+import json
+import os
+from typing import Dict
+import numpy as np
+import pandas as pd
+from backend.utils.binance_client import klines_to_frame
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recorded')
+
+
+def synthetic_candles(limit: int, seed: int = 7) -> pd.DataFrame:
+    """Random-walk OHLCV candles shaped like BinanceClient.get_historical_data output"""
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.002, limit)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.001, limit)) * close
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(1_600_000_000_000 + np.arange(limit) * 60_000, unit='ms'),
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.exponential(5, limit)
+    })
+
+
+def record_fixture(binance_client, symbol: str, interval: str, limit: int = 1000) -> str:
+    """Save raw REST klines to recorded/<SYMBOL>_<interval>.json for offline runs"""
+    params = {"symbol": symbol, "interval": interval, "limit": limit}
+    klines = binance_client._request("klines", params, weight=2)
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    path = os.path.join(FIXTURE_DIR, f"{symbol}_{interval}.json")
+    with open(path, 'w') as f:
+        json.dump(klines, f)
+    return path
+
+
+def recorded_fixtures() -> Dict[str, pd.DataFrame]:
+    """Recorded klines by fixture name, converted like BinanceClient does"""
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.json'))):
+        with open(path) as f:
+            fixtures[os.path.splitext(os.path.basename(path))[0]] = klines_to_frame(json.load(f))
+    return fixtures
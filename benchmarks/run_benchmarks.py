@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+"""
+Benchmark suite
+Times support detection, volume profiles, chart payload serialization,
+candle buffer writes and Socket.IO fan-out on deterministic synthetic candles (and any recorded kline
+fixtures), fully offline. Results are written as JSON; pass a saved result
+file as --baseline to flag regressions.
+
+    python benchmarks/run_benchmarks.py --output baseline.json
+    python benchmarks/run_benchmarks.py --baseline baseline.json
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.price_service import PriceService
+from backend.services.support_service import SupportService
+from backend.utils.candle_buffer import CandleBuffer
+from backend.utils.delta_protocol import encode_columns
+from backend.utils.support_detector import SupportDetector
+from fixtures import record_fixture, recorded_fixtures, synthetic_candles
+
+GROUPS = ('detection', 'volume_profile', 'serialization', 'storage', 'fanout')
+CANDLE_COUNTS = [500, 5_000, 50_000, 1_000_000]
+SYMBOL_COUNTS = [1, 10, 100, 500]
+
+# Slow legacy paths are only timed up to these sizes
+MAX_REFERENCE_CANDLES = 5_000
+MAX_ROW_CANDLES = 50_000
+
+
+def measure(func: Callable, repeat: int, setup: Optional[Callable] = None) -> Dict:
+    """Best wall time of `repeat` runs and peak traced memory of one run"""
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    times = timeit.repeat(func, setup=setup or (lambda: None), number=1, repeat=repeat)
+    return {'time_ms': round(min(times) * 1000, 4), 'peak_kb': round(peak / 1024, 1)}
+
+
+def case(name: str, dataset: str, candles: int, symbols: int, func: Callable,
+         repeat: int, setup: Optional[Callable] = None) -> Dict:
+    result = {'name': name, 'dataset': dataset, 'candles': candles, 'symbols': symbols}
+    result.update(measure(func, repeat, setup))
+    result['key'] = f"{name}[{dataset},candles={candles},symbols={symbols}]"
+    return result
+
+
+def datasets(candle_counts: List[int]) -> Iterator:
+    """(dataset name, DataFrame) for each synthetic size and recorded fixture"""
+    for count in candle_counts:
+        yield 'synthetic', synthetic_candles(count)
+    for name, df in recorded_fixtures().items():
+        yield f"recorded:{name}", df
+
+
+def bench_detection(candle_counts: List[int], symbol_counts: List[int], repeat: int) -> Iterator[Dict]:
+    detector = SupportDetector()
+    for dataset, df in datasets(candle_counts):
+        lows, volumes, timestamps = df['low'].values, df['volume'].values, df['timestamp'].values
+        yield case('detection.vectorized', dataset, len(df), 1,
+                   lambda: detector.detect_from_arrays('BENCH', lows, volumes, timestamps, 'vectorized'),
+                   repeat)
+        if len(df) <= MAX_REFERENCE_CANDLES:
+            vectorized = detector.detect_from_arrays('BENCH', lows, volumes, timestamps, 'vectorized')
+            reference = detector.detect_from_arrays('BENCH', lows, volumes, timestamps, 'reference')
+            if vectorized != reference:
+                raise AssertionError(f"Detection engines disagree on {dataset} ({len(df)} candles)")
+            yield case('detection.reference', dataset, len(df), 1,
+                       lambda: detector.detect_from_arrays('BENCH', lows, volumes, timestamps, 'reference'),
+                       repeat)
+
+        # One newly closed candle on top of the existing history
+        def prime():
+            detector.reset_incremental_state('BENCH')
+            detector.update_support_levels('BENCH', '1m', df.iloc[:-1])
+        yield case('detection.incremental', dataset, len(df), 1,
+                   lambda: detector.update_support_levels('BENCH', '1m', df.iloc[-1:]),
+                   repeat, setup=prime)
+
+    # Batch refresh over the detection process pool
+    service = SupportService(SupportDetector())
+    try:
+        for count in symbol_counts:
+            candles = {(f"SYM{i}USDT", '1h'): synthetic_candles(500, seed=i) for i in range(count)}
+            symbols = [symbol for symbol, _ in candles]
+            service.refresh_many(symbols, ['1h'], candles=candles)  # start the workers
+            yield case('detection.batch', 'synthetic', 500, count,
+                       lambda: service.refresh_many(symbols, ['1h'], candles=candles), repeat)
+    finally:
+        service.shutdown()
+
+
+def bench_volume_profile(candle_counts: List[int], repeat: int) -> Iterator[Dict]:
+    service = PriceService(binance_client=None)
+    for dataset, df in datasets(candle_counts):
+        yield case('volume_profile', dataset, len(df), 1,
+                   lambda: service._calculate_volume_profile(df), repeat)
+
+
+def bench_serialization(candle_counts: List[int], repeat: int) -> Iterator[Dict]:
+    service = PriceService(binance_client=None)
+    for dataset, df in datasets(candle_counts):
+        if len(df) <= MAX_ROW_CANDLES:
+            yield case('serialization.rows', dataset, len(df), 1,
+                       lambda: json.dumps(service._process_historical_data(df, 'rows')), repeat)
+        yield case('serialization.columnar', dataset, len(df), 1,
+                   lambda: json.dumps(service._process_historical_data(df, 'columnar')), repeat)
+        columns = {name: df[name].to_numpy() for name in ('open', 'high', 'low', 'close', 'volume')}
+        columns['timestamp'] = df['timestamp'].to_numpy().astype('datetime64[ms]').astype(np.int64)
+        yield case('serialization.binary', dataset, len(df), 1,
+                   lambda: encode_columns(columns, 'binary'), repeat)
+
+
+def bench_storage(candle_counts: List[int], repeat: int) -> Iterator[Dict]:
+    """1000 closed-candle appends and forming-candle updates on a full CandleBuffer"""
+    for dataset, df in datasets(candle_counts):
+        columns = {name: df[name].to_numpy() for name in ('open', 'high', 'low', 'close', 'volume')}
+        columns['timestamp'] = df['timestamp'].to_numpy().astype('datetime64[ms]').astype(np.int64)
+        buffer = CandleBuffer.from_columns(columns, capacity=len(df))
+        step = int(columns['timestamp'][-1] - columns['timestamp'][-2]) if len(df) > 1 else 60_000
+        candle = {name: float(values[-1]) for name, values in columns.items()}
+
+        def append():
+            last = buffer.last_timestamp
+            for i in range(1, 1001):
+                buffer.upsert(dict(candle, timestamp=last + i * step))
+
+        def update():
+            last = buffer.last_timestamp
+            for i in range(1000):
+                buffer.upsert(dict(candle, timestamp=last, close=candle['close'] + i))
+
+        yield case('storage.append', dataset, len(df), 1, append, repeat)
+        yield case('storage.update_forming', dataset, len(df), 1, update, repeat)
+
+
+def bench_fanout(symbol_counts: List[int], repeat: int) -> Iterator[Dict]:
+    """One broadcast tick for N watched symbols, each with a full-payload and a delta client"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        import backend.app as app_module
+
+    class Prices:
+        def get_current_price(self, symbol):
+            return {'symbol': symbol, 'price': 1.0, 'change_24h': 0.0}
+
+        def get_historical_data(self, symbol, interval, limit=500, fmt='rows'):
+            return None
+
+    class Supports:
+        # Every pair counts as detected, so nothing is queued for refresh
+        def is_refreshed(self, symbol, interval):
+            return True
+
+        def get_interval_levels(self, symbol, interval):
+            return []
+
+        def should_update_supports(self, symbol):
+            return False
+
+    app_module.price_service = Prices()
+    app_module.support_service = Supports()
+    ticks = itertools.count()
+    df = synthetic_candles(500)
+    payload = PriceService(binance_client=None)._process_historical_data(df, 'columnar')
+
+    for count in symbol_counts:
+        pairs = [f"SYM{i}USDT" for i in range(count)]
+        clients = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for pair in pairs:
+                for query in ('', 'updates=delta&encoding=binary'):
+                    client = app_module.socketio.test_client(app_module.app, query_string=query)
+                    client.emit('change_pair', {'pair': pair})
+                    clients.append(client)
+        for pair in pairs:
+            app_module.chart_channel(pair, '1h').update(payload)
+
+        def drain():
+            for client in clients:
+                client.get_received()
+
+        def tick():
+            price = 1.0 + next(ticks)
+            for pair in pairs:
+                app_module.broadcast(pair, 'price_update',
+                                     {'symbol': pair, 'price': price, 'change_24h': 0.0})
+                delta = app_module.chart_channel(pair, '1h').apply_candle({
+                    'timestamp': int(payload['price']['timestamp'][-1]), 'open': price,
+                    'high': price + 1, 'low': price - 1, 'close': price, 'volume': 1.0
+                })
+                app_module.publish_chart_delta(pair, '1h', delta)
+
+        try:
+            yield case('fanout.tick', 'synthetic', 500, count, tick, repeat, setup=drain)
+        finally:
+            for client in clients:
+                client.disconnect()
+
+
+def compare(results: List[Dict], baseline: Dict, threshold: float, min_ms: float) -> List[Dict]:
+    """Results slower than the baseline by more than `threshold` (and `min_ms`)"""
+    previous = {result['key']: result for result in baseline.get('results', [])}
+    regressions = []
+    print(f"\n{'benchmark':<70} {'base ms':>10} {'now ms':>10} {'change':>8}")
+    for result in results:
+        old = previous.get(result['key'])
+        if old is None:
+            continue
+        change = result['time_ms'] / old['time_ms'] - 1 if old['time_ms'] else 0.0
+        regressed = change > threshold and result['time_ms'] - old['time_ms'] > min_ms
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{result['key']:<70} {old['time_ms']:>10.3f} {result['time_ms']:>10.3f} "
+              f"{change:>+7.1%}{flag}")
+        if regressed:
+            regressions.append(dict(result, baseline_ms=old['time_ms'], change=change))
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Offline benchmark suite')
+    parser.add_argument('--groups', nargs='+', choices=GROUPS, default=list(GROUPS))
+    parser.add_argument('--candles', type=int, nargs='+', default=CANDLE_COUNTS,
+                        help='Candle counts per dataset')
+    parser.add_argument('--symbols', type=int, nargs='+', default=SYMBOL_COUNTS,
+                        help='Symbol counts for batch detection and fan-out')
+    parser.add_argument('--quick', action='store_true',
+                        help='Small sizes only (500/5000 candles, 1/10 symbols)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+    parser.add_argument('--baseline', type=str, help='Compare against a saved result file')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Relative slowdown reported as a regression')
+    parser.add_argument('--min-ms', type=float, default=0.1,
+                        help='Ignore slowdowns smaller than this many milliseconds')
+    parser.add_argument('--record', nargs=2, metavar=('SYMBOL', 'INTERVAL'),
+                        help='Record live klines as a fixture, then exit')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.record:
+        from backend.utils.binance_client import BinanceClient
+        print(f"Recorded {record_fixture(BinanceClient(), *args.record)}")
+        return 0
+
+    candles = [500, 5_000] if args.quick else args.candles
+    symbols = [1, 10] if args.quick else args.symbols
+    runners = {
+        'detection': lambda: bench_detection(candles, symbols, args.repeat),
+        'volume_profile': lambda: bench_volume_profile(candles, args.repeat),
+        'serialization': lambda: bench_serialization(candles, args.repeat),
+        'storage': lambda: bench_storage(candles, args.repeat),
+        'fanout': lambda: bench_fanout(symbols, args.repeat)
+    }
+
+    results = []
+    print(f"{'benchmark':<70} {'ms':>10} {'peak KB':>10}")
+    for group in args.groups:
+        for result in runners[group]():
+            print(f"{result['key']:<70} {result['time_ms']:>10.3f} {result['peak_kb']:>10.1f}")
+            results.append(result)
+
+    report = {
+        'meta': {
+            'created': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'repeat': args.repeat
+        },
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_ms)
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
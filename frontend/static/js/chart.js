@@ -7,8 +7,8 @@
 const chartState = {
     chart: null,
     data: {
-      price: [],
-      volume: [],
+      // Candles as parallel arrays: x (Date), open, high, low, close, volume
+      columns: emptyColumns(),
       supports: []
     },
     config: {
@@ -19,6 +19,63 @@ const chartState = {
     }
   };
   
+  // Empty column store
+  function emptyColumns() {
+    return { x: [], open: [], high: [], low: [], close: [], volume: [] };
+  }
+  
+  // Candle fields in the order of a packed binary block
+  const CANDLE_FIELDS = ['timestamp', 'open', 'high', 'low', 'close', 'volume'];
+  
+  // Decode a packed float64 block (one row per candle field) to parallel arrays
+  function unpackColumns(buffer) {
+    const values = new Float64Array(buffer);
+    const count = values.length / CANDLE_FIELDS.length;
+    const columns = {};
+    CANDLE_FIELDS.forEach((field, i) => {
+      columns[field] = Array.from(values.subarray(i * count, (i + 1) * count));
+    });
+    return columns;
+  }
+  
+  // Convert a chart payload's price data to column arrays. Accepts the
+  // columnar layout (epoch-ms timestamps, as arrays or a packed binary block)
+  // and the legacy one-dict-per-candle layout.
+  function toColumns(price) {
+    if (!price) return emptyColumns();
+  
+    if (price instanceof ArrayBuffer) {
+      price = unpackColumns(price);
+    }
+  
+    if (!Array.isArray(price)) {
+      return {
+        x: (price.timestamp || []).map(ts => new Date(ts)),
+        open: price.open || [],
+        high: price.high || [],
+        low: price.low || [],
+        close: price.close || [],
+        volume: price.volume || []
+      };
+    }
+  
+    return {
+      x: price.map(d => new Date(d.timestamp)),
+      open: price.map(d => d.open),
+      high: price.map(d => d.high),
+      low: price.map(d => d.low),
+      close: price.map(d => d.close),
+      volume: price.map(d => d.volume)
+    };
+  }
+  
+  // Volume bar colors from candle direction
+  function volumeColors(columns) {
+    return columns.close.map((close, i) =>
+      close >= columns.open[i] ? 'rgba(0,200,83,0.3)' : 'rgba(255,73,118,0.3)'
+    );
+  }
+  
   // Initialize the chart
   function initializeChart(initialData) {
     const chartElement = document.getElementById('price-chart');
@@ -35,14 +92,16 @@ const chartState = {
     // Store initial data
     updateChartData(initialData);
     
+    const columns = chartState.data.columns;
+  
     // Create price candlestick trace
     const priceTrace = {
       type: 'candlestick',
-      x: chartState.data.price.map(d => new Date(d.timestamp)),
-      open: chartState.data.price.map(d => d.open),
-      high: chartState.data.price.map(d => d.high),
-      low: chartState.data.price.map(d => d.low),
-      close: chartState.data.price.map(d => d.close),
+      x: columns.x,
+      open: columns.open,
+      high: columns.high,
+      low: columns.low,
+      close: columns.close,
       yaxis: 'y',
       name: 'Price',
       decreasing: {line: {color: '#ff4976'}},
@@ -52,14 +111,12 @@ const chartState = {
     // Create volume bar trace
     const volumeTrace = {
       type: 'bar',
-      x: chartState.data.price.map(d => new Date(d.timestamp)),
-      y: chartState.data.price.map(d => d.volume),
+      x: columns.x,
+      y: columns.volume,
       yaxis: 'y2',
       name: 'Volume',
       marker: {
-        color: chartState.data.price.map(d => 
-          d.close >= d.open ? 'rgba(0,200,83,0.3)' : 'rgba(255,73,118,0.3)'
-        )
+        color: volumeColors(columns)
       }
     };
   
@@ -67,8 +124,8 @@ const chartState = {
     const supportTraces = chartState.data.supports.map(level => ({
       type: 'scatter',
       x: [
-        chartState.data.price.length > 0 ? new Date(chartState.data.price[0].timestamp) : new Date(),
-        chartState.data.price.length > 0 ? new Date(chartState.data.price[chartState.data.price.length - 1].timestamp) : new Date()
+        columns.x.length > 0 ? columns.x[0] : new Date(),
+        columns.x.length > 0 ? columns.x[columns.x.length - 1] : new Date()
       ],
       y: [level.price, level.price],
       mode: 'lines',
@@ -233,34 +290,67 @@ const chartState = {
     
     // Update chart data
     updateChartData(data);
-    
+    redrawChart();
+  
+    // Update support levels if they exist and should be visible
+    if (data.supports && chartState.config.showSupports) {
+      updateChartSupports(data.supports);
+    }
+  }
+  
+  // Merge a chart delta: replace candles opened at or after `from`, append the
+  // delta's candles, then drop candles opened before `first`
+  function applyChartDelta(delta) {
+    if (!chartState.chart || !delta) return;
+  
+    let columns = chartState.data.columns;
+    const firstAtOrAfter = time => {
+      const index = columns.x.findIndex(x => x.getTime() >= time);
+      return index === -1 ? columns.x.length : index;
+    };
+  
+    if (delta.from !== null) {
+      const incoming = toColumns(delta.candles);
+      const keep = firstAtOrAfter(delta.from);
+      Object.keys(columns).forEach(field => {
+        columns[field] = columns[field].slice(0, keep).concat(incoming[field]);
+      });
+    }
+    if (delta.first !== null) {
+      const drop = firstAtOrAfter(delta.first);
+      Object.keys(columns).forEach(field => {
+        columns[field] = columns[field].slice(drop);
+      });
+    }
+  
+    chartState.data.columns = columns;
+    redrawChart();
+  }
+  
+  // Redraw the price and volume traces from the column store
+  function redrawChart() {
     try {
+      const columns = chartState.data.columns;
+  
       // Update price trace
       Plotly.update(chartState.chart, {
-        x: [chartState.data.price.map(d => new Date(d.timestamp))],
-        open: [chartState.data.price.map(d => d.open)],
-        high: [chartState.data.price.map(d => d.high)],
-        low: [chartState.data.price.map(d => d.low)],
-        close: [chartState.data.price.map(d => d.close)]
+        x: [columns.x],
+        open: [columns.open],
+        high: [columns.high],
+        low: [columns.low],
+        close: [columns.close]
       }, {}, [0]);
   
       // Update volume trace if visible
       if (chartState.config.showVolume) {
         Plotly.update(chartState.chart, {
-          x: [chartState.data.price.map(d => new Date(d.timestamp))],
-          y: [chartState.data.price.map(d => d.volume)],
+          x: [columns.x],
+          y: [columns.volume],
           marker: {
-            color: chartState.data.price.map(d => 
-              d.close >= d.open ? 'rgba(0,200,83,0.3)' : 'rgba(255,73,118,0.3)'
-            )
+            color: volumeColors(columns)
           }
         }, {}, [1]);
       }
-  
-      // Update support levels if they exist and should be visible
-      if (data.supports && chartState.config.showSupports) {
-        updateChartSupports(data.supports);
-      }
       
       // Update chart statistics
       updateChartStatistics();
@@ -273,8 +363,8 @@ const chartState = {
   function updateChartData(data) {
     if (!data) return;
     
-    if (data.price && Array.isArray(data.price)) {
-      chartState.data.price = data.price;
+    if (data.price && typeof data.price === 'object') {
+      chartState.data.columns = toColumns(data.price);
     }
     
     if (data.supports && Array.isArray(data.supports)) {
@@ -298,8 +388,15 @@ const chartState = {
     let data;
     if (latestData && latestData.open) {
       data = latestData;
-    } else if (chartState.data.price.length > 0) {
-      data = chartState.data.price[chartState.data.price.length - 1];
+    } else if (chartState.data.columns.x.length > 0) {
+      const columns = chartState.data.columns;
+      const last = columns.x.length - 1;
+      data = {
+        open: columns.open[last],
+        high: columns.high[last],
+        low: columns.low[last],
+        close: columns.close[last]
+      };
     } else {
       return;
     }
@@ -444,6 +541,7 @@ const chartState = {
   window.updateChart = updateChart;
   window.updateChartSupports = updateChartSupports;
   window.updateFullChart = updateFullChart;
+  window.applyChartDelta = applyChartDelta;
   window.toggleChartVolume = toggleChartVolume;
   window.toggleChartSupports = toggleChartSupports;
   window.changeTimeframe = changeTimeframe;
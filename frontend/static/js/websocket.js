@@ -1,5 +1,6 @@
-// Initialize Socket.IO connection
-const socket = io();
+// Initialize Socket.IO connection (chart payloads as parallel arrays, then
+// sequenced deltas with candles packed as binary float64 columns)
+const socket = io({ query: { chart_format: 'columnar', updates: 'delta', encoding: 'binary' } });
 
 // DOM Elements
 const pairSelector = document.getElementById('pair-selector');
@@ -9,10 +10,37 @@ const priceChange = document.getElementById('price-change');
 const priceHigh = document.getElementById('price-high');
 const priceLow = document.getElementById('price-low');
 const volume = document.getElementById('volume');
+const supportAlerts = document.getElementById('support-alerts');
+
+// Support alert banners: newest first, dismissed after a while
+const MAX_VISIBLE_ALERTS = 5;
+const ALERT_DISPLAY_MS = 15000;
+const ALERT_STYLES = {
+    break: { className: 'bg-red-900 border-red-500', verb: 'broke below' },
+    reclaim: { className: 'bg-green-900 border-green-500', verb: 'reclaimed' },
+    approach: { className: 'bg-yellow-900 border-yellow-500', verb: 'is approaching' }
+};
 
 // Current state
 let currentPair = 'BTCUSDT';
 let currentTimeframe = '1h';
+let tickerState = null;
+
+// Last applied sequence number per delta stream; null until a snapshot arrives
+const streamSeq = { ticker: null, chart: null };
+
+// Accept a delta only if it directly follows the last one applied; on a gap,
+// drop the stream and ask the server for a fresh snapshot
+function inSequence(stream, seq) {
+    if (streamSeq[stream] === null) return false;
+    if (seq !== streamSeq[stream] + 1) {
+        streamSeq[stream] = null;
+        socket.emit('resync', { stream: stream });
+        return false;
+    }
+    streamSeq[stream] = seq;
+    return true;
+}
 
 // Connect handler
 socket.on('connect', () => {
@@ -43,6 +71,38 @@ socket.on('chart_update', (data) => {
     updateFullChart(data);
 });
 
+// Ticker stream: full snapshot, then only the fields that changed
+socket.on('ticker_snapshot', (data) => {
+    if (data.symbol !== currentPair) return;
+    streamSeq.ticker = data.seq;
+    tickerState = data.ticker;
+    updatePriceDisplay(tickerState);
+});
+
+socket.on('ticker_delta', (data) => {
+    if (data.symbol !== currentPair || !inSequence('ticker', data.seq)) return;
+    tickerState = Object.assign({}, tickerState, data.changes);
+    updatePriceDisplay(tickerState);
+});
+
+// Chart stream: full snapshot, then only appended or modified candles
+socket.on('chart_snapshot', (data) => {
+    if (data.symbol !== currentPair || data.interval !== currentTimeframe) return;
+    streamSeq.chart = data.seq;
+    updateFullChart(data);
+});
+
+socket.on('chart_delta', (data) => {
+    if (data.symbol !== currentPair || data.interval !== currentTimeframe) return;
+    if (!inSequence('chart', data.seq)) return;
+    applyChartDelta(data);
+});
+
+// Support alerts: price approached, broke or reclaimed a level
+socket.on('support_alert', (alerts) => {
+    alerts.forEach(showSupportAlert);
+});
+
 // Update price display
 function updatePriceDisplay(data) {
     if (!data) return;
@@ -114,6 +174,35 @@ function updateSupportLevels(levels) {
     });
 }
 
+// Show a support alert as a banner above the support levels
+function showSupportAlert(alert) {
+    const style = ALERT_STYLES[alert.type] || ALERT_STYLES.approach;
+    const banner = document.createElement('div');
+    banner.className = `${style.className} border-l-4 rounded-lg p-3 flex justify-between items-center`;
+
+    const formatPrice = (price) => `$${parseFloat(price).toLocaleString('en-US', {
+        minimumFractionDigits: 2,
+        maximumFractionDigits: 2
+    })}`;
+    const level = alert.level.label ? `${alert.level.label} (${formatPrice(alert.level.price)})`
+                                    : `support ${formatPrice(alert.level.price)}`;
+
+    // Labels come from users, so text is set rather than parsed as HTML
+    const message = document.createElement('span');
+    message.textContent = `${alert.symbol} ${style.verb} ${level} at ${formatPrice(alert.price)}`;
+    const time = document.createElement('span');
+    time.className = 'text-sm text-gray-400 ml-4';
+    time.textContent = new Date(alert.timestamp).toLocaleTimeString();
+    banner.append(message, time);
+    banner.addEventListener('click', () => banner.remove());
+
+    supportAlerts.prepend(banner);
+    while (supportAlerts.children.length > MAX_VISIBLE_ALERTS) {
+        supportAlerts.lastElementChild.remove();
+    }
+    setTimeout(() => banner.remove(), ALERT_DISPLAY_MS);
+}
+
 // Utility function to format time ago
 function getTimeAgo(date) {
     const seconds = Math.floor((new Date() - date) / 1000);
@@ -140,10 +229,13 @@ function getTimeAgo(date) {
 // Event Listeners
 pairSelector.addEventListener('change', (e) => {
     currentPair = e.target.value;
+    streamSeq.ticker = null;
+    streamSeq.chart = null;
     socket.emit('change_pair', { pair: currentPair });
 });
 
 timeframeSelector.addEventListener('change', (e) => {
     currentTimeframe = e.target.value;
+    streamSeq.chart = null;
     socket.emit('change_timeframe', { timeframe: currentTimeframe });
 });
\ No newline at end of file
@@ -4,11 +4,20 @@ Crypto Support Tracker
 Run script - Application entry point
 """
 import argparse
+import json
+import os
+from threading import Event
 from backend.app import app, socketio
 from backend.utils.binance_client import BinanceClient
 from backend.utils.support_detector import SupportDetector
 from backend.services.price_service import PriceService
 from backend.services.support_service import SupportService
+from backend.services.order_book_service import OrderBookService
+from backend.services.alert_service import AlertService
+from backend.services.snapshot_service import SnapshotService
+from backend.utils.event_bus import EventBus
+from backend.utils.kline_store import KlineStore
+from backend.utils.timeframe_aggregator import TimeframeAggregator
 from backend.config import Config
 
 def parse_args():
@@ -20,6 +29,56 @@ def parse_args():
                         help='Port to run the server on')
     parser.add_argument('--debug', action='store_true',
                         help='Run in debug mode')
+    parser.add_argument('--stream', action='store_true',
+                        help='Ingest market data over WebSocket instead of REST polling')
+    parser.add_argument('--symbols', type=str, nargs='+',
+                        default=['BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'SOLUSDT'],
+                        help='Symbols to stream')
+    parser.add_argument('--intervals', type=str, nargs='+',
+                        default=['5m', '15m', '1h', '4h'],
+                        help='Kline intervals to stream')
+    parser.add_argument('--depth', action='store_true',
+                        help='Also stream order books to add liquidity walls to supports')
+    parser.add_argument('--message-queue', type=str, default=Config.MESSAGE_QUEUE,
+                        help='Run in cluster mode over this queue (broker://host:port or redis://...)')
+    parser.add_argument('--role', type=str, choices=['all', 'web', 'ingest'],
+                        default=Config.CLUSTER_ROLE,
+                        help='Cluster role: serve clients, contend for ingest, or both')
+
+    subparsers = parser.add_subparsers(dest='command')
+    replay = subparsers.add_parser(
+        'replay', help='Replay historical klines through support detection'
+    )
+    replay.add_argument('--data', type=str, required=True,
+                        help='Directory of kline CSV/Parquet files (e.g. data.binance.vision dumps)')
+    replay.add_argument('--symbols', type=str, nargs='+', required=True,
+                        help='Symbols to replay')
+    replay.add_argument('--interval', type=str, default='1m',
+                        help='Kline interval of the files')
+    replay.add_argument('--window', type=int, default=500,
+                        help='Candles each detection sees, as in the live chart')
+    replay.add_argument('--detect-every', type=int, default=15,
+                        help='Candles between detections')
+    replay.add_argument('--horizon', type=int, default=1000,
+                        help='Candles a level is followed without detections or events')
+    replay.add_argument('--break-percent', type=float, default=0.5,
+                        help='Close this far below a level breaks it')
+    replay.add_argument('--bounce-percent', type=float, default=1.0,
+                        help='Close this far above a tested level is a bounce')
+    replay.add_argument('--chunk-size', type=int, default=100_000,
+                        help='Candles read per chunk')
+    replay.add_argument('--workers', type=int, default=1,
+                        help='Symbols replayed in parallel (0 = one per CPU core)')
+    replay.add_argument('--output', type=str,
+                        help='Write summaries and per-level records as JSON')
+
+    broker = subparsers.add_parser(
+        'broker', help='Run the local message broker for cluster mode on one host'
+    )
+    broker.add_argument('--host', type=str, default='127.0.0.1',
+                        help='Interface to listen on (trusted networks only)')
+    broker.add_argument('--port', type=int, default=6390,
+                        help='Port to listen on')
     return parser.parse_args()
 
 def init_services():
@@ -28,28 +87,164 @@ def init_services():
     config = Config()
     
     # Initialize services
-    binance_client = BinanceClient()
+    if config.BINANCE_ASYNC:
+        # Optional dependencies are imported only when used, to keep startup fast
+        from backend.utils.async_binance_client import SyncBinanceClient
+        binance_client = SyncBinanceClient(max_concurrency=config.BINANCE_MAX_CONCURRENCY)
+    else:
+        binance_client = BinanceClient()
     support_detector = SupportDetector(
         min_touches=config.MIN_TOUCHES,
         min_distance_percent=config.MIN_DISTANCE_PERCENT
     )
     
-    price_service = PriceService(binance_client)
-    support_service = SupportService(support_detector)
+    event_bus = EventBus()
+    kline_store = None
+    if config.KLINE_STORE_DIR:
+        kline_store = KlineStore(config.KLINE_STORE_DIR, binance_client)
+        kline_store.attach_event_bus(event_bus)
+    timeframe_aggregator = None
+    if config.BASE_INTERVAL:
+        timeframe_aggregator = TimeframeAggregator(kline_store or binance_client,
+                                                   config.BASE_INTERVAL)
+        timeframe_aggregator.attach_event_bus(event_bus)
+    price_service = PriceService(binance_client, kline_store=kline_store,
+                                 timeframe_aggregator=timeframe_aggregator)
+    price_service.attach_event_bus(event_bus)
+    order_book_service = OrderBookService(binance_client)
+    order_book_service.attach_event_bus(event_bus)
+    support_service = SupportService(
+        support_detector,
+        binance_client=binance_client,
+        max_workers=config.DETECTION_WORKERS or None,
+        order_book_service=order_book_service
+    )
+    alert_service = AlertService(
+        proximity_percent=config.ALERT_PROXIMITY_PERCENT,
+        cooldown=config.ALERT_COOLDOWN
+    )
     
     return {
         'binance_client': binance_client,
+        'kline_store': kline_store,
+        'timeframe_aggregator': timeframe_aggregator,
         'support_detector': support_detector,
         'price_service': price_service,
-        'support_service': support_service
+        'support_service': support_service,
+        'order_book_service': order_book_service,
+        'alert_service': alert_service,
+        'event_bus': event_bus
     }
 
+def run_replay(args):
+    """Backtest support detection against local kline files"""
+    from backend.services.replay_service import ReplayService, find_kline_files
+    config = Config()
+    replay_service = ReplayService(
+        SupportDetector(
+            min_touches=config.MIN_TOUCHES,
+            min_distance_percent=config.MIN_DISTANCE_PERCENT
+        ),
+        window=args.window,
+        detect_every=args.detect_every,
+        horizon=args.horizon,
+        break_percent=args.break_percent,
+        bounce_percent=args.bounce_percent,
+        chunk_size=args.chunk_size
+    )
+
+    sources = {}
+    for symbol in args.symbols:
+        paths = find_kline_files(args.data, symbol, args.interval)
+        if paths:
+            sources[symbol] = paths
+        else:
+            print(f"No {args.interval} kline files for {symbol} in {args.data}")
+    results = replay_service.replay(sources, workers=args.workers or os.cpu_count() or 1)
+
+    print(f"{'symbol':<12} {'candles':>10} {'levels':>7} {'hits':>7} {'bounces':>8} "
+          f"{'breaks':>7} {'hold':>6} {'candles/s':>10}")
+    for symbol, result in results.items():
+        summary = result['summary']
+        hold_rate = f"{summary['hold_rate']:.0%}" if summary['hold_rate'] is not None else '-'
+        print(f"{symbol:<12} {summary['candles']:>10} {summary['levels']:>7} "
+              f"{summary['hits']:>7} {summary['bounces']:>8} {summary['breaks']:>7} "
+              f"{hold_rate:>6} {summary['candles_per_second'] or 0:>10}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output}")
+
+def run_broker(args):
+    """Serve the local message broker in the foreground"""
+    from backend.utils.message_queue import LocalBroker
+    broker = LocalBroker(args.host, args.port)
+    print(f"Message broker listening on broker://{args.host}:{args.port}")
+    broker.serve_forever()
+
+def init_cluster(args, services, snapshot_service):
+    """Join the cluster on the message queue; ingest runs only while this process leads"""
+    from backend.services.cluster_service import ClusterService
+    from backend.utils.message_queue import QueueManager, connect_queue
+    import backend.app as app_module
+
+    message_queue = connect_queue(args.message_queue)
+    app_module.use_message_queue(QueueManager(
+        message_queue, channel=f"{Config.CLUSTER_CHANNEL}:socketio", write_only=args.role == 'ingest'
+    ))
+    cluster_service = ClusterService(
+        message_queue, app_module.subscriptions, role=args.role,
+        channel=Config.CLUSTER_CHANNEL, lease_ttl=Config.CLUSTER_LEASE_TTL,
+        heartbeat=Config.CLUSTER_HEARTBEAT
+    )
+    cluster_service.attach_event_bus(services['event_bus'])
+
+    def on_leadership(event):
+        if event['leader']:
+            if snapshot_service is not None:
+                snapshot_service.restore()
+                snapshot_service.start()
+            if 'market_stream' in services:
+                services['market_stream'].start()
+        else:
+            if 'market_stream' in services:
+                services['market_stream'].stop()
+            if snapshot_service is not None:
+                snapshot_service.stop()
+
+    # Subscribed first, so a new leader restores the snapshot before the app
+    # resumes its ingest tasks
+    services['event_bus'].subscribe('leadership', on_leadership)
+    app_module.attach_cluster(cluster_service, services['event_bus'])
+    return cluster_service
+
 def main():
     """Main entry point for the application"""
     args = parse_args()
+    if args.command == 'replay':
+        run_replay(args)
+        return
+    if args.command == 'broker':
+        run_broker(args)
+        return
     
     # Initialize services
     services = init_services()
+
+    snapshot_service = None
+    if Config.SNAPSHOT_PATH:
+        snapshot_service = SnapshotService(
+            Config.SNAPSHOT_PATH, services,
+            interval=Config.SNAPSHOT_INTERVAL, max_age=Config.SNAPSHOT_MAX_AGE
+        )
+    cluster_service = None
+    if args.message_queue:
+        cluster_service = init_cluster(args, services, snapshot_service)
+    elif snapshot_service is not None:
+        # Warm start: reload detector and cache state before accepting connections
+        snapshot_service.restore()
+        snapshot_service.start()
     
     # Register services with app context
     with app.app_context():
@@ -60,23 +255,66 @@ def main():
         import backend.app as app_module
         app_module.price_service = services['price_service']
         app_module.support_service = services['support_service']
-        app_module.current_pair = "BTCUSDT"
-        app_module.current_timeframe = "1h"
+        app_module.alert_service = services['alert_service']
+        app_module.default_pair = "BTCUSDT"
+        app_module.default_timeframe = "1h"
+        app_module.support_interval = Config.SUPPORT_INTERVAL
+        app_module.outbox.high_water = Config.BACKPRESSURE_HIGH_WATER
+        app_module.outbox.low_water = Config.BACKPRESSURE_LOW_WATER
+        app_module.response_cache.max_age = Config.API_MAX_AGE
+
+    # Background updates; in cluster mode the ingest tasks wait for leadership
+    scheduler = app_module.create_scheduler(
+        ticker_interval=Config.TICKER_INTERVAL,
+        chart_interval=Config.CHART_INTERVAL,
+        support_check_interval=Config.SUPPORT_CHECK_INTERVAL,
+        ingest=cluster_service is None
+    )
+    
+    # Start streaming ingest (in cluster mode, once elected)
+    if args.stream and args.role != 'web':
+        import backend.app as app_module
+        from backend.utils.market_stream import MarketStream
+        app_module.attach_market_stream(services['event_bus'])
+        services['market_stream'] = MarketStream(
+            services['binance_client'], services['event_bus'],
+            args.symbols, args.intervals, depth=args.depth
+        )
+        if cluster_service is None:
+            services['market_stream'].start()
     
     # Configure Socket.IO settings in the initialization
     # These should be set before running
     socketio.ping_interval = Config.SOCKET_PING_INTERVAL
     socketio.ping_timeout = Config.SOCKET_PING_TIMEOUT
     
+    scheduler.start()
+    if cluster_service is not None:
+        cluster_service.start()
+
     # Run the application
-    print(f"Starting Crypto Support Tracker on {args.host}:{args.port}")
-    socketio.run(
-        app,
-        host=args.host,
-        port=args.port,
-        debug=args.debug,
-        allow_unsafe_werkzeug=True  # For development only
-    )
+    try:
+        if cluster_service is not None and args.role == 'ingest':
+            # No client connections: publish through the queue until interrupted
+            print(f"Starting Crypto Support Tracker ingest worker {cluster_service.worker_id}")
+            Event().wait()
+        else:
+            print(f"Starting Crypto Support Tracker on {args.host}:{args.port}")
+            socketio.run(
+                app,
+                host=args.host,
+                port=args.port,
+                debug=args.debug,
+                allow_unsafe_werkzeug=True  # For development only
+            )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if cluster_service is not None:
+            cluster_service.stop()
+        elif snapshot_service is not None:
+            snapshot_service.stop()
+        scheduler.stop(wait=False)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
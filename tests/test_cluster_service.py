@@ -0,0 +1,126 @@
+import time
+import pytest
+from backend.services.cluster_service import ClusterService
+from backend.services.subscription_service import SubscriptionService
+from backend.utils.event_bus import EventBus
+from backend.utils.message_queue import BrokerQueue, LocalBroker
+
+LEASE_TTL = 0.6
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def broker():
+    broker = LocalBroker().start()
+    yield broker
+    broker.stop()
+
+
+@pytest.fixture
+def make_worker(broker):
+    """ClusterService factory; every worker made is stopped afterwards"""
+    workers = []
+
+    def make(role='ingest', worker_id=None):
+        worker = ClusterService(BrokerQueue(broker.url), SubscriptionService(), role=role,
+                                lease_ttl=LEASE_TTL, heartbeat=0.1, worker_id=worker_id)
+        worker.attach_event_bus(EventBus())
+        workers.append(worker)
+        return worker
+
+    yield make
+    for worker in workers:
+        worker.stop()
+        worker.message_queue.close()
+
+
+def crash(worker):
+    """Stop renewing the lease without releasing it, as a killed process would"""
+    worker._stop.set()
+    worker._threads[0].join()
+    worker._threads = []
+
+
+def test_one_leader_is_elected(make_worker):
+    workers = [make_worker(worker_id=f"worker-{i}") for i in range(3)]
+    for worker in workers:
+        worker.start()
+    assert wait_for(lambda: any(worker.is_leader for worker in workers))
+    # Every contender has renewed at least once since
+    time.sleep(LEASE_TTL)
+    assert sum(worker.is_leader for worker in workers) == 1
+
+
+def test_web_workers_never_lead(make_worker):
+    web = make_worker(role='web')
+    web.start()
+    time.sleep(LEASE_TTL)
+    assert not web.is_leader
+
+
+def test_release_hands_over_leadership(make_worker):
+    first, second = make_worker(), make_worker()
+    events = []
+    second.event_bus.subscribe('leadership', events.append)
+    first.start()
+    assert wait_for(lambda: first.is_leader)
+    second.start()
+
+    first.stop()
+    assert not first.is_leader
+    # Released, so the next renewal attempt wins without waiting for expiry
+    assert wait_for(lambda: second.is_leader, timeout=LEASE_TTL)
+    assert events == [{'leader': True, 'worker': second.worker_id}]
+
+
+def test_lease_expiry_lets_another_worker_take_over(make_worker):
+    first, second = make_worker(), make_worker()
+    first.start()
+    assert wait_for(lambda: first.is_leader)
+    second.start()
+
+    crashed_at = time.monotonic()
+    crash(first)
+    assert wait_for(lambda: second.is_leader, timeout=3 * LEASE_TTL)
+    # Not before the lease the crashed leader last renewed had run out
+    assert time.monotonic() - crashed_at > LEASE_TTL / 3
+
+
+@pytest.fixture
+def app_module():
+    import backend.app as app_module
+    previous = app_module.scheduler, app_module.cluster
+    yield app_module
+    app_module.scheduler, app_module.cluster = previous
+
+
+def ingest_paused(app_module):
+    stats = app_module.scheduler.stats()
+    return {stats[name]['paused'] for name in app_module.INGEST_TASKS}
+
+
+def test_ingest_tasks_follow_leadership(make_worker, app_module):
+    # Built like a cluster process: ingest tasks paused until elected, not started
+    app_module.create_scheduler(ingest=False)
+    first, second = make_worker(), make_worker()
+    app_module.attach_cluster(first, first.event_bus)
+    assert ingest_paused(app_module) == {True}
+    assert not app_module.scheduler.stats()['outbox']['paused']
+
+    first.start()
+    assert wait_for(lambda: ingest_paused(app_module) == {False})
+    assert app_module.ingests()
+
+    second.start()
+    first.stop()
+    assert ingest_paused(app_module) == {True}
+    assert not app_module.ingests()
+    assert wait_for(lambda: second.is_leader)
@@ -0,0 +1,58 @@
+import os
+import signal
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from backend.services.detection_pool import DetectionPool
+from backend.utils.support_detector import SupportDetector
+
+
+def make_candles(n, seed):
+    rng = np.random.default_rng(seed)
+    # Geometric walk: prices stay positive over long series
+    lows = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.01, n))), 1)
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=n, freq='h'),
+        'low': lows,
+        'volume': rng.uniform(1, 100, n)
+    })
+
+
+def kill_workers(pool):
+    for process in list(pool._executor._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+
+
+@pytest.fixture
+def pool():
+    pool = DetectionPool(SupportDetector(min_touches=2), max_workers=2)
+    yield pool
+    pool.shutdown()
+
+
+def test_pool_replaced_after_workers_died_between_batches(pool):
+    candles = {(f"SYM{i}USDT", '1h'): make_candles(300, i) for i in range(4)}
+    assert len(pool.run(candles)) == 4
+    kill_workers(pool)
+    time.sleep(0.5)  # let the executor notice
+
+    results = pool.run(candles)
+    assert set(results) == set(candles)
+    assert all(result['levels'] == pool.support_detector.detect_from_arrays(
+        key[0], candles[key]['low'].values, candles[key]['volume'].values,
+        candles[key]['timestamp'].values) for key, result in results.items())
+
+
+def test_pool_recovers_from_worker_dying_mid_batch(pool):
+    small = {('BTCUSDT', '1h'): make_candles(300, 0)}
+    pool.run(small)
+    large = {(f"SYM{i}USDT", '1h'): make_candles(200_000, i) for i in range(8)}
+    killer = threading.Timer(0.2, kill_workers, (pool,))
+    killer.start()
+    pool.run(large)
+    killer.join()
+
+    # Whatever the crashed batch returned, the next one runs on a new pool
+    assert set(pool.run(small)) == set(small)
@@ -0,0 +1,131 @@
+import time
+import pytest
+from backend.utils.event_bus import EventBus
+from backend.utils.fake_exchange import FakeExchange
+from backend.utils.market_stream import MarketStream
+
+MINUTE = 60_000
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class Recorder:
+    """Collects every event the stream publishes"""
+
+    def __init__(self, event_bus):
+        self.events = {'ticker': [], 'kline': [], 'stream_status': []}
+        for topic, events in self.events.items():
+            event_bus.subscribe(topic, events.append)
+
+
+@pytest.fixture
+def exchange():
+    exchange = FakeExchange().start()
+    yield exchange
+    exchange.stop()
+
+
+def start_stream(exchange, reconnect_delay=0.05, event_bus=None):
+    """Stream BTCUSDT 1m until a pushed ticker arrives, i.e. the subscription is live"""
+    event_bus = event_bus or EventBus()
+    recorder = Recorder(event_bus)
+    stream = MarketStream(exchange.client(), event_bus, ['BTCUSDT'], ['1m'],
+                          reconnect_delay=reconnect_delay)
+    stream.start()
+
+    def subscribed():
+        exchange.push_ticker('BTCUSDT', 100.0)
+        return bool(recorder.events['ticker'])
+
+    assert wait_for(subscribed)
+    return stream, event_bus, recorder
+
+
+def test_stream_ingest(exchange):
+    stream, _, recorder = start_stream(exchange)
+    try:
+        assert stream.connected
+        assert recorder.events['stream_status'][-1] == {'connected': True, 'symbols': ['BTCUSDT']}
+        assert recorder.events['ticker'][-1]['price'] == 100.0
+
+        open_time = (int(time.time() * 1000) // MINUTE - 10) * MINUTE
+        exchange.add_candle('BTCUSDT', '1m', open_time, 100, 102, 99, 101, 5)
+        assert wait_for(lambda: recorder.events['kline'])
+        candle = recorder.events['kline'][-1]
+        assert candle['timestamp'] == open_time
+        assert (candle['low'], candle['close'], candle['closed']) == (99.0, 101.0, True)
+        assert not candle.get('backfill')
+    finally:
+        stream.stop()
+
+
+def test_rest_backfill_after_disconnect(exchange):
+    stream, _, recorder = start_stream(exchange)
+    try:
+        open_time = (int(time.time() * 1000) // MINUTE - 10) * MINUTE
+        exchange.add_candle('BTCUSDT', '1m', open_time, 100, 102, 99, 101, 5)
+        assert wait_for(lambda: recorder.events['kline'])
+
+        exchange.drop_connections()
+        # Closed while disconnected: only REST has them
+        for i in (1, 2, 3):
+            exchange.add_candle('BTCUSDT', '1m', open_time + i * MINUTE, 101, 103, 100, 102, 5,
+                                broadcast=False)
+        assert wait_for(lambda: len(recorder.events['kline']) == 4)
+
+        backfilled = recorder.events['kline'][1:]
+        assert [candle['timestamp'] for candle in backfilled] == \
+            [open_time + i * MINUTE for i in (1, 2, 3)]
+        assert all(candle['backfill'] and candle['closed'] for candle in backfilled)
+        assert {'connected': False, 'symbols': ['BTCUSDT']} in recorder.events['stream_status']
+        assert wait_for(lambda: stream.connected)
+    finally:
+        stream.stop()
+
+
+@pytest.fixture
+def app_module(exchange):
+    import backend.app as app_module
+    from backend.services.price_service import PriceService
+    previous = app_module.price_service, app_module.alert_service
+    app_module.price_service = PriceService(exchange.client())
+    app_module.alert_service = None
+    yield app_module
+    app_module.subscriptions.unsubscribe('test-sid')
+    app_module.subscriptions.unsubscribe('test-sid-2')
+    app_module.price_service, app_module.alert_service = previous
+    app_module.streamed_pairs = frozenset()
+
+
+def test_polling_resumes_when_stream_disconnects(exchange, app_module):
+    exchange.push_ticker('ETHUSDT', 10.0)
+    requested = []
+    client = app_module.price_service.binance_client
+    fetch = client.get_current_prices
+    client.get_current_prices = lambda symbols: requested.append(sorted(symbols)) or fetch(symbols)
+    app_module.subscriptions.subscribe('test-sid', 'BTCUSDT', '1h')
+    app_module.subscriptions.subscribe('test-sid-2', 'ETHUSDT', '1h')
+
+    event_bus = EventBus()
+    app_module.attach_market_stream(event_bus)
+    # No reconnect within the test, so the stream stays down once dropped
+    stream, _, _ = start_stream(exchange, reconnect_delay=30.0, event_bus=event_bus)
+    try:
+        assert app_module.streamed_pairs == {'BTCUSDT'}
+        app_module.poll_prices()
+        # Pairs the stream does not cover are polled while it is connected
+        assert requested == [['ETHUSDT']]
+
+        exchange.drop_connections()
+        assert wait_for(lambda: not app_module.streamed_pairs)
+        app_module.poll_prices()
+        assert requested[-1] == ['BTCUSDT', 'ETHUSDT']
+    finally:
+        stream.stop(timeout=0.5)
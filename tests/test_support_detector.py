@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+from backend.utils.support_detector import SupportDetector
+
+
+def make_series(n, seed, tick=0.5):
+    """Random-walk lows on a coarse price grid, so levels get retested"""
+    rng = np.random.default_rng(seed)
+    lows = np.round((100 + np.cumsum(rng.normal(0, 1, n))) / tick) * tick
+    volumes = rng.uniform(1, 100, n)
+    timestamps = (np.datetime64('2024-01-01T00:00') +
+                  np.arange(n) * np.timedelta64(1, 'h'))
+    return lows, volumes, timestamps
+
+
+def assert_same_candidates(detector, lows, volumes, timestamps):
+    reference = detector._detect_reference(lows, volumes, timestamps)
+    vectorized = detector._detect_vectorized(lows, volumes, timestamps)
+    assert len(vectorized) == len(reference)
+    for fast, slow in zip(vectorized, reference):
+        assert fast['price'] == slow['price']
+        assert fast['touches'] == slow['touches']
+        assert fast['last_test'] == slow['last_test']
+        assert fast['strength'] == pytest.approx(slow['strength'], abs=1e-9)
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('n', [41, 200, 1000])
+def test_vectorized_matches_reference_on_random_series(seed, n):
+    detector = SupportDetector(min_touches=2)
+    assert_same_candidates(detector, *make_series(n, seed))
+
+
+@pytest.mark.parametrize('n', [0, 1, 20, 40])
+def test_short_series(n):
+    detector = SupportDetector()
+    lows, volumes, timestamps = make_series(n, 0)
+    assert detector._detect_vectorized(lows, volumes, timestamps) == []
+    assert_same_candidates(detector, lows, volumes, timestamps)
+
+
+def test_flat_series():
+    detector = SupportDetector()
+    _, volumes, timestamps = make_series(300, 1)
+    assert_same_candidates(detector, np.full(300, 100.0), volumes, timestamps)
+
+
+def test_duplicate_lows():
+    detector = SupportDetector()
+    lows, volumes, timestamps = make_series(500, 2)
+    lows[::25] = lows.min()  # many equal lows, several per window
+    lows[100:110] = lows.min()
+    assert_same_candidates(detector, lows, volumes, timestamps)
+
+
+@pytest.mark.parametrize('window_size, tolerance', [(5, 0.001), (20, 0.01), (50, 0.0)])
+def test_detector_settings(window_size, tolerance):
+    detector = SupportDetector(min_touches=1)
+    detector.window_size = window_size
+    detector.tolerance = tolerance
+    assert_same_candidates(detector, *make_series(800, 3))
+
+
+def test_engines_give_same_levels():
+    lows, volumes, timestamps = make_series(2000, 4)
+    detector = SupportDetector()
+    vectorized = detector.detect_from_arrays('BTCUSDT', lows, volumes, timestamps)
+    reference = detector.detect_from_arrays('BTCUSDT', lows, volumes, timestamps,
+                                            engine='reference')
+    assert [level['price'] for level in vectorized] == [level['price'] for level in reference]
+
+
+def assert_same_levels(incremental, full):
+    assert [level['price'] for level in incremental] == [level['price'] for level in full]
+    for fast, slow in zip(incremental, full):
+        assert fast['touches'] == slow['touches']
+        assert fast['last_test'] == slow['last_test']
+        assert fast['strength'] == pytest.approx(slow['strength'], abs=1e-9)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_incremental_matches_full_recompute(seed):
+    """Random appends and overlapping resends, some with changed candles"""
+    rng = np.random.default_rng(seed)
+    lows, volumes, timestamps = make_series(1500, seed)
+    incremental = SupportDetector(min_touches=2)
+    full = SupportDetector(min_touches=2)
+
+    # The accumulated history always ends where the last batch ended
+    end = int(rng.integers(50, 400))
+    history = (lows[:end].copy(), volumes[:end].copy(), timestamps[:end])
+    incremental.update_from_arrays('BTCUSDT', '1h', *history)
+    while end < len(lows):
+        start = max(end - int(rng.integers(0, 30)), 0)
+        end = min(end + int(rng.integers(1, 40)), len(lows))
+        batch_lows, batch_volumes = lows[start:end].copy(), volumes[start:end].copy()
+        if rng.random() < 0.5:
+            # The forming candle, or a few recent ones, changed since last sent
+            changed = int(rng.integers(1, 4))
+            batch_lows[-changed:] += rng.normal(0, 1, min(changed, len(batch_lows)))
+            batch_volumes[-changed:] *= rng.uniform(0.5, 1.5)
+        history = tuple(np.concatenate([column[:start], batch]) for column, batch in
+                        zip(history, (batch_lows, batch_volumes, timestamps[start:end])))
+        levels = incremental.update_from_arrays('BTCUSDT', '1h', batch_lows, batch_volumes,
+                                                timestamps[start:end])
+        assert incremental.state_length('BTCUSDT', '1h') == end
+        assert_same_levels(levels, full.detect_from_arrays('BTCUSDT', *history))
+
+
+def test_incremental_gap_restarts_from_batch():
+    lows, volumes, timestamps = make_series(600, 5)
+    detector = SupportDetector(min_touches=2)
+    detector.update_from_arrays('BTCUSDT', '1h', lows[:300], volumes[:300], timestamps[:300])
+
+    # Candles 300-309 never arrived
+    levels = detector.update_from_arrays('BTCUSDT', '1h', lows[310:], volumes[310:],
+                                         timestamps[310:])
+    assert detector.state_length('BTCUSDT', '1h') == 290
+    assert detector.state_end('BTCUSDT', '1h') == timestamps[-1]
+    assert_same_levels(levels, SupportDetector(min_touches=2).detect_from_arrays(
+        'BTCUSDT', lows[310:], volumes[310:], timestamps[310:]))
+
+
+def test_incremental_contiguous_batch_extends_state():
+    lows, volumes, timestamps = make_series(600, 6)
+    detector = SupportDetector(min_touches=2)
+    detector.update_from_arrays('BTCUSDT', '1h', lows[:300], volumes[:300], timestamps[:300])
+    detector.update_from_arrays('BTCUSDT', '1h', lows[300:310], volumes[300:310],
+                                timestamps[300:310])
+    assert detector.state_length('BTCUSDT', '1h') == 310